@@ -1,9 +1,14 @@
-from fastapi import FastAPI, HTTPException
-import asyncio, os, random
-from typing import Dict, Set
+from fastapi import Body, FastAPI, HTTPException, Response
+from fastapi.responses import PlainTextResponse
+import asyncio, os, random, time
+from typing import Any, Dict, List
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
-from prometheus_client import start_http_server, Gauge, Counter
+from prometheus_client import start_http_server, Gauge, Counter, Histogram, Info
+from sampler import ProfilerBusy, StackSampler
+from loop_health import LAG_BUCKETS_MS, LoopMonitor, loop_implementation
 from otel_init import init_tracing
+from runtime_config import (ConfigError, ConfigSnapshot, RuntimeConfig, Setting,
+                            non_negative, parse_csv, probability)
 
 init_tracing("svc-d")
 app = FastAPI()
@@ -12,37 +17,94 @@ FastAPIInstrumentor.instrument_app(app)
 start_http_server(9100)
 g_inflight = Gauge("d_inflight", "requests in flight", ["device"])
 c_mode = Counter("d_mode_total", "mode by decision", ["mode"])
+g_config = Info("d_config", "Active runtime configuration version")
+g_loop_lag = Histogram("d_loop_lag_ms", "Event loop lag: how late a periodic probe wakes up (ms)",
+                       buckets=LAG_BUCKETS_MS)
+c_loop_blocked = Counter("d_loop_blocked", "Times the event loop was blocked past LOOP_BLOCKED_THRESHOLD_MS")
+g_loop_info = Info("d_event_loop", "Event loop implementation")
 
-SLOW_MS = int(os.getenv("SLOW_MS", "10000"))
-DEFAULT_NORMAL_MS = int(os.getenv("DEFAULT_NORMAL_MS", "3000"))
-SLOW_DEVICES: Set[str] = set([x.strip() for x in os.getenv("SLOW_DEVICES", "").split(",") if x.strip()])
-HANG_DEVICES: Set[str] = set([x.strip() for x in os.getenv("HANG_DEVICES", "").split(",") if x.strip()])
-PROB_SLOW = float(os.getenv("PROB_SLOW", "0.0"))
-PROB_HANG = float(os.getenv("PROB_HANG", "0.0"))
+# Event-loop lag probe and blocked-loop stack dumps
+loop_monitor = LoopMonitor(g_loop_lag, c_loop_blocked,
+                           interval_s=float(os.getenv("LOOP_PROBE_INTERVAL_MS", "100")) / 1000,
+                           slow_threshold_ms=float(os.getenv("LOOP_BLOCKED_THRESHOLD_MS", "100")))
+
+def check_probabilities(cfg: ConfigSnapshot) -> List[str]:
+    if cfg.PROB_SLOW + cfg.PROB_HANG > 1.0:
+        return ["PROB_SLOW + PROB_HANG must not exceed 1.0"]
+    return []
+
+# Live-tunable fault injection: env at startup, then RUNTIME_CONFIG_FILE and POST /admin/config
+CONFIG = RuntimeConfig([
+    Setting("SLOW_MS", int, "10000", non_negative),
+    Setting("DEFAULT_NORMAL_MS", int, "3000", non_negative),
+    Setting("SLOW_DEVICES", parse_csv, ""),
+    Setting("HANG_DEVICES", parse_csv, ""),
+    Setting("PROB_SLOW", float, "0.0", probability, "0..1"),
+    Setting("PROB_HANG", float, "0.0", probability, "0..1"),
+], path=os.getenv("RUNTIME_CONFIG_FILE") or None,
+   poll_s=float(os.getenv("RUNTIME_CONFIG_POLL_S", "2.0")),
+   check=check_probabilities)
+CONFIG.on_change(lambda cfg: g_config.info({"version": cfg.version, "generation": str(cfg.generation)}))
+CONFIG.start_watcher()
 
 locks: Dict[str, asyncio.Lock] = {}
 
+# On-demand sampling profiler for /debug/profile
+profiler = StackSampler(interval_s=float(os.getenv("PROFILE_INTERVAL_MS", "10")) / 1000,
+                        max_overhead=float(os.getenv("PROFILE_MAX_OVERHEAD", "0.02")),
+                        max_seconds=float(os.getenv("PROFILE_MAX_SECONDS", "60")))
+
+@app.on_event("startup")
+async def start_loop_monitor():
+    loop_monitor.start()
+    g_loop_info.info({"impl": loop_implementation(asyncio.get_running_loop())})
+
 @app.get("/health")
 async def health():
-    return {"ok": True, "slow_devices": sorted(list(SLOW_DEVICES)), "hang_devices": sorted(list(HANG_DEVICES))}
+    cfg = CONFIG.current
+    return {"ok": True, "slow_devices": sorted(cfg.SLOW_DEVICES), "hang_devices": sorted(cfg.HANG_DEVICES)}
+
+@app.get("/debug/profile")
+async def debug_profile(seconds: float = 10.0, top: int = 20, format: str = "json", thread: str | None = None):
+    if not 0 < seconds <= profiler.max_seconds:
+        raise HTTPException(status_code=400, detail=f"seconds must be in (0, {profiler.max_seconds:g}]")
+    try:
+        result = await asyncio.to_thread(profiler.profile, seconds, top, thread)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if format == "collapsed":
+        return PlainTextResponse(result["collapsed"])
+    return result
+
+@app.get("/admin/config")
+async def get_config():
+    return CONFIG.current.as_dict()
+
+@app.post("/admin/config")
+async def update_config(changes: Dict[str, Any] = Body(...)):
+    try:
+        return CONFIG.update(changes).as_dict()
+    except ConfigError as e:
+        raise HTTPException(status_code=400, detail=e.errors)
 
-def decide_mode(device_id: str, query_mode: str | None):
+def decide_mode(device_id: str, query_mode: str | None, cfg: ConfigSnapshot):
     if query_mode in ("normal","slow","hang","error"):
         return query_mode
-    if device_id in HANG_DEVICES:
+    if device_id in cfg.HANG_DEVICES:
         return "hang"
-    if device_id in SLOW_DEVICES:
+    if device_id in cfg.SLOW_DEVICES:
         return "slow"
     r = random.random()
-    if r < PROB_HANG:
+    if r < cfg.PROB_HANG:
         return "hang"
-    if r < PROB_HANG + PROB_SLOW:
+    if r < cfg.PROB_HANG + cfg.PROB_SLOW:
         return "slow"
     return "normal"
 
 @app.get("/do_work")
-async def do_work(device_id: str, ms: int | None = None, mode: str | None = None):
-    mode = decide_mode(device_id, mode)
+async def do_work(response: Response, device_id: str, ms: int | None = None, mode: str | None = None):
+    cfg = CONFIG.current
+    mode = decide_mode(device_id, mode, cfg)
     c_mode.labels(mode=mode).inc()
 
     lock = locks.setdefault(device_id, asyncio.Lock())
@@ -51,13 +113,16 @@ async def do_work(device_id: str, ms: int | None = None, mode: str | None = None
 
     async with lock:
         g_inflight.labels(device=device_id).set(1)
+        t0 = time.perf_counter()
         try:
             if mode == "hang":
                 await asyncio.Future()
             if mode == "error":
                 raise HTTPException(status_code=500, detail="device error")
-            sleep_ms = SLOW_MS if mode == "slow" else (ms if ms is not None else DEFAULT_NORMAL_MS)
+            sleep_ms = cfg.SLOW_MS if mode == "slow" else (ms if ms is not None else cfg.DEFAULT_NORMAL_MS)
             await asyncio.sleep(sleep_ms/1000)
+            # Own work time, so C can tell it apart from the network (see C's server-timing trailer)
+            response.headers["Server-Timing"] = f"work;dur={(time.perf_counter() - t0) * 1000:.1f}"
             return {"device_id": device_id, "cost_ms": sleep_ms, "decided_mode": mode}
         finally:
             g_inflight.labels(device=device_id).set(0)
\ No newline at end of file
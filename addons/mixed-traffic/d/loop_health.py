@@ -0,0 +1,91 @@
+"""Event-loop health: lag probe, blocked-loop detection and opt-in uvloop.
+
+The probe task sleeps `interval_s` and records how late it wakes up; that
+lateness is the queueing delay every other callback on the loop is paying.
+A watchdog thread notices when the probe's heartbeat stops (the loop is stuck
+in one callback longer than `slow_threshold_ms`) and logs the loop thread's
+current stack once per stall, so the blocking call can be named.
+
+Duplicated per service like otel_init.py; metric objects are passed in.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+
+LAG_BUCKETS_MS = [0.1, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000]
+
+def use_uvloop_if_requested() -> str:
+    """Install uvloop's policy when EVENT_LOOP=uvloop; returns the loop name.
+
+    Only needed for services that start their own loop (C). Under uvicorn the
+    loop is chosen with `--loop`, see docker-compose.yml.
+    """
+    if os.getenv("EVENT_LOOP", "asyncio").lower() != "uvloop":
+        return "asyncio"
+    try:
+        import uvloop
+    except ImportError:
+        print("[LOOP] EVENT_LOOP=uvloop but uvloop is not installed, using asyncio", flush=True)
+        return "asyncio"
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return "uvloop"
+
+def loop_implementation(loop: asyncio.AbstractEventLoop) -> str:
+    return "uvloop" if type(loop).__module__.startswith("uvloop") else "asyncio"
+
+class LoopMonitor:
+    def __init__(self, lag_histogram, blocked_counter, interval_s: float = 0.1,
+                 slow_threshold_ms: float = 100.0, stack_limit: int = 25):
+        self.lag_histogram = lag_histogram
+        self.blocked_counter = blocked_counter
+        self.interval_s = interval_s
+        self.slow_threshold_s = slow_threshold_ms / 1000
+        self.stack_limit = stack_limit
+        self.loop = None
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id = None
+        self._task = None
+
+    def start(self, loop: asyncio.AbstractEventLoop = None):
+        """Call from the loop thread (e.g. a startup hook)."""
+        self.loop = loop or asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._task = self.loop.create_task(self._probe())
+        threading.Thread(target=self._watchdog, name="loop-watchdog", daemon=True).start()
+        print(f"[LOOP] Monitoring {loop_implementation(self.loop)} loop: probe every "
+              f"{self.interval_s*1000:.0f}ms, blocked threshold {self.slow_threshold_s*1000:.0f}ms", flush=True)
+
+    async def _probe(self):
+        while True:
+            t0 = time.perf_counter()
+            await asyncio.sleep(self.interval_s)
+            lag = time.perf_counter() - t0 - self.interval_s
+            self._heartbeat = time.monotonic()
+            self.lag_histogram.observe(max(lag, 0.0) * 1000)
+
+    def _watchdog(self):
+        reported_for = None
+        while True:
+            time.sleep(self.slow_threshold_s / 2)
+            beat = self._heartbeat
+            stalled = time.monotonic() - beat - self.interval_s
+            if stalled < self.slow_threshold_s or reported_for == beat:
+                continue
+            reported_for = beat
+            self.blocked_counter.inc()
+            self._report(stalled)
+
+    def _report(self, stalled_s: float):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = "".join(traceback.format_stack(frame, limit=self.stack_limit)) if frame else "  <no frame>\n"
+        try:
+            task = asyncio.current_task(self.loop)
+        except RuntimeError:
+            task = None
+        coro = getattr(task.get_coro(), "__qualname__", repr(task.get_coro())) if task else "<callback, not a task>"
+        print(f"[LOOP] Event loop blocked for >{stalled_s*1000:.0f}ms in {coro}; loop thread stack:\n{stack}",
+              end="", flush=True)
@@ -0,0 +1,204 @@
+"""Hot-reloadable runtime configuration.
+
+Settings are layered: environment (read once at startup) < watched config file
+(`KEY=VALUE` lines, same format as config/*.env) < admin overrides posted to
+the service. Every change is parsed and validated as a whole and then
+published as a new immutable `ConfigSnapshot`; readers grab `config.current`
+once per request and never see a half-applied update.
+
+Stdlib-only and duplicated per service like otel_init.py.
+"""
+import hashlib
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+class ConfigError(ValueError):
+    def __init__(self, errors: List[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+class Setting(NamedTuple):
+    name: str
+    parse: Callable[[Any], Any]
+    default: str
+    check: Optional[Callable[[Any], bool]] = None
+    hint: str = ""
+
+def parse_bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ("true", "1", "yes", "on"):
+        return True
+    if text in ("false", "0", "no", "off"):
+        return False
+    raise ValueError(f"not a boolean: {value!r}")
+
+def parse_csv(value: Any) -> frozenset:
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = value
+    else:
+        items = str(value).split(",")
+    return frozenset(str(x).strip() for x in items if str(x).strip())
+
+def positive(value) -> bool:
+    return value > 0
+
+def non_negative(value) -> bool:
+    return value >= 0
+
+def probability(value) -> bool:
+    return 0.0 <= value <= 1.0
+
+def read_env_file(path: str) -> Dict[str, str]:
+    """Parse KEY=VALUE lines, ignoring blanks, comments and inline `# ...`."""
+    values = {}
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#") or "=" not in line:
+                continue
+            key, _, value = line.partition("=")
+            value = value.split(" #", 1)[0].split("\t#", 1)[0].strip().strip('"').strip("'")
+            values[key.strip()] = value
+    return values
+
+class ConfigSnapshot:
+    """Immutable view of one validated configuration generation."""
+
+    def __init__(self, values: Dict[str, Any], generation: int, sources: Dict[str, str]):
+        object.__setattr__(self, "_values", dict(values))
+        object.__setattr__(self, "generation", generation)
+        object.__setattr__(self, "sources", dict(sources))
+        digest = hashlib.sha1(repr(sorted((k, repr(v)) for k, v in values.items())).encode()).hexdigest()
+        object.__setattr__(self, "version", digest[:8])
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self._values[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ConfigSnapshot is read-only")
+
+    def as_dict(self) -> dict:
+        values = {k: sorted(v) if isinstance(v, frozenset) else v for k, v in self._values.items()}
+        return {"version": self.version, "generation": self.generation,
+                "values": values, "sources": self.sources}
+
+class RuntimeConfig:
+    def __init__(self, settings: Iterable[Setting], path: Optional[str] = None,
+                 poll_s: float = 2.0, check: Optional[Callable[[ConfigSnapshot], List[str]]] = None):
+        self.settings = {s.name: s for s in settings}
+        self.path = path
+        self.poll_s = poll_s
+        self._check = check
+        # re-entrant: update()/reload_file() hold it across read-merge-publish and
+        # _publish() takes it again; listeners run under it, so they see generations in order
+        self._lock = threading.RLock()
+        self._listeners: List[Callable[[ConfigSnapshot], None]] = []
+        self._env = {name: os.getenv(name, s.default) for name, s in self.settings.items()}
+        self._file: Dict[str, str] = {}
+        self._admin: Dict[str, Any] = {}
+        self._file_mtime: Optional[float] = None
+        self.current = self._build(self._env, {}, {}, generation=0)
+        if self.path:
+            try:
+                self.reload_file()
+            except ConfigError as e:
+                print(f"[CONFIG] Ignoring invalid {self.path}: {e}", flush=True)
+
+    def on_change(self, listener: Callable[[ConfigSnapshot], None]):
+        self._listeners.append(listener)
+        listener(self.current)
+
+    def _build(self, env, file, admin, generation) -> ConfigSnapshot:
+        errors, values, sources = [], {}, {}
+        for name, setting in self.settings.items():
+            for source, layer in (("admin", admin), ("file", file), ("env", env)):
+                if name in layer:
+                    raw = layer[name]
+                    break
+            try:
+                value = setting.parse(raw)
+            except (TypeError, ValueError) as e:
+                errors.append(f"{name}: {e}")
+                continue
+            if setting.check is not None and not setting.check(value):
+                errors.append(f"{name}: {value!r} out of range{' (' + setting.hint + ')' if setting.hint else ''}")
+                continue
+            values[name] = value
+            sources[name] = source
+        if errors:
+            raise ConfigError(errors)
+        snapshot = ConfigSnapshot(values, generation, sources)
+        if self._check is not None:
+            errors = self._check(snapshot)
+            if errors:
+                raise ConfigError(errors)
+        return snapshot
+
+    def _publish(self, file, admin, source: str) -> ConfigSnapshot:
+        with self._lock:
+            snapshot = self._build(self._env, file, admin, self.current.generation + 1)
+            self._file, self._admin = file, admin
+            if snapshot.version == self.current.version:
+                return self.current
+            self.current = snapshot
+        print(f"[CONFIG] Applied generation {snapshot.generation} (version {snapshot.version}) from {source}", flush=True)
+        for listener in self._listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                print(f"[ERROR] Config listener failed: {e}", flush=True)
+        return snapshot
+
+    def update(self, changes: Dict[str, Any]) -> ConfigSnapshot:
+        """Apply admin overrides; a None value drops that override."""
+        unknown = sorted(set(changes) - set(self.settings))
+        if unknown:
+            raise ConfigError([f"{name}: unknown setting" for name in unknown])
+        with self._lock:
+            admin = dict(self._admin)
+            for name, value in changes.items():
+                if value is None:
+                    admin.pop(name, None)
+                else:
+                    admin[name] = value
+            return self._publish(self._file, admin, "admin")
+
+    def reload_file(self) -> ConfigSnapshot:
+        try:
+            mtime = os.stat(self.path).st_mtime
+            raw = read_env_file(self.path)
+        except FileNotFoundError:
+            mtime, raw = None, {}
+        file = {k: v for k, v in raw.items() if k in self.settings}
+        with self._lock:
+            self._file_mtime = mtime
+            return self._publish(file, self._admin, self.path)
+
+    def start_watcher(self):
+        if not self.path:
+            return
+        threading.Thread(target=self._watch, name="config-watcher", daemon=True).start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_s)
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except FileNotFoundError:
+                mtime = None
+            if mtime == self._file_mtime:
+                continue
+            try:
+                self.reload_file()
+            except ConfigError as e:
+                self._file_mtime = mtime  # don't retry until the file changes again
+                print(f"[CONFIG] Rejected {self.path}: {e}", flush=True)
+            except Exception as e:
+                print(f"[ERROR] Config reload failed: {e}", flush=True)
@@ -0,0 +1,115 @@
+"""On-demand statistical profiler over sys._current_frames().
+
+`StackSampler.profile()` blocks for the requested window (run it in an
+executor thread, never on the event loop), snapshots every thread's stack at
+a fixed interval and returns collapsed stacks ("thread;outer;...;leaf N",
+the input format of flamegraph.pl / speedscope) plus a top-N table.
+
+Overhead is capped: if taking a sample costs more than `max_overhead` of the
+interval, the interval is stretched. Only one profile runs at a time.
+
+Stdlib-only and duplicated per service like otel_init.py.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+def _frame_label(code) -> str:
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class StackSampler:
+    def __init__(self, interval_s: float = 0.01, max_overhead: float = 0.02, max_seconds: float = 60.0):
+        self.interval_s = interval_s
+        self.max_overhead = max_overhead
+        self.max_seconds = max_seconds
+        self._lock = threading.Lock()
+        self._labels: Dict[object, str] = {}  # code object -> label, for the running profile only
+
+    @property
+    def busy(self) -> bool:
+        return self._lock.locked()
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = _frame_label(code)
+        return label
+
+    def _sample(self, own_ident: int, thread_filter: Optional[str], stacks: Counter):
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            thread_name = names.get(ident, f"thread-{ident}")
+            if thread_filter and thread_filter not in thread_name:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.append(thread_name)
+            stacks[tuple(reversed(stack))] += 1
+
+    def profile(self, seconds: float, top: int = 20, thread_filter: Optional[str] = None) -> dict:
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("a profile is already running")
+        try:
+            seconds = min(max(seconds, 0.1), self.max_seconds)
+            stacks: Counter = Counter()
+            own = threading.get_ident()
+            samples = 0
+            sampling_time = 0.0
+            interval = self.interval_s
+            start = time.perf_counter()
+            deadline = start + seconds
+            while True:
+                t0 = time.perf_counter()
+                if t0 >= deadline:
+                    break
+                self._sample(own, thread_filter, stacks)
+                cost = time.perf_counter() - t0
+                sampling_time += cost
+                samples += 1
+                # stretch the interval so sampling stays under max_overhead of wall time
+                interval = max(self.interval_s, cost / self.max_overhead)
+                time.sleep(max(0.0, min(interval - cost, deadline - time.perf_counter())))
+            wall = time.perf_counter() - start
+        finally:
+            # don't pin code objects (and their modules) between profiles
+            self._labels.clear()
+            self._lock.release()
+        return self._result(stacks, samples, wall, sampling_time, top)
+
+    def _result(self, stacks: Counter, samples: int, wall: float, sampling_time: float, top: int) -> dict:
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        for stack, n in stacks.items():
+            self_counts[stack[-1]] += n
+            for label in set(stack[1:]):
+                total_counts[label] += n
+        thread_samples = sum(stacks.values())
+        rows = []
+        for label, n in total_counts.most_common(top):
+            rows.append({
+                "function": label,
+                "total_samples": n,
+                "total_pct": round(100.0 * n / thread_samples, 2) if thread_samples else 0.0,
+                "self_samples": self_counts.get(label, 0),
+                "self_pct": round(100.0 * self_counts.get(label, 0) / thread_samples, 2) if thread_samples else 0.0,
+            })
+        collapsed = "\n".join(f"{';'.join(stack)} {n}" for stack, n in stacks.most_common())
+        return {
+            "seconds": round(wall, 3),
+            "samples": samples,
+            "effective_interval_ms": round(1000 * wall / samples, 2) if samples else None,
+            "overhead_pct": round(100.0 * sampling_time / wall, 2) if wall else 0.0,
+            "top": rows,
+            "collapsed": collapsed,
+        }
@@ -0,0 +1,259 @@
+"""A-side client for B implementing the A → B row of docs/RETRY.md.
+
+- retries 429/503 and connect failures (nothing was sent); never 504 or
+  other 4xx/5xx
+- retries its own timeout (A_TO_B_TIMEOUT_S) only when the request carries an
+  Idempotency-Key: B may still be working on it, and with
+  IDEMPOTENCY_ENABLED=true the retry attaches to that call instead of
+  running it again. Without a key a timed-out request is not retried. A 504
+  means B has already given up and released the key, so it is never retried
+- exponential backoff with full jitter: sleep = random(0, min(cap, base * 2^n)),
+  and if B sent Retry-After, the max of the two
+- at most A_TO_B_MAX_RETRIES retries, each attempt bounded by A_TO_B_TIMEOUT_S
+- a retry budget: every original request earns `budget_ratio` of a retry token,
+  every retry spends one, so retries stay ≤ ~30% of originals during an
+  outage instead of multiplying load
+- one shared aiohttp session (keep-alive pool) for all requests
+- every attempt of a request carries the same Idempotency-Key, so B
+  (IDEMPOTENCY_ENABLED=true) runs a retried request once. Timeout retries
+  spend the same budget and count toward the same max_retries as the rest
+
+Every attempt is recorded in `ClientStats` so retry amplification from A shows
+up in the load tools' output. Copy of test/a_client.py.
+"""
+
+import asyncio
+import os
+import random
+import sys
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional
+
+import aiohttp
+
+RETRY_STATUSES = (429, 503)
+
+def read_env_file(path: str) -> Dict[str, str]:
+    """Parse KEY=VALUE lines, ignoring blanks, comments and inline `# ...` (as b/runtime_config.py)."""
+    values = {}
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#") or "=" not in line:
+                continue
+            key, _, value = line.partition("=")
+            value = value.split(" #", 1)[0].split("\t#", 1)[0].strip().strip('"').strip("'")
+            values[key.strip()] = value
+    return values
+
+@dataclass
+class RetryPolicy:
+    timeout_s: float = 30.0
+    max_retries: int = 2
+    backoff_base_s: float = 0.2
+    backoff_cap_s: float = 2.0
+    budget_ratio: float = 0.3
+    budget_min_tokens: float = 10.0  # lets a quiet client still retry a few times
+
+    @classmethod
+    def from_env(cls, env_file: Optional[str] = None, **overrides) -> "RetryPolicy":
+        """A_TO_B_TIMEOUT_S / A_TO_B_MAX_RETRIES from `env_file` if given, else the environment."""
+        env = read_env_file(env_file) if env_file else os.environ
+        policy = cls(timeout_s=float(env.get("A_TO_B_TIMEOUT_S", cls.timeout_s)),
+                     max_retries=int(env.get("A_TO_B_MAX_RETRIES", cls.max_retries)))
+        for key, value in overrides.items():
+            if value is not None:
+                setattr(policy, key, value)
+        return policy
+
+    def backoff(self, retry: int, retry_after: Optional[float]) -> float:
+        delay = random.uniform(0, min(self.backoff_cap_s, self.backoff_base_s * 2 ** retry))
+        return max(delay, retry_after or 0.0)
+
+class RetryBudget:
+    """Token bucket: originals deposit `ratio`, retries withdraw 1."""
+
+    def __init__(self, ratio: float, min_tokens: float):
+        self.ratio = ratio
+        self.max_tokens = max(min_tokens, 1.0)
+        self.tokens = self.max_tokens
+
+    def deposit(self):
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens < 1.0:
+            return False
+        self.tokens -= 1.0
+        return True
+
+@dataclass
+class Attempt:
+    status: int              # 0 = no HTTP response
+    latency_ms: float
+    error: Optional[str] = None
+    retry_after: Optional[str] = None
+    backoff_s: float = 0.0   # sleep before the next attempt, if any
+
+@dataclass
+class Result:
+    status: int
+    latency_ms: float        # first send to final answer, backoff included
+    attempts: List[Attempt] = field(default_factory=list)
+    body: Optional[str] = None
+    headers: Dict[str, str] = field(default_factory=dict)
+    give_up: Optional[str] = None  # why the last failure was not retried
+
+    @property
+    def success(self) -> bool:
+        return 200 <= self.status < 300
+
+    @property
+    def error(self) -> Optional[str]:
+        return self.attempts[-1].error if self.attempts else None
+
+class ClientStats:
+    def __init__(self):
+        self.requests = 0
+        self.attempts = 0
+        self.by_attempt: Counter = Counter()   # (attempt number, status) -> count
+        self.attempt_latency_ms: Counter = Counter()  # attempt number -> total ms
+        self.give_up: Counter = Counter()      # reason -> count
+        self.budget_denied = 0
+        self.backoff_s = 0.0
+
+    def record(self, result: Result):
+        self.requests += 1
+        self.attempts += len(result.attempts)
+        for n, a in enumerate(result.attempts, 1):
+            self.by_attempt[(n, a.status)] += 1
+            self.attempt_latency_ms[n] += a.latency_ms
+            self.backoff_s += a.backoff_s
+        if result.give_up:
+            self.give_up[result.give_up] += 1
+
+    @property
+    def amplification(self) -> float:
+        return self.attempts / self.requests if self.requests else 0.0
+
+    def print_summary(self):
+        print(f"\nClient attempts: {self.attempts} for {self.requests} requests "
+              f"(amplification x{self.amplification:.2f}, budget denied {self.budget_denied}, "
+              f"backoff {self.backoff_s:.1f}s total)")
+        for n in sorted(self.attempt_latency_ms):
+            statuses = {s: c for (k, s), c in sorted(self.by_attempt.items()) if k == n}
+            count = sum(statuses.values())
+            mean = self.attempt_latency_ms[n] / count if count else 0.0
+            print(f"  attempt {n}: {count} sent, mean {mean:.0f}ms, status {dict(statuses)}")
+        if self.give_up:
+            print("  not retried: " + ", ".join(f"{k}={v}" for k, v in self.give_up.most_common()))
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+class BClient:
+    """async with BClient(url, policy) as client: result = await client.get("/process", params)"""
+
+    def __init__(self, base_url: str, policy: Optional[RetryPolicy] = None, pool_size: int = 100,
+                 idempotency_keys: bool = True):
+        self.base_url = base_url.rstrip("/")
+        self.policy = policy or RetryPolicy.from_env()
+        self.pool_size = pool_size
+        self.idempotency_keys = idempotency_keys
+        self.budget = RetryBudget(self.policy.budget_ratio, self.policy.budget_min_tokens)
+        self.stats = ClientStats()
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self) -> "BClient":
+        connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=30)
+        self.session = aiohttp.ClientSession(connector=connector,
+                                             timeout=aiohttp.ClientTimeout(total=self.policy.timeout_s))
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    async def _attempt(self, url: str, params: Optional[Dict], headers: Optional[Dict]):
+        start = time.perf_counter()
+        try:
+            async with self.session.get(url, params=params, headers=headers) as r:
+                body = await r.text()
+                attempt = Attempt(r.status, (time.perf_counter() - start) * 1000,
+                                  retry_after=r.headers.get("Retry-After"))
+                return attempt, body, dict(r.headers), None
+        except aiohttp.ClientConnectorError as e:
+            # connection never established: nothing reached B, always safe to retry
+            return Attempt(0, (time.perf_counter() - start) * 1000, error=str(e)), None, {}, "connect"
+        except asyncio.TimeoutError:
+            return Attempt(0, (time.perf_counter() - start) * 1000, error="timeout"), None, {}, None
+        except aiohttp.ClientError as e:
+            return Attempt(0, (time.perf_counter() - start) * 1000, error=str(e)), None, {}, None
+
+    def _retryable(self, attempt: Attempt, failure: Optional[str], keyed: bool) -> Optional[str]:
+        """None if this attempt may be retried, else the reason it may not."""
+        if failure == "connect" or attempt.status in RETRY_STATUSES:
+            return None
+        if attempt.error == "timeout" and keyed:
+            return None  # B may still be running it; the same key attaches rather than re-runs
+        if attempt.status == 504 or attempt.error == "timeout":
+            return "timeout"
+        return f"status_{attempt.status}" if attempt.status else "network_error"
+
+    async def get(self, path: str, params: Optional[Dict] = None, headers: Optional[Dict] = None) -> Result:
+        url = f"{self.base_url}{path}"
+        if self.idempotency_keys:
+            headers = {"Idempotency-Key": uuid.uuid4().hex, **(headers or {})}
+        keyed = bool(headers) and "Idempotency-Key" in headers
+        started = time.perf_counter()
+        self.budget.deposit()
+        attempts: List[Attempt] = []
+        while True:
+            attempt, body, resp_headers, failure = await self._attempt(url, params, headers)
+            attempts.append(attempt)
+            give_up = None
+            if 200 <= attempt.status < 300:
+                break
+            give_up = self._retryable(attempt, failure, keyed)
+            if give_up is None and len(attempts) > self.policy.max_retries:
+                give_up = "max_retries"
+            if give_up is None and not self.budget.withdraw():
+                give_up = "budget"
+                self.stats.budget_denied += 1
+            if give_up is not None:
+                break
+            attempt.backoff_s = self.policy.backoff(len(attempts) - 1, parse_retry_after(attempt.retry_after))
+            await asyncio.sleep(attempt.backoff_s)
+        result = Result(attempt.status, (time.perf_counter() - started) * 1000, attempts,
+                        body, resp_headers, give_up)
+        self.stats.record(result)
+        return result
+
+def add_policy_args(parser):
+    """--env-file / --timeout / --max-retries / --no-retries for the load tools."""
+    parser.add_argument("--env-file", help="Take A_TO_B_TIMEOUT_S / A_TO_B_MAX_RETRIES from this file "
+                                           "(e.g. config/tunable.env); default: environment")
+    parser.add_argument("--timeout", type=float, help="Per-attempt timeout (s), overrides A_TO_B_TIMEOUT_S")
+    parser.add_argument("--max-retries", type=int, help="Overrides A_TO_B_MAX_RETRIES")
+    parser.add_argument("--no-retries", action="store_true", help="Single attempt per request")
+
+def policy_from_args(args) -> RetryPolicy:
+    policy = RetryPolicy.from_env(args.env_file, timeout_s=args.timeout, max_retries=args.max_retries)
+    if args.no_retries:
+        policy.max_retries = 0
+    print(f"A→B policy: timeout {policy.timeout_s:g}s, max retries {policy.max_retries}, "
+          f"backoff {policy.backoff_base_s:g}-{policy.backoff_cap_s:g}s, budget {policy.budget_ratio:.0%}",
+          file=sys.stderr)
+    return policy
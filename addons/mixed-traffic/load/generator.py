@@ -1,22 +1,22 @@
-import asyncio, os, random, time, httpx, argparse
+import asyncio, os, random, time, argparse
 from collections import Counter
 
+from a_client import BClient, add_policy_args, policy_from_args
+
 B_URL = os.getenv("B_URL", "http://localhost:8080/process")
 
 async def one(client, device_id, ms=None, mode=None):
     params = {"device_id": device_id}
     if ms is not None: params["ms"] = ms
     if mode is not None: params["mode"] = mode
-    try:
-        r = await client.get(B_URL, params=params, timeout=5.0)
-        return r.status_code
-    except Exception:
-        return -1
+    result = await client.get("", params=params)
+    return result.status if result.status else -1
 
-async def main(rate, duration, normals, slows, hangs):
+async def main(rate, duration, normals, slows, hangs, policy):
     t_end = time.time()+duration
     results = Counter()
-    async with httpx.AsyncClient() as client:
+    tasks = []
+    async with BClient(B_URL, policy) as client:
         while time.time() < t_end:
             r = random.random()
             if hangs and r < 0.05:
@@ -26,11 +26,13 @@ async def main(rate, duration, normals, slows, hangs):
             else:
                 device = random.choice(normals); mode = "normal"; ms = None
 
-            asyncio.create_task(one(client, device, ms, mode))
+            tasks.append(asyncio.create_task(one(client, device, ms, mode)))
             results["scheduled"] += 1
             await asyncio.sleep(1.0/rate)
-        await asyncio.sleep(5)
+        statuses = Counter(await asyncio.gather(*tasks))
     print("Sent:", results["scheduled"])
+    print("Final status:", dict(sorted(statuses.items())))
+    client.stats.print_summary()
 
 if __name__ == "__main__":
     p = argparse.ArgumentParser()
@@ -39,9 +41,10 @@ if __name__ == "__main__":
     p.add_argument("--normal", type=int, default=80)
     p.add_argument("--slow", type=int, default=3)
     p.add_argument("--hang", type=int, default=1)
+    add_policy_args(p)
     args = p.parse_args()
 
     normals = [f"dev-{i}" for i in range(1, args.normal+1)]
     slows   = [f"dev-slow-{i}" for i in range(1, args.slow+1)]
     hangs   = [f"dev-hang-{i}" for i in range(1, args.hang+1)]
-    asyncio.run(main(args.rate, args.duration, normals, slows, hangs))
\ No newline at end of file
+    asyncio.run(main(args.rate, args.duration, normals, slows, hangs, policy_from_args(args)))
\ No newline at end of file
@@ -1,25 +1,51 @@
-from fastapi import FastAPI, HTTPException, Response
+from startup_timing import StartupTimer
+STARTUP = StartupTimer("svc-b")
+
+from fastapi import Body, FastAPI, Header, HTTPException, Response
+from fastapi.responses import PlainTextResponse
 import os, asyncio, time, uuid, json
 import grpc
 import psutil
-import numpy as np
 import threading
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
-from opentelemetry.instrumentation.grpc import GrpcInstrumentorClient
-from opentelemetry.instrumentation.aiohttp_client import AioHttpClientInstrumentor
-from prometheus_client import Gauge, Counter, Histogram, start_http_server
-from otel_init import init_tracing
-
-init_tracing("svc-b")
-FastAPIInstrumentor().instrument()
-GrpcInstrumentorClient().instrument()
-AioHttpClientInstrumentor().instrument()
+from prometheus_client import Gauge, Counter, Histogram, Info, start_http_server
+from capture import TrafficCapture
+from sketch import LatencyBreakdown
+from loop_health import LAG_BUCKETS_MS, LoopMonitor, loop_implementation
+from sampler import ProfilerBusy, StackSampler
+from memdebug import BASELINE, KEY_TYPES, AllocationTracker
+from server_timing import format_server_timing, from_metadata, parse_server_timing
+from runtime_config import ConfigError, RuntimeConfig, Setting, non_negative, parse_bool, positive
+from bulkhead import Bulkhead, BulkheadFull
+from capacity import CapacityModel
+from idempotency import IdempotencyCache, KeyConflict
+from shedding import FULL, STREAMING, LoadShedder, Shed
 
 import sys
 sys.path.append("/app/gen")
 import device_proxy_pb2 as pb
 import device_proxy_pb2_grpc as rpc
+STARTUP.mark("imports")
+
+# Fast start: serve first, then load the OTel SDK/exporter and client instrumentation
+FAST_START = os.getenv("FAST_START", "false").lower() == "true"
+
+def init_instrumentation():
+    from otel_init import init_tracing
+    from opentelemetry.instrumentation.grpc import GrpcInstrumentorClient
+    from opentelemetry.instrumentation.aiohttp_client import AioHttpClientInstrumentor
+    init_tracing("svc-b")
+    GrpcInstrumentorClient().instrument()
+    AioHttpClientInstrumentor().instrument()
+
+# FastAPI has to be patched before the app exists; its tracer resolves lazily once
+# init_instrumentation() installs the provider.
+FastAPIInstrumentor().instrument()
+if not FAST_START:
+    init_instrumentation()
+    STARTUP.mark("instrumentation")
 
 start_http_server(8081)
 
@@ -30,8 +56,28 @@ FAILED = Counter("b_failed", "Failed requests", ["endpoint"])
 ERRS = Counter("b_errors_total", "Total error responses", ["code","endpoint"])
 LAT  = Histogram("b_e2e_ms", "End-to-end latency (ms)",
                  buckets=[50,100,200,500,1000,2000,3000,5000,10000],
-                 labelnames=["endpoint"])
+                 labelnames=["endpoint", "config_version"])
+HOP = Histogram("b_hop_ms", "Per-hop latency of /process from C's server-timing trailer (ms)",
+                 buckets=[1,5,10,50,100,200,500,1000,2000,3000,5000,10000],
+                 labelnames=["hop"])
+CONFIG_INFO = Info("b_config", "Active runtime configuration version")
+STARTUP_PHASE = Gauge("b_startup_phase_seconds", "Startup time spent per phase", ["phase"])
+STARTUP_READY = Gauge("b_startup_ready_seconds", "Process start to app ready (s)")
+LOOP_LAG = Histogram("b_loop_lag_ms", "Event loop lag: how late a periodic probe wakes up (ms)",
+                     buckets=LAG_BUCKETS_MS)
+LOOP_BLOCKED = Counter("b_loop_blocked", "Times the event loop was blocked past LOOP_BLOCKED_THRESHOLD_MS")
+LOOP_INFO = Info("b_event_loop", "Event loop implementation")
 AVAILABLE = Gauge("b_available_c_instances", "Available (idle & healthy) C instances")
+BULKHEAD_INFLIGHT = Gauge("b_bulkhead_inflight", "Requests holding a bulkhead slot", ["device_class"])
+BULKHEAD_QUEUED = Gauge("b_bulkhead_queued", "Requests waiting for a bulkhead slot", ["device_class"])
+BULKHEAD_UTILIZATION = Gauge("b_bulkhead_utilization", "Bulkhead slots in use / limit", ["device_class"])
+BULKHEAD_REJECTED = Counter("b_bulkhead_rejected", "Requests rejected by a full bulkhead", ["device_class", "reason"])
+BULKHEAD_WAIT = Histogram("b_bulkhead_wait_ms", "Time queued for a bulkhead slot (ms)", ["device_class"],
+                          buckets=[1,5,10,50,100,200,500,1000,2000,5000])
+IDEMPOTENCY_REQUESTS = Counter("b_idempotency_requests", "/process requests with an Idempotency-Key by outcome",
+                               ["result"])
+IDEMPOTENCY_SAVED = Counter("b_idempotency_saved_c_ms",
+                            "C slot time duplicates didn't use: the original's c_total - sem_wait (ms)")
 
 # CPU and Memory metrics
 CPU_USAGE = Gauge("b_cpu_usage_percent", "Current CPU usage percentage")
@@ -40,6 +86,7 @@ MEM_USAGE_CONTAINER = Gauge("b_memory_usage_container_percent", "Memory usage re
 BATCH_PROCESSING = Gauge("b_batch_processing", "Whether batch processing is active (0/1)")
 BATCH_SIZE = Histogram("b_batch_size", "Size of processed batches", 
                        buckets=[100, 500, 1000, 5000, 10000, 50000, 100000, 500000, 1000000])
+SHED = Counter("b_shed", "Load-shedding decisions under CPU/memory pressure", ["reason"])
 
 # Keep legacy metrics for compatibility
 REQS = TOTAL_RECEIVED
@@ -56,12 +103,27 @@ CPU_USAGE.set(0)
 
 app = FastAPI()
 
+# Container memory limit (must match mem_limit in docker-compose.yml)
+CONTAINER_MEM_LIMIT = int(os.getenv("CONTAINER_MEM_LIMIT_MB", "256")) * 1024 * 1024
+
+# tracemalloc snapshots for /debug/memory; with TRACEMALLOC_AUTO_PCT set, tracing starts
+# now (baseline snapshot) and the monitor thread snapshots each time memory crosses it
+TRACEMALLOC_AUTO_PCT = float(os.getenv("TRACEMALLOC_AUTO_PCT", "0"))
+ALLOCATIONS = AllocationTracker(max_snapshots=int(os.getenv("TRACEMALLOC_MAX_SNAPSHOTS", "10")),
+                                frames=int(os.getenv("TRACEMALLOC_FRAMES", "10")),
+                                auto_threshold_pct=TRACEMALLOC_AUTO_PCT or None,
+                                auto_cooldown_s=float(os.getenv("TRACEMALLOC_AUTO_COOLDOWN_S", "60")))
+if TRACEMALLOC_AUTO_PCT:
+    ALLOCATIONS.start()
+    ALLOCATIONS.take(BASELINE)
+
+# Priority load shedding from the monitor's readings; thresholds come from CONFIG below
+SHEDDER = LoadShedder(on_decision=lambda reason: SHED.labels(reason=reason).inc())
+
 # Background thread to monitor system metrics
 def monitor_system_metrics():
-    # Container memory limit (hardcoded to match docker-compose.yml)
-    CONTAINER_MEM_LIMIT = 256 * 1024 * 1024  # 256 MB in bytes
-    
-    print(f"[INIT] Memory monitoring started. Container limit: 256MB", flush=True)
+    limit_mb = CONTAINER_MEM_LIMIT / (1024 * 1024)
+    print(f"[INIT] Memory monitoring started. Container limit: {limit_mb:.0f}MB", flush=True)
     
     while True:
         try:
@@ -77,11 +139,13 @@ def monitor_system_metrics():
             # Log every 5 seconds for debugging
             current_time = int(time.time())
             if current_time % 5 == 0:
-                print(f"[METRICS] CPU: {cpu_percent:.1f}% | Memory: {mem_bytes/1024/1024:.1f}MB ({mem_percent_container:.1f}% of 256MB)", flush=True)
+                print(f"[METRICS] CPU: {cpu_percent:.1f}% | Memory: {mem_bytes/1024/1024:.1f}MB ({mem_percent_container:.1f}% of {limit_mb:.0f}MB)", flush=True)
             
             # Update Prometheus metrics
             CPU_USAGE.set(cpu_percent)
             MEM_USAGE.set(mem_percent_container)  # Use container-based percentage
+            ALLOCATIONS.maybe_auto_snapshot(mem_percent_container)
+            SHEDDER.observe(cpu_percent, mem_percent_container)
             
             time.sleep(1)
         except Exception as e:
@@ -91,28 +155,177 @@ def monitor_system_metrics():
 # Start monitoring thread
 monitoring_thread = threading.Thread(target=monitor_system_metrics, daemon=True)
 monitoring_thread.start()
+STARTUP.mark("metrics")
 
 C_TARGET = os.getenv("C_TARGET", "c:50051")
+# Optional dedicated C subsets per device class (default: both share C_TARGET)
+C_TARGET_FAST = os.getenv("C_TARGET_FAST") or C_TARGET
+C_TARGET_SLOW = os.getenv("C_TARGET_SLOW") or C_TARGET
+ENABLE_RETRY_AFTER_HEADERS = os.getenv("ENABLE_RETRY_AFTER_HEADERS", "false").lower() == "true"
+RETRY_AFTER_SECONDS = float(os.getenv("RETRY_AFTER_SECONDS", "0.2"))
 
 # Configuration from baseline.env or tunable.env
-CONNECT_TIMEOUT_S = float(os.getenv("CONNECT_TIMEOUT_S", "1.0"))
-REQUEST_TIMEOUT_S = float(os.getenv("REQUEST_TIMEOUT_S", "10.0"))  # B→C timeout
 MAX_B_TO_C_RETRIES = int(os.getenv("MAX_B_TO_C_RETRIES", "2"))
 ENABLE_B_TO_C_RETRIES = os.getenv("ENABLE_B_TO_C_RETRIES", "true").lower() == "true"
 B_TO_C_RETRY_BACKOFF_MS = int(os.getenv("B_TO_C_RETRY_BACKOFF_MS", "100"))
-MAP_RESOURCE_EXHAUSTED_TO_429 = os.getenv("MAP_RESOURCE_EXHAUSTED_TO_429", "false").lower() == "true"
-MAP_UNAVAILABLE_TO_503 = os.getenv("MAP_UNAVAILABLE_TO_503", "false").lower() == "true"  
-MAP_DEADLINE_EXCEEDED_TO_504 = os.getenv("MAP_DEADLINE_EXCEEDED_TO_504", "false").lower() == "true"
+
+# Live-tunable settings: env at startup, then RUNTIME_CONFIG_FILE and POST /admin/config
+CONFIG = RuntimeConfig([
+    Setting("CONNECT_TIMEOUT_S", float, "1.0", positive),
+    Setting("REQUEST_TIMEOUT_S", float, "10.0", positive),  # B→C timeout
+    Setting("MAP_RESOURCE_EXHAUSTED_TO_429", parse_bool, "false"),
+    Setting("MAP_UNAVAILABLE_TO_503", parse_bool, "false"),
+    Setting("MAP_DEADLINE_EXCEEDED_TO_504", parse_bool, "false"),
+    # Per-device-class bulkheads in front of C (limits count concurrent B→C calls)
+    Setting("BULKHEAD_ENABLED", parse_bool, "false"),
+    Setting("BULKHEAD_FAST_LIMIT", int, "15", positive),
+    Setting("BULKHEAD_FAST_QUEUE", int, "30", non_negative),
+    Setting("BULKHEAD_SLOW_LIMIT", int, "6", positive),
+    Setting("BULKHEAD_SLOW_QUEUE", int, "10", non_negative),
+    Setting("BULKHEAD_QUEUE_TIMEOUT_S", float, "1.0", positive),
+    # Resource-pressure shedding of batch/debug work (/process and /health are never shed)
+    Setting("SHED_ENABLED", parse_bool, "false"),
+    Setting("SHED_BATCH_DEGRADE_MEM_PCT", float, "60", positive),  # % of container limit
+    Setting("SHED_BATCH_REFUSE_MEM_PCT", float, "80", positive),
+    Setting("SHED_BATCH_DEFER_S", float, "5.0", non_negative),
+    Setting("SHED_MAX_FULL_BATCHES", int, "1", non_negative),
+    Setting("SHED_CPU_PCT", float, "90", positive),
+], path=os.getenv("RUNTIME_CONFIG_FILE") or None,
+   poll_s=float(os.getenv("RUNTIME_CONFIG_POLL_S", "2.0")))
+CONFIG.on_change(lambda cfg: CONFIG_INFO.info({"version": cfg.version, "generation": str(cfg.generation)}))
+CONFIG.start_watcher()
+
+# Streaming latency sketches per endpoint and device class, served at /__status
+LATENCY_WINDOW_S = float(os.getenv("LATENCY_WINDOW_S", "60"))
+LATENCY = LatencyBreakdown(window_s=LATENCY_WINDOW_S)
+
+# M/G/c model of the C fleet from /process arrivals and C slot-holding times
+# (c_total - sem_wait from C's trailer); served at /__capacity
+C_REPLICAS = int(os.getenv("C_REPLICAS", "21"))  # keep in line with --scale c=N
+CAPACITY_TARGET_P99_MS = float(os.getenv("CAPACITY_TARGET_P99_MS", "0"))  # 0: REQUEST_TIMEOUT_S
+CAPACITY = CapacityModel(C_REPLICAS, window_s=float(os.getenv("CAPACITY_WINDOW_S", "300")),
+                         max_replicas=int(os.getenv("CAPACITY_MAX_REPLICAS", "200")))
+
+def capacity_estimate() -> Dict[str, Any]:
+    target = CAPACITY_TARGET_P99_MS or CONFIG.current.REQUEST_TIMEOUT_S * 1000
+    return CAPACITY.estimate(target)
+
+def observe_c_service(hops: Dict[str, float]):
+    if "c_total" in hops:
+        CAPACITY.observe_service(hops["c_total"] - hops.get("sem_wait", 0.0))
+
+def _capacity_value(*path) -> float:
+    estimate = value = capacity_estimate()
+    for key in path:
+        value = (value or {}).get(key)
+    if value is None:
+        return float("inf") if estimate.get("saturated") and path[0] == "current" else float("nan")
+    return float(value)
+
+for _name, _doc, _path in (
+    ("b_capacity_arrival_rps", "/process arrival rate over the capacity window", ("arrival_rps",)),
+    ("b_capacity_service_ms", "Mean time a call holds a C slot (ms)", ("service_ms", "mean_ms")),
+    ("b_capacity_utilization", "Predicted C utilization (offered load / C_REPLICAS)", ("current", "utilization")),
+    ("b_capacity_wait_probability", "Erlang-C probability that a call queues for C", ("current", "wait_probability")),
+    ("b_capacity_wait_p99_ms", "Predicted p99 queueing delay in C (ms)", ("current", "wait_p99_ms")),
+    ("b_capacity_p99_ms", "Predicted p99 C response time, wait + service (ms)", ("current", "p99_ms")),
+    ("b_capacity_recommended_replicas", "Smallest C replica count meeting the p99 target", ("recommended_replicas",)),
+):
+    Gauge(_name, _doc).set_function(lambda p=_path: _capacity_value(*p))
+
+# Idempotency-Key dedup for /process: duplicates attach to the running call or replay its success
+IDEMPOTENCY_ENABLED = os.getenv("IDEMPOTENCY_ENABLED", "false").lower() == "true"
+IDEMPOTENCY = IdempotencyCache(max_keys=int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000")),
+                               ttl_s=float(os.getenv("IDEMPOTENCY_TTL_S", "300")),
+                               keep=lambda resp: 200 <= resp.status_code < 300)
+Gauge("b_idempotency_keys", "Idempotency keys held (running or completed)").set_function(lambda: len(IDEMPOTENCY))
+Gauge("b_idempotency_inflight", "Idempotency keys whose original request is still running").set_function(
+    lambda: IDEMPOTENCY.inflight)
+
+def device_class(device_id: str) -> str:
+    # Same split as C's get_device_url (d-slow vs d-fast)
+    return "slow" if "slow" in device_id.lower() else "fast"
+
+# One bulkhead per device class so a slow-device burst can't take every C slot
+BULKHEADS = {cls: Bulkhead(cls, 1) for cls in ("fast", "slow")}
+
+def resize_bulkheads(cfg):
+    BULKHEADS["fast"].resize(cfg.BULKHEAD_FAST_LIMIT, cfg.BULKHEAD_FAST_QUEUE, cfg.BULKHEAD_QUEUE_TIMEOUT_S)
+    BULKHEADS["slow"].resize(cfg.BULKHEAD_SLOW_LIMIT, cfg.BULKHEAD_SLOW_QUEUE, cfg.BULKHEAD_QUEUE_TIMEOUT_S)
+
+resize_bulkheads(CONFIG.current)
+CONFIG.on_change(resize_bulkheads)
+for _cls, _bulkhead in BULKHEADS.items():
+    BULKHEAD_INFLIGHT.labels(device_class=_cls).set_function(lambda b=_bulkhead: b.inflight)
+    BULKHEAD_QUEUED.labels(device_class=_cls).set_function(lambda b=_bulkhead: b.queued)
+    BULKHEAD_UTILIZATION.labels(device_class=_cls).set_function(lambda b=_bulkhead: b.utilization)
+
+def configure_shedder(cfg):
+    SHEDDER.configure(cfg.SHED_BATCH_DEGRADE_MEM_PCT, cfg.SHED_BATCH_REFUSE_MEM_PCT, cfg.SHED_BATCH_DEFER_S,
+                      cfg.SHED_CPU_PCT, cfg.SHED_MAX_FULL_BATCHES)
+
+configure_shedder(CONFIG.current)
+CONFIG.on_change(configure_shedder)
+
+def shed_low_priority(ep: str):
+    """Called first by the debug endpoints; 503 while CPU is saturated"""
+    if not CONFIG.current.SHED_ENABLED:
+        return
+    try:
+        SHEDDER.check_low_priority()
+    except Shed as e:
+        ERRS.labels(code="503", endpoint=ep).inc()
+        raise HTTPException(status_code=503, detail=str(e), headers=retry_after_headers())
+
+def retry_after_headers() -> Optional[Dict[str, str]]:
+    return {"Retry-After": f"{RETRY_AFTER_SECONDS:g}"} if ENABLE_RETRY_AFTER_HEADERS else None
+
+# Event-loop lag probe and blocked-loop stack dumps (started in on_startup)
+LOOP_MONITOR = LoopMonitor(LOOP_LAG, LOOP_BLOCKED,
+                           interval_s=float(os.getenv("LOOP_PROBE_INTERVAL_MS", "100")) / 1000,
+                           slow_threshold_ms=float(os.getenv("LOOP_BLOCKED_THRESHOLD_MS", "100")))
+
+# On-demand sampling profiler for /debug/profile; runs on its own thread so a busy
+# default executor (batch jobs) can't delay it
+PROFILER = StackSampler(interval_s=float(os.getenv("PROFILE_INTERVAL_MS", "10")) / 1000,
+                        max_overhead=float(os.getenv("PROFILE_MAX_OVERHEAD", "0.02")),
+                        max_seconds=float(os.getenv("PROFILE_MAX_SECONDS", "60")))
+PROFILE_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="profiler")
+
+# Optional traffic capture of /process for later replay (see test/replay-capture.py)
+CAPTURE_ENABLED = os.getenv("CAPTURE_ENABLED", "false").lower() == "true"
+CAPTURE_PATH = os.getenv("CAPTURE_PATH", "/captures/b-traffic.bcap")
+CAPTURE_QUEUE_SIZE = int(os.getenv("CAPTURE_QUEUE_SIZE", "100000"))
+CAPTURE_MAX_MB = int(os.getenv("CAPTURE_MAX_MB", "512"))
+
+CAPTURE = None
+if CAPTURE_ENABLED:
+    CAPTURE = TrafficCapture(CAPTURE_PATH, queue_size=CAPTURE_QUEUE_SIZE,
+                             max_bytes=CAPTURE_MAX_MB * 1024 * 1024)
+    Gauge("b_capture_records", "Records written to the traffic capture").set_function(lambda: CAPTURE.written)
+    Gauge("b_capture_dropped", "Records dropped by the traffic capture").set_function(lambda: CAPTURE.dropped)
+    app.add_event_handler("shutdown", CAPTURE.close)
+    print(f"[INIT] Traffic capture enabled: {CAPTURE_PATH}", flush=True)
 
 # Setup gRPC channel based on retry configuration
 retry_enabled = 1 if ENABLE_B_TO_C_RETRIES else 0
-CHANNEL = grpc.aio.insecure_channel(
-    C_TARGET,
-    options=[('grpc.lb_policy_name','round_robin'),
-             ('grpc.keepalive_time_ms',15000),
-             ('grpc.enable_retries', retry_enabled)]
-)
+
+def make_channel(target: str) -> grpc.aio.Channel:
+    return grpc.aio.insecure_channel(
+        target,
+        options=[('grpc.lb_policy_name','round_robin'),
+                 ('grpc.keepalive_time_ms',15000),
+                 ('grpc.enable_retries', retry_enabled)]
+    )
+
+CHANNEL = make_channel(C_TARGET)
 STUB = rpc.DeviceProxyStub(CHANNEL)
+# (channel, stub) per device class; a class only gets its own channel when its C_TARGET_* is set
+C_POOLS = {}
+for _cls, _target in (("fast", C_TARGET_FAST), ("slow", C_TARGET_SLOW)):
+    _channel = CHANNEL if _target == C_TARGET else make_channel(_target)
+    C_POOLS[_cls] = (_channel, STUB if _channel is CHANNEL else rpc.DeviceProxyStub(_channel))
+STARTUP.mark("config_grpc")
 
 def cpu_intensive_batch_process(data_size: int, intensity: float = 1.0):
     """
@@ -120,6 +333,8 @@ def cpu_intensive_batch_process(data_size: int, intensity: float = 1.0):
     - data_size: Number of records to process
     - intensity: Resource intensity (1.0 = normal, 2.0 = double, etc.)
     """
+    import numpy as np  # loaded on first batch only; most B instances never run one
+    
     BATCH_PROCESSING.set(1)
     BATCH_SIZE.observe(data_size)
     
@@ -238,16 +453,74 @@ def cpu_intensive_batch_process(data_size: int, intensity: float = 1.0):
             del aggregated_data
         BATCH_PROCESSING.set(0)
 
+def streaming_batch_process(data_size: int, intensity: float = 1.0):
+    """
+    Low-memory /batch_process used under memory pressure: the same per-record
+    CPU work, but one record alive at a time and nothing cached or kept
+    """
+    import numpy as np
+    
+    BATCH_PROCESSING.set(1)
+    BATCH_SIZE.observe(data_size)
+    try:
+        record_size = int(10000 * intensity)
+        operations = int(300 * intensity)
+        records = min(data_size, 10000)
+        total = 0.0
+        for _ in range(records):
+            record = np.random.random(record_size)
+            for op in range(operations):
+                result = np.sum(record ** 2)
+                result = np.sqrt(result)
+                result = np.log(result + 1)
+            total += result
+        final_result = total / records if records else 0
+        print(f"Streaming batch processing completed. Final result: {final_result}")
+        return {"records_processed": records, "result": float(final_result)}
+    finally:
+        BATCH_PROCESSING.set(0)
+
+@app.on_event("startup")
+async def on_startup():
+    STARTUP.mark("app_startup")
+    STARTUP.ready()
+    LOOP_MONITOR.start()
+    LOOP_INFO.info({"impl": loop_implementation(asyncio.get_running_loop())})
+    for bulkhead in BULKHEADS.values():
+        bulkhead.bind(asyncio.get_running_loop())  # config reloads resize them from the watcher thread
+    if FAST_START:
+        asyncio.get_running_loop().create_task(deferred_instrumentation())
+    else:
+        STARTUP.export(STARTUP_PHASE, STARTUP_READY)
+        STARTUP.log_once()
+
+async def deferred_instrumentation():
+    # Yield so uvicorn binds the listener before the OTel imports start;
+    # the imports themselves run off the event loop.
+    await asyncio.sleep(0)
+    try:
+        with STARTUP.phase("instrumentation_deferred"):
+            await asyncio.get_running_loop().run_in_executor(None, init_instrumentation)
+    except Exception as e:
+        print(f"[ERROR] Deferred instrumentation failed: {e}", flush=True)
+    STARTUP.export(STARTUP_PHASE, STARTUP_READY)
+    STARTUP.log_once()
+
 @app.get("/health")
 async def health():
     return {"ok": True}
 
 @app.get("/debug/memory")
-async def debug_memory():
-    """Debug endpoint to check memory calculation"""
-    import psutil
-    CONTAINER_MEM_LIMIT = 256 * 1024 * 1024  # 256 MB
-    
+async def debug_memory(snapshot: Optional[str] = None, diff: Optional[str] = None,
+                       target: Optional[str] = None, top: int = 20, key: str = "lineno"):
+    """
+    Debug endpoint to check memory calculation, plus tracemalloc inspection
+    - snapshot: top allocation sites of a named snapshot ("current" for a fresh one)
+    - diff: growth since this snapshot, to `target` (default: now), by size and by count
+    - key: lineno (default), filename or traceback
+    """
+    if snapshot or diff:
+        shed_low_priority("/debug/memory")
     process = psutil.Process()
     mem_info = process.memory_info()
     mem_bytes = mem_info.rss
@@ -255,17 +528,92 @@ async def debug_memory():
     system_percent = process.memory_percent()
     container_percent = (mem_bytes / CONTAINER_MEM_LIMIT) * 100
     
-    return {
+    result = {
         "memory_bytes": mem_bytes,
         "memory_mb": mem_bytes / (1024 * 1024),
         "system_percent": system_percent,
         "container_percent": container_percent,
-        "container_limit_mb": CONTAINER_MEM_LIMIT / (1024 * 1024)
+        "container_limit_mb": CONTAINER_MEM_LIMIT / (1024 * 1024),
+        "tracemalloc": ALLOCATIONS.status(),
     }
+    if key not in KEY_TYPES:
+        raise HTTPException(status_code=400, detail=f"key must be one of {', '.join(KEY_TYPES)}")
+    # snapshot statistics take a while on a big heap, keep them off the loop
+    try:
+        if snapshot:
+            result["top"] = await asyncio.to_thread(
+                ALLOCATIONS.top, None if snapshot == "current" else snapshot, top, key)
+        if diff:
+            result["diff"] = await asyncio.to_thread(ALLOCATIONS.diff, diff, target, top, key)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return result
+
+@app.post("/debug/memory")
+async def control_memory(action: str, name: Optional[str] = None, frames: Optional[int] = None):
+    """
+    tracemalloc control
+    - action=start (optional frames), stop, or snapshot (optional name)
+    """
+    if action == "start":
+        ALLOCATIONS.start(frames)
+        return ALLOCATIONS.status()
+    if action == "stop":
+        ALLOCATIONS.stop()
+        return ALLOCATIONS.status()
+    if action == "snapshot":
+        shed_low_priority("/debug/memory")
+        try:
+            taken = await asyncio.to_thread(ALLOCATIONS.take, name)
+        except RuntimeError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        return {"snapshot": taken, **ALLOCATIONS.status()}
+    raise HTTPException(status_code=400, detail="action must be start, stop or snapshot")
+
+@app.get("/debug/profile")
+async def debug_profile(seconds: float = 10.0, top: int = 20, format: str = "json", thread: Optional[str] = None):
+    """
+    Sample all thread stacks for `seconds` and return a top-N table plus collapsed stacks
+    - format: json (default) or collapsed (flamegraph.pl / speedscope input)
+    - thread: only sample threads whose name contains this, e.g. MainThread
+    """
+    if not 0 < seconds <= PROFILER.max_seconds:
+        raise HTTPException(status_code=400, detail=f"seconds must be in (0, {PROFILER.max_seconds:g}]")
+    try:
+        result = await asyncio.get_running_loop().run_in_executor(
+            PROFILE_EXECUTOR, PROFILER.profile, seconds, top, thread)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if format == "collapsed":
+        return PlainTextResponse(result["collapsed"])
+    return result
 
 @app.get("/__status")
 async def status():
-    return {"available_estimate": AVAILABLE._value.get()}
+    return {"available_estimate": AVAILABLE._value.get(),
+            "bulkheads": {cls: b.snapshot() for cls, b in BULKHEADS.items()},
+            "idempotency": IDEMPOTENCY.snapshot() if IDEMPOTENCY_ENABLED else None,
+            "shedding": SHEDDER.snapshot() if CONFIG.current.SHED_ENABLED else None,
+            "latency_ms": LATENCY.snapshot()}
+
+@app.get("/__capacity")
+async def capacity():
+    """C fleet sizing: arrival rate, service times, M/G/c prediction and recommended replicas"""
+    return capacity_estimate()
+
+@app.get("/admin/config")
+async def get_config():
+    return CONFIG.current.as_dict()
+
+@app.post("/admin/config")
+async def update_config(changes: Dict[str, Any] = Body(...)):
+    """Apply live overrides, e.g. {"REQUEST_TIMEOUT_S": 3.0}; null drops an override"""
+    try:
+        return CONFIG.update(changes).as_dict()
+    except ConfigError as e:
+        raise HTTPException(status_code=400, detail=e.errors)
 
 @app.post("/batch_process")
 async def batch_process(size: int = 10000, intensity: float = 1.0):
@@ -277,83 +625,177 @@ async def batch_process(size: int = 10000, intensity: float = 1.0):
     ep = "/batch_process"
     TOTAL_RECEIVED.labels(endpoint=ep).inc()
     t0 = time.perf_counter()
+    mode = None
+    if CONFIG.current.SHED_ENABLED:
+        try:
+            SHEDDER.check_low_priority()
+            # may wait up to SHED_BATCH_DEFER_S for memory to drop below the refuse watermark
+            mode = await SHEDDER.batch_mode()
+        except Shed as e:
+            FAILED.labels(endpoint=ep).inc()
+            ERRS.labels(code="503", endpoint=ep).inc()
+            raise HTTPException(status_code=503, detail=str(e), headers=retry_after_headers())
     
     try:
         # Run CPU-intensive batch processing in a thread to not block the event loop
         loop = asyncio.get_event_loop()
         result = await loop.run_in_executor(
             None, 
-            cpu_intensive_batch_process, 
+            streaming_batch_process if mode == STREAMING else cpu_intensive_batch_process, 
             size, 
             intensity
         )
         
         e2e = (time.perf_counter()-t0)*1000
-        LAT.labels(endpoint=ep).observe(e2e)
+        LAT.labels(endpoint=ep, config_version=CONFIG.current.version).observe(e2e)
+        LATENCY.observe(ep, "batch", e2e)
         COMPLETED.labels(endpoint=ep).inc()
         
         return {
             "status": "success",
             "processing_time_ms": e2e,
             "records_processed": result["records_processed"],
-            "result": result["result"]
+            "result": result["result"],
+            "mode": mode or FULL
         }
     except Exception as e:
         e2e = (time.perf_counter()-t0)*1000
-        LAT.labels(endpoint=ep).observe(e2e)
+        LAT.labels(endpoint=ep, config_version=CONFIG.current.version).observe(e2e)
+        LATENCY.observe(ep, "batch", e2e)
         FAILED.labels(endpoint=ep).inc()
         ERRS.labels(code="500", endpoint=ep).inc()
         raise HTTPException(status_code=500, detail=f"Batch processing failed: {str(e)}")
+    finally:
+        SHEDDER.batch_done(mode)
 
 @app.get("/process")
-async def process(device_id: str="dev-1", ms: int=3000, mode: str="normal"):
+async def process(device_id: str="dev-1", ms: int=3000, mode: str="normal",
+                  idempotency_key: Optional[str] = Header(None)):
+    if CAPTURE is None:
+        return await dedup_process(device_id, ms, mode, idempotency_key)
+    ts = time.time()
+    t0 = time.perf_counter()
+    status = 500
+    try:
+        resp = await dedup_process(device_id, ms, mode, idempotency_key)
+        status = resp.status_code
+        return resp
+    except HTTPException as e:
+        status = e.status_code
+        raise
+    finally:
+        CAPTURE.record(ts, device_id, ms, mode, status, (time.perf_counter()-t0)*1000)
+
+async def dedup_process(device_id: str, ms: int, mode: str, key: Optional[str]) -> Response:
+    # every request B receives, including duplicates answered from the idempotency cache
+    TOTAL_RECEIVED.labels(endpoint="/process").inc()
+    if not IDEMPOTENCY_ENABLED or not key:
+        return await handle_process(device_id, ms, mode)
+    try:
+        outcome, task = IDEMPOTENCY.join(key, (device_id, int(ms), mode),
+                                         lambda: handle_process(device_id, ms, mode))
+    except KeyConflict as e:
+        IDEMPOTENCY_REQUESTS.labels(result="conflict").inc()
+        FAILED.labels(endpoint="/process").inc()
+        ERRS.labels(code="422", endpoint="/process").inc()
+        raise HTTPException(status_code=422, detail=str(e))
+    IDEMPOTENCY_REQUESTS.labels(result=outcome).inc()
+    # shielded: if this caller goes away, the call keeps running for its duplicates;
+    # a failure is shared with attached duplicates rather than re-run
+    resp = await asyncio.shield(task)
+    if outcome == "miss":
+        return resp
+    hops = parse_server_timing(resp.headers.get("server-timing"))
+    if "c_total" in hops:
+        IDEMPOTENCY_SAVED.inc(max(hops["c_total"] - hops.get("sem_wait", 0.0), 0.0))
+    headers = {k: v for k, v in resp.headers.items() if k != "content-length"}
+    headers["Idempotent-Replayed"] = "true"
+    return Response(content=resp.body, status_code=resp.status_code, headers=headers)
+
+async def handle_process(device_id: str, ms: int, mode: str) -> Response:
     ep = "/process"
-    TOTAL_RECEIVED.labels(endpoint=ep).inc()  # Track total received
+    cfg = CONFIG.current  # one snapshot per request, even if config changes mid-flight
     rid = str(uuid.uuid4())
+    # arrivals at C only: duplicates answered from the idempotency cache never offer it load
+    CAPACITY.observe_arrival()
+    cls = device_class(device_id)
+    channel, stub = C_POOLS[cls]
+    bulkhead = BULKHEADS[cls] if cfg.BULKHEAD_ENABLED else None
+    admitted = False
     t0 = time.perf_counter()
+    call = None
     try:
-        await asyncio.wait_for(CHANNEL.channel_ready(), timeout=CONNECT_TIMEOUT_S)
-        resp = await asyncio.wait_for(
-            STUB.Process(pb.ProcessRequest(device_id=device_id, ms=int(ms), mode=mode)),
-            timeout=REQUEST_TIMEOUT_S
-        )
+        if bulkhead is not None:
+            await bulkhead.acquire()
+            admitted = True
+        t_admit = time.perf_counter()
+        await asyncio.wait_for(channel.channel_ready(), timeout=cfg.CONNECT_TIMEOUT_S)
+        t_call = time.perf_counter()
+        call = stub.Process(pb.ProcessRequest(device_id=device_id, ms=int(ms), mode=mode))
+        resp = await asyncio.wait_for(call, timeout=cfg.REQUEST_TIMEOUT_S)
+        t_done = time.perf_counter()
+        # C's breakdown (sem_wait, d_connect, d_response, d_work, c_total) arrives as a trailer
+        hops = from_metadata(await call.trailing_metadata())
+        observe_c_service(hops)
+        if bulkhead is not None:
+            hops["bulkhead_wait"] = (t_admit - t0) * 1000
+        hops["b_connect"] = (t_call - t_admit) * 1000
+        hops["b_to_c"] = (t_done - t_call) * 1000
+        if "c_total" in hops:
+            hops["grpc_overhead"] = max(hops["b_to_c"] - hops["c_total"], 0.0)
+        for hop, dur in hops.items():
+            HOP.labels(hop=hop).observe(dur)
         e2e = (time.perf_counter()-t0)*1000
-        LAT.labels(endpoint=ep).observe(e2e)
+        LAT.labels(endpoint=ep, config_version=cfg.version).observe(e2e)
         COMPLETED.labels(endpoint=ep).inc()  # Track successful completion
-        headers = {"X-Request-Id": rid, "Server-Timing": f"e2e;dur={e2e:.1f}"}
+        headers = {"X-Request-Id": rid, "Server-Timing": format_server_timing({"e2e": e2e, **hops})}
         return Response(content=json.dumps({"device_id": resp.device_id, "cost_ms": resp.cost_ms}),
                         media_type="application/json", headers=headers)
+    except BulkheadFull as e:
+        FAILED.labels(endpoint=ep).inc()
+        ERRS.labels(code="429", endpoint=ep).inc()
+        BULKHEAD_REJECTED.labels(device_class=cls, reason=e.reason).inc()
+        raise HTTPException(status_code=429, detail=str(e), headers=retry_after_headers())
     except asyncio.TimeoutError:
+        if call is not None:
+            call.cancel()  # don't leave the RPC running in C after we've given up
         e2e = (time.perf_counter()-t0)*1000
-        LAT.labels(endpoint=ep).observe(e2e)
+        LAT.labels(endpoint=ep, config_version=cfg.version).observe(e2e)
         FAILED.labels(endpoint=ep).inc()  # Track failure
         ERRS.labels(code="504", endpoint=ep).inc()
         raise HTTPException(status_code=504, detail=f"upstream timeout {e2e:.1f}ms")
     except grpc.aio.AioRpcError as e:
         code = e.code().name
+        observe_c_service(from_metadata(e.trailing_metadata()))
         FAILED.labels(endpoint=ep).inc()  # Track failure
         ERRS.labels(code=code, endpoint=ep).inc()
         
         # Error mapping based on configuration
         if code in ("RESOURCE_EXHAUSTED",):
-            if MAP_RESOURCE_EXHAUSTED_TO_429:
-                raise HTTPException(status_code=429, detail="C/D busy")
+            if cfg.MAP_RESOURCE_EXHAUSTED_TO_429:
+                raise HTTPException(status_code=429, detail="C/D busy", headers=retry_after_headers())
             else:
                 # Baseline: no proper error mapping, treat as generic error
                 raise HTTPException(status_code=502, detail="C/D busy")
         
         if code in ("UNAVAILABLE",):
-            if MAP_UNAVAILABLE_TO_503:
+            if cfg.MAP_UNAVAILABLE_TO_503:
                 raise HTTPException(status_code=503, detail="C connect fail")
             else:
                 # Baseline: no proper error mapping
                 raise HTTPException(status_code=502, detail="C connect fail")
         
         if code in ("DEADLINE_EXCEEDED",):
-            if MAP_DEADLINE_EXCEEDED_TO_504:
+            if cfg.MAP_DEADLINE_EXCEEDED_TO_504:
                 raise HTTPException(status_code=504, detail="upstream timeout")
             else:
                 # Baseline: no proper error mapping
                 raise HTTPException(status_code=502, detail="upstream timeout")
                 
-        raise HTTPException(status_code=502, detail=f"grpc error: {code}")
\ No newline at end of file
+        raise HTTPException(status_code=502, detail=f"grpc error: {code}")
+    finally:
+        if admitted:
+            BULKHEAD_WAIT.labels(device_class=cls).observe((t_admit - t0) * 1000)
+            bulkhead.release()
+        # Every outcome feeds the sketches so error latency shows up in /__status too
+        LATENCY.observe(ep, device_class(device_id), (time.perf_counter()-t0)*1000)
\ No newline at end of file
@@ -0,0 +1,120 @@
+"""Per-class concurrency bulkheads for /process.
+
+Each device class gets its own `Bulkhead`: at most `limit` requests in
+flight towards C, up to `max_queue` more waiting (FIFO) for at most
+`queue_timeout_s`, and anything beyond that is rejected straight away with
+`BulkheadFull`. A slow-device storm then fills only the slow bulkhead and
+fast-device requests keep their own slots.
+
+Limits can be changed at runtime with `resize()` (driven by CONFIG); a
+larger limit admits queued requests immediately, a smaller one takes effect
+as in-flight requests finish. CONFIG calls it from its watcher thread, so
+once `bind()` has recorded the serving loop, a resize from any other thread
+is handed to that loop: the waiters are asyncio futures and the counters are
+only ever touched on the loop.
+"""
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Optional
+
+class BulkheadFull(Exception):
+    def __init__(self, name: str, reason: str):
+        super().__init__(f"{name} bulkhead full ({reason})")
+        self.name = name
+        self.reason = reason  # "queue_full" or "queue_timeout"
+
+class Bulkhead:
+    def __init__(self, name: str, limit: int, max_queue: int = 0, queue_timeout_s: float = 1.0):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout_s = queue_timeout_s
+        self.inflight = 0
+        self.rejected = 0
+        self._waiters: "deque[asyncio.Future]" = deque()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    @property
+    def utilization(self) -> float:
+        return self.inflight / self.limit if self.limit else 1.0
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        """Record the loop that serves requests; call before the first acquire()."""
+        self._loop = loop
+
+    def _on_loop(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def resize(self, limit: int, max_queue: int, queue_timeout_s: float):
+        """Safe from any thread; applied on the bound loop (at once if unbound or already on it)."""
+        if self._loop is not None and not self._on_loop():
+            self._loop.call_soon_threadsafe(self._resize, limit, max_queue, queue_timeout_s)
+            return
+        self._resize(limit, max_queue, queue_timeout_s)
+
+    def _resize(self, limit: int, max_queue: int, queue_timeout_s: float):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout_s = queue_timeout_s
+        self._wake()
+
+    async def acquire(self):
+        if self.inflight < self.limit and not self._waiters:
+            self.inflight += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise BulkheadFull(self.name, "queue_full")
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._waiters.append(fut)
+        timer = loop.call_later(self.queue_timeout_s, self._expire, fut)
+        try:
+            await fut  # resolved by _wake(), which has already taken the slot for us
+        except BulkheadFull:
+            self.rejected += 1
+            raise
+        except BaseException:
+            # cancelled after being handed a slot: give it back
+            if fut.done() and not fut.cancelled() and fut.exception() is None:
+                self.release()
+            raise
+        finally:
+            timer.cancel()
+            if fut in self._waiters:
+                self._waiters.remove(fut)
+
+    def release(self):
+        self.inflight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self.inflight < self.limit:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                self.inflight += 1
+                fut.set_result(None)
+
+    def _expire(self, fut: asyncio.Future):
+        if not fut.done():
+            fut.set_exception(BulkheadFull(self.name, "queue_timeout"))
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def snapshot(self) -> dict:
+        return {"limit": self.limit, "inflight": self.inflight, "queued": self.queued,
+                "max_queue": self.max_queue, "rejected": self.rejected}
@@ -0,0 +1,145 @@
+"""Live M/G/c capacity model of the C fleet.
+
+B sees every /process arrival and, from C's server-timing trailer, how long
+each call held a C slot (c_total - sem_wait). Over a sliding window that gives
+the arrival rate λ and the service-time distribution S, and with C_REPLICAS
+single-slot instances C is an M/G/c queue:
+
+- offered load a = λ·E[S] (Little's law: average busy C slots), ρ = a/c
+- P(wait) from Erlang C, mean wait from the M/M/c formula scaled by the
+  Allen–Cunneen factor (1 + cs²)/2, cs² = Var[S]/E[S]²
+- p99 wait from the exponential M/M/c waiting-time tail, scaled the same way
+- predicted p99 = p99 wait + p99 service, and the recommended replica count
+  is the smallest c that keeps it under the target
+
+These are approximations meant to flag trouble before the 504s start, not to
+replace a load test.
+"""
+import math
+import threading
+import time
+from typing import Dict, Optional
+
+from sketch import DDSketch, WindowedSketch
+
+def erlang_c(c: int, a: float) -> float:
+    """Probability an arrival has to wait, M/M/c with offered load a (erlangs)."""
+    if a <= 0:
+        return 0.0
+    if a >= c:
+        return 1.0
+    b = 1.0  # Erlang B, built up one server at a time for numerical stability
+    for k in range(1, c + 1):
+        b = a * b / (k + a * b)
+    rho = a / c
+    return b / (1 - rho * (1 - b))
+
+def _scv(sketch: DDSketch) -> float:
+    """Squared coefficient of variation from the sketch's buckets (±2%)."""
+    if sketch.count < 2:
+        return 1.0
+    mean = sketch.sum / sketch.count
+    second = sum(n * (2 * sketch.gamma ** key / (sketch.gamma + 1)) ** 2 for key, n in sketch.bins.items())
+    second /= sketch.count
+    return max(second / (mean * mean) - 1.0, 0.0) if mean > 0 else 1.0
+
+class _RateWindow:
+    """Event counts in `slices` time slices covering the last `window_s` seconds."""
+
+    def __init__(self, window_s: float, slices: int):
+        self.slice_s = window_s / slices
+        self.slices = slices
+        self.window_s = window_s
+        self.started = time.monotonic()
+        self._ring: Dict[int, int] = {}
+
+    def add(self, now: float):
+        slot = int(now // self.slice_s)
+        if slot not in self._ring:
+            for old in [s for s in self._ring if s <= slot - self.slices]:
+                del self._ring[old]
+        self._ring[slot] = self._ring.get(slot, 0) + 1
+
+    def rate(self, now: float) -> float:
+        slot = int(now // self.slice_s)
+        count = sum(n for s, n in self._ring.items() if s > slot - self.slices)
+        # the counted slices are the current, partial one plus the (slices - 1) before it
+        covered = min(now - self.started, (self.slices - 1) * self.slice_s + (now - slot * self.slice_s))
+        return count / covered if covered > 0 else 0.0
+
+class CapacityModel:
+    def __init__(self, replicas: int, window_s: float = 300.0, slices: int = 10,
+                 max_replicas: int = 200, cache_s: float = 1.0):
+        self.replicas = replicas
+        self.window_s = window_s
+        self.max_replicas = max_replicas
+        self.cache_s = cache_s
+        self._arrivals = _RateWindow(window_s, slices)
+        self._service = WindowedSketch(window_s, slices)
+        self._lock = threading.Lock()  # estimate() also runs on the metrics thread
+        self._cached = None
+        self._cached_at = 0.0
+        self._cached_target = None
+
+    def observe_arrival(self):
+        with self._lock:
+            self._arrivals.add(time.monotonic())
+
+    def observe_service(self, ms: float):
+        with self._lock:
+            self._service.add(ms)
+
+    def predict(self, c: int, arrival_rps: float, service: Dict) -> Dict:
+        """Queueing prediction for c replicas given λ and service stats (ms)."""
+        mean_s = service["mean_ms"] / 1000
+        a = arrival_rps * mean_s
+        out = {"replicas": c, "utilization": a / c if c else None}
+        if a >= c:
+            out.update({"wait_probability": 1.0, "wait_mean_ms": math.inf, "wait_p99_ms": math.inf,
+                        "p99_ms": math.inf})
+            return out
+        p_wait = erlang_c(c, a)
+        factor = (1 + service["scv"]) / 2
+        drain = (c - a) / mean_s if mean_s else math.inf  # cμ - λ, per second
+        wait_mean = p_wait / drain * factor if drain else 0.0
+        wait_p99 = math.log(p_wait / 0.01) / drain * factor if p_wait > 0.01 and drain else 0.0
+        out.update({"wait_probability": p_wait, "wait_mean_ms": 1000 * wait_mean,
+                    "wait_p99_ms": 1000 * wait_p99, "p99_ms": 1000 * wait_p99 + service["p99_ms"]})
+        return out
+
+    def recommend(self, arrival_rps: float, service: Dict, target_p99_ms: float) -> Optional[int]:
+        if target_p99_ms <= service["p99_ms"]:
+            return None  # service time alone misses the target; more replicas won't help
+        c = max(1, math.floor(arrival_rps * service["mean_ms"] / 1000) + 1)
+        while c <= self.max_replicas:
+            if self.predict(c, arrival_rps, service)["p99_ms"] <= target_p99_ms:
+                return c
+            c += 1
+        return None
+
+    def estimate(self, target_p99_ms: float) -> Dict:
+        now = time.monotonic()
+        if self._cached is not None and now - self._cached_at < self.cache_s and self._cached_target == target_p99_ms:
+            return self._cached
+        with self._lock:
+            arrival_rps = self._arrivals.rate(now)
+            sketch = self._service.merged(now)
+        out = {"window_s": self.window_s, "replicas": self.replicas, "arrival_rps": round(arrival_rps, 3),
+               "target_p99_ms": target_p99_ms, "service_samples": sketch.count}
+        if sketch.count == 0:
+            out.update({"service_ms": None, "current": None, "recommended_replicas": None})
+        else:
+            service = {"mean_ms": sketch.sum / sketch.count, "p50_ms": sketch.quantile(0.5),
+                       "p99_ms": sketch.quantile(0.99), "scv": _scv(sketch)}
+            current = self.predict(self.replicas, arrival_rps, service)
+            out.update({
+                "service_ms": {k: round(v, 3) for k, v in service.items()},
+                "offered_load": round(arrival_rps * service["mean_ms"] / 1000, 3),
+                # unbounded waits (ρ >= 1) are reported as null, with saturated=true
+                "current": {k: (round(v, 3) if math.isfinite(v) else None) if isinstance(v, float) else v
+                            for k, v in current.items()},
+                "saturated": current["utilization"] >= 1.0,
+                "recommended_replicas": self.recommend(arrival_rps, service, target_p99_ms),
+            })
+        self._cached, self._cached_at, self._cached_target = out, now, target_p99_ms
+        return out
@@ -0,0 +1,171 @@
+"""Append-only binary traffic capture for B's /process handler.
+
+Records are written to a memory-mapped file by a background thread so the
+request path only pays for a non-blocking queue put. The file layout is:
+
+    header (32 bytes): magic b"BCAP", version u16, reserved u16,
+                       data_end u64 (committed bytes), created_at f64, pad
+    record:            ts f64, ms u32, latency_ms f32, status u16,
+                       dev_len u8, mode_len u8, device_id, mode
+
+`data_end` is only advanced after a batch of records has been copied into the
+mapping, so a reader never sees a torn record even while B is still writing.
+
+This module is stdlib-only so the replay tool and the simulator can read
+captures without B's dependencies.
+"""
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+from typing import Iterator, NamedTuple
+
+MAGIC = b"BCAP"
+VERSION = 1
+HEADER = struct.Struct("<4sHHQd8x")
+RECORD = struct.Struct("<dIfHBB")
+DATA_END_OFFSET = 8  # offset of data_end inside HEADER
+
+class CaptureRecord(NamedTuple):
+    ts: float
+    device_id: str
+    ms: int
+    mode: str
+    status: int
+    latency_ms: float
+
+class TrafficCapture:
+    """Non-blocking capture of request records into an mmap'ed log."""
+
+    def __init__(self, path: str, queue_size: int = 100000,
+                 chunk_bytes: int = 4 * 1024 * 1024, max_bytes: int = 512 * 1024 * 1024,
+                 flush_interval_s: float = 0.5):
+        self.path = path
+        self.chunk_bytes = chunk_bytes
+        self.max_bytes = max_bytes
+        self.flush_interval_s = flush_interval_s
+        # each counter has a single writer, so plain += is exact without a lock
+        self.written = 0          # writer thread
+        self.dropped_queue = 0    # request path: queue full
+        self.dropped_full = 0     # writer thread: max_bytes reached
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = object()
+        self._full = False
+        self._open()
+        self._thread = threading.Thread(target=self._run, name="traffic-capture", daemon=True)
+        self._thread.start()
+
+    def _open(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        self._size = max(self.chunk_bytes, HEADER.size)
+        os.ftruncate(self._fd, self._size)
+        self._mm = mmap.mmap(self._fd, self._size)
+        self._end = HEADER.size
+        HEADER.pack_into(self._mm, 0, MAGIC, VERSION, 0, self._end, time.time())
+
+    @property
+    def dropped(self) -> int:
+        return self.dropped_queue + self.dropped_full
+
+    def record(self, ts: float, device_id: str, ms: int, mode: str, status: int, latency_ms: float):
+        """Queue one record; drops (and counts) it instead of ever blocking."""
+        try:
+            self._queue.put_nowait((ts, device_id, ms, mode, status, latency_ms))
+        except queue.Full:
+            self.dropped_queue += 1
+
+    def close(self, timeout: float = 5.0):
+        try:
+            self._queue.put(self._stop, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+    def _grow(self, needed: int) -> bool:
+        new_size = self._size
+        while new_size < needed:
+            new_size += self.chunk_bytes
+        if new_size > self.max_bytes:
+            return False
+        self._mm.flush()
+        self._mm.close()
+        os.ftruncate(self._fd, new_size)
+        self._mm = mmap.mmap(self._fd, new_size)
+        self._size = new_size
+        return True
+
+    def _append(self, item) -> bool:
+        ts, device_id, ms, mode, status, latency_ms = item
+        dev = device_id.encode("utf-8")[:255]
+        md = mode.encode("utf-8")[:255]
+        size = RECORD.size + len(dev) + len(md)
+        if self._end + size > self._size and not self._grow(self._end + size):
+            return False
+        RECORD.pack_into(self._mm, self._end, ts, max(0, min(int(ms), 0xFFFFFFFF)),
+                         latency_ms, status & 0xFFFF, len(dev), len(md))
+        off = self._end + RECORD.size
+        self._mm[off:off + len(dev)] = dev
+        off += len(dev)
+        self._mm[off:off + len(md)] = md
+        self._end = off + len(md)
+        return True
+
+    def _commit(self):
+        struct.pack_into("<Q", self._mm, DATA_END_OFFSET, self._end)
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval_s)]
+            except queue.Empty:
+                continue
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = False
+            for item in batch:
+                if item is self._stop:
+                    stopping = True
+                    continue
+                if self._full or not self._append(item):
+                    if not self._full:
+                        print(f"[CAPTURE] {self.path} reached {self.max_bytes} bytes, dropping further records", flush=True)
+                    self._full = True
+                    self.dropped_full += 1
+                    continue
+                self.written += 1
+            try:
+                self._commit()
+            except Exception as e:
+                print(f"[ERROR] Capture commit failed: {e}", flush=True)
+            if stopping:
+                self._mm.flush()
+                self._mm.close()
+                os.close(self._fd)
+                return
+
+def read_capture(path: str) -> Iterator[CaptureRecord]:
+    """Yield committed records from a capture file, oldest first."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path}: too short to be a capture file")
+    magic, version, _, data_end, _ = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path}: not a capture file (magic {magic!r})")
+    if version != VERSION:
+        raise ValueError(f"{path}: unsupported capture version {version}")
+    off = HEADER.size
+    while off + RECORD.size <= data_end:
+        ts, ms, latency_ms, status, dev_len, mode_len = RECORD.unpack_from(data, off)
+        off += RECORD.size
+        device_id = data[off:off + dev_len].decode("utf-8", "replace")
+        off += dev_len
+        mode = data[off:off + mode_len].decode("utf-8", "replace")
+        off += mode_len
+        yield CaptureRecord(ts, device_id, ms, mode, status, latency_ms)
@@ -0,0 +1,100 @@
+"""Idempotency-Key deduplication for /process.
+
+A client that times out and retries (A_TO_B_MAX_RETRIES) sends the same
+request again while the first copy may still be holding a C slot and a D
+lock. With an `Idempotency-Key` header B runs the work once per key:
+
+- miss: first request for the key; `join()` starts the work in its own task
+- attach: a duplicate while that task is running gets the same task
+  (callers await it shielded, so one going away doesn't cancel it for the rest)
+- hit: a duplicate after a successful completion gets the stored response
+  until `ttl_s` has passed
+
+Only successes are kept after completion. A failed request releases its key,
+so a retry gets a fresh attempt instead of the cached failure. Reusing a key
+with different parameters is a `KeyConflict`. At most `max_keys` keys are
+kept, least recently used first out; an evicted key whose task is still
+running just stops being shared.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+class KeyConflict(Exception):
+    def __init__(self, key: str):
+        super().__init__(f"Idempotency-Key {key!r} was used with different request parameters")
+        self.key = key
+
+class _Entry:
+    __slots__ = ("fingerprint", "task", "expires_at")
+
+    def __init__(self, fingerprint: Hashable, task: asyncio.Task):
+        self.fingerprint = fingerprint
+        self.task = task
+        self.expires_at: Optional[float] = None  # set once the task has succeeded
+
+class IdempotencyCache:
+    def __init__(self, max_keys: int = 10000, ttl_s: float = 300.0,
+                 keep: Callable[[object], bool] = lambda result: True):
+        self.max_keys = max_keys
+        self.ttl_s = ttl_s
+        self.keep = keep  # whether a successful result may be replayed
+        self.counts: Dict[str, int] = {"miss": 0, "attach": 0, "hit": 0, "conflict": 0}
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def inflight(self) -> int:
+        return sum(1 for e in self._entries.values() if not e.task.done())
+
+    def join(self, key: str, fingerprint: Hashable,
+             work: Callable[[], Awaitable]) -> Tuple[str, asyncio.Task]:
+        """("miss" | "attach" | "hit", task); await the task through asyncio.shield()."""
+        entry = self._lookup(key)
+        if entry is not None and entry.fingerprint != fingerprint:
+            self.counts["conflict"] += 1
+            raise KeyConflict(key)
+        if entry is None:
+            outcome = "miss"
+            entry = _Entry(fingerprint, asyncio.get_running_loop().create_task(work()))
+            entry.task.add_done_callback(lambda task, k=key, e=entry: self._settle(k, e))
+            self._insert(key, entry)
+        else:
+            outcome = "hit" if entry.task.done() else "attach"
+            self._entries.move_to_end(key)
+        self.counts[outcome] += 1
+        return outcome, entry.task
+
+    def _lookup(self, key: str) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at is not None and entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        return entry
+
+    def _insert(self, key: str, entry: _Entry):
+        self._entries[key] = entry
+        now = time.monotonic()
+        while self._entries:
+            oldest = next(iter(self._entries.values()))
+            expired = oldest.expires_at is not None and oldest.expires_at <= now
+            if not expired and len(self._entries) <= self.max_keys:
+                break
+            self._entries.popitem(last=False)
+
+    def _settle(self, key: str, entry: _Entry):
+        # runs when the shared task finishes; also retrieves the exception so an
+        # abandoned task doesn't log "exception was never retrieved"
+        failed = entry.task.cancelled() or entry.task.exception() is not None
+        if failed or not self.keep(entry.task.result()):
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+        else:
+            entry.expires_at = time.monotonic() + self.ttl_s
+
+    def snapshot(self) -> dict:
+        return {"keys": len(self), "inflight": self.inflight, "max_keys": self.max_keys,
+                "ttl_s": self.ttl_s, **self.counts}
@@ -0,0 +1,159 @@
+"""tracemalloc control, named snapshots and snapshot diffs for /debug/memory.
+
+Snapshots are kept in memory (bounded, oldest dropped first; the automatic
+baseline is kept). `maybe_auto_snapshot()` is called from the resource
+monitor thread each time memory crosses the configured share of the
+container limit; it hands the snapshot and the diff against the baseline to
+a background thread (one at a time) so the monitor keeps its 1s cadence, and
+the top growth sites are logged so a leak is attributable after the fact.
+"""
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+from typing import Optional
+
+KEY_TYPES = ("lineno", "filename", "traceback")
+BASELINE = "auto-baseline"
+
+_NOISE = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+def _site(stat, key_type: str) -> str:
+    frames = stat.traceback
+    if key_type == "traceback":
+        return " <- ".join(f"{f.filename}:{f.lineno}" for f in frames)
+    if key_type == "filename":
+        return frames[0].filename
+    return f"{frames[0].filename}:{frames[0].lineno}"
+
+class AllocationTracker:
+    def __init__(self, max_snapshots: int = 10, frames: int = 10,
+                 auto_threshold_pct: Optional[float] = None, auto_cooldown_s: float = 60.0):
+        self.max_snapshots = max_snapshots
+        self.frames = frames
+        self.auto_threshold_pct = auto_threshold_pct
+        self.auto_cooldown_s = auto_cooldown_s
+        self._snapshots: "OrderedDict[str, tuple]" = OrderedDict()  # name -> (taken_at, snapshot)
+        self._lock = threading.Lock()
+        self._counter = 0
+        self._above = False
+        self._last_auto = 0.0
+        self._auto_thread: Optional[threading.Thread] = None
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: Optional[int] = None):
+        if frames:
+            self.frames = frames
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            print(f"[MEMORY] tracemalloc started ({self.frames} frames)", flush=True)
+
+    def stop(self):
+        """Stop tracing. Snapshots already taken stay available for diffs."""
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+            print("[MEMORY] tracemalloc stopped", flush=True)
+
+    def status(self) -> dict:
+        current, peak = tracemalloc.get_traced_memory() if self.tracing else (0, 0)
+        with self._lock:
+            snaps = [{"name": n, "taken_at": t} for n, (t, _) in self._snapshots.items()]
+        return {
+            "tracing": self.tracing,
+            "frames": tracemalloc.get_traceback_limit() if self.tracing else self.frames,
+            "traced_current_mb": round(current / (1024 * 1024), 2),
+            "traced_peak_mb": round(peak / (1024 * 1024), 2),
+            "auto_threshold_pct": self.auto_threshold_pct,
+            "snapshots": snaps,
+        }
+
+    def _take(self) -> tracemalloc.Snapshot:
+        if not self.tracing:
+            raise RuntimeError("tracemalloc is not running; start it first")
+        return tracemalloc.take_snapshot().filter_traces(_NOISE)
+
+    def take(self, name: Optional[str] = None) -> str:
+        snapshot = self._take()
+        with self._lock:
+            if not name:
+                self._counter += 1
+                name = f"snap-{self._counter}"
+            self._snapshots.pop(name, None)
+            self._snapshots[name] = (time.time(), snapshot)
+            while len(self._snapshots) > self.max_snapshots:
+                oldest = next((n for n in self._snapshots if n != BASELINE), None)
+                if oldest is None:
+                    break
+                del self._snapshots[oldest]
+        return name
+
+    def _get(self, name: str) -> tracemalloc.Snapshot:
+        with self._lock:
+            if name not in self._snapshots:
+                raise KeyError(f"no snapshot named {name!r}")
+            return self._snapshots[name][1]
+
+    def top(self, name: Optional[str] = None, top: int = 20, key_type: str = "lineno") -> list:
+        snapshot = self._get(name) if name else self._take()
+        stats = snapshot.statistics(key_type)
+        return [{"site": _site(s, key_type), "size_kb": round(s.size / 1024, 1), "count": s.count}
+                for s in stats[:top]]
+
+    def diff(self, base: str, target: Optional[str] = None, top: int = 20, key_type: str = "lineno") -> dict:
+        """Growth from `base` to `target` (default: a fresh, unstored snapshot)."""
+        old = self._get(base)
+        new = self._get(target) if target else self._take()
+        stats = new.compare_to(old, key_type)
+        by_size = sorted(stats, key=lambda s: s.size_diff, reverse=True)[:top]
+        by_count = sorted(stats, key=lambda s: s.count_diff, reverse=True)[:top]
+
+        def row(s):
+            return {"site": _site(s, key_type),
+                    "size_kb": round(s.size / 1024, 1), "size_diff_kb": round(s.size_diff / 1024, 1),
+                    "count": s.count, "count_diff": s.count_diff}
+        return {
+            "base": base,
+            "target": target or "current",
+            "total_size_diff_kb": round(sum(s.size_diff for s in stats) / 1024, 1),
+            "top_by_size": [row(s) for s in by_size],
+            "top_by_count": [row(s) for s in by_count],
+        }
+
+    def maybe_auto_snapshot(self, mem_percent: float):
+        """Snapshot on each upward crossing of auto_threshold_pct (rate limited, off-thread)."""
+        if self.auto_threshold_pct is None or not self.tracing:
+            return
+        if mem_percent < self.auto_threshold_pct:
+            self._above = False
+            return
+        now = time.time()
+        if self._above or now - self._last_auto < self.auto_cooldown_s:
+            return
+        if self._auto_thread is not None and self._auto_thread.is_alive():
+            return  # the previous one is still walking the heap; retried on the next reading
+        self._above = True
+        self._last_auto = now
+        self._auto_thread = threading.Thread(target=self._auto_snapshot, args=(mem_percent, now),
+                                             name="memdebug-auto", daemon=True)
+        self._auto_thread.start()
+
+    def _auto_snapshot(self, mem_percent: float, now: float):
+        try:
+            name = self.take(f"auto-{time.strftime('%H%M%S', time.localtime(now))}")
+        except RuntimeError:
+            return  # tracing was stopped in the meantime
+        print(f"[MEMORY] {mem_percent:.1f}% of container limit >= {self.auto_threshold_pct:.0f}%, took snapshot {name}", flush=True)
+        try:
+            growth = self.diff(BASELINE, name, top=5)["top_by_size"]
+        except KeyError:
+            return
+        for g in growth:
+            print(f"[MEMORY]   +{g['size_diff_kb']:.0f}KB (+{g['count_diff']} blocks) {g['site']}", flush=True)
@@ -0,0 +1,94 @@
+"""Priority load shedding from B's own CPU and memory readings.
+
+B lives in a 256M container and a couple of concurrent /batch_process jobs
+can get it OOM-killed, taking /process down with it. The monitor thread
+feeds each reading into `LoadShedder.observe()`, and the request path asks:
+
+- `batch_mode()` / `batch_done()`: how a new batch job may run. Above
+  `refuse_mem_pct` it waits up to `defer_s` for memory to come back down
+  and is then refused; above `degrade_mem_pct`, or while `max_full_batches`
+  full-mode jobs are already running, it runs in the streaming
+  (constant-memory) mode.
+- `check_low_priority()`: refuses low-priority work (batch, debug endpoints)
+  while the recent CPU average is at or above `cpu_pct`.
+
+/process and /health never ask, so they are never shed.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+FULL = "full"
+STREAMING = "streaming"
+
+class Shed(Exception):
+    def __init__(self, reason: str, detail: str):
+        super().__init__(detail)
+        self.reason = reason  # "memory_refuse" or "cpu_saturated"
+
+class LoadShedder:
+    def __init__(self, degrade_mem_pct: float = 60.0, refuse_mem_pct: float = 80.0, defer_s: float = 5.0,
+                 cpu_pct: float = 90.0, max_full_batches: int = 1, cpu_samples: int = 3,
+                 on_decision: Optional[Callable[[str], None]] = None):
+        self.configure(degrade_mem_pct, refuse_mem_pct, defer_s, cpu_pct, max_full_batches)
+        self.on_decision = on_decision  # called with the reason of every shed/degrade decision
+        self.mem_pct = 0.0
+        self.cpu_avg = 0.0  # mean of the last `cpu_samples` readings
+        self._cpu = deque(maxlen=cpu_samples)
+        self.full_batches = 0
+        self.decisions: Dict[str, int] = {}
+
+    def configure(self, degrade_mem_pct: float, refuse_mem_pct: float, defer_s: float,
+                  cpu_pct: float, max_full_batches: int):
+        self.degrade_mem_pct = degrade_mem_pct
+        self.refuse_mem_pct = refuse_mem_pct
+        self.defer_s = defer_s
+        self.cpu_pct = cpu_pct
+        self.max_full_batches = max_full_batches
+
+    def observe(self, cpu_percent: float, mem_percent: float):
+        """Called from the monitor thread once per reading."""
+        self._cpu.append(cpu_percent)
+        self.cpu_avg = sum(self._cpu) / len(self._cpu)
+        self.mem_pct = mem_percent
+
+    def _decide(self, reason: str):
+        self.decisions[reason] = self.decisions.get(reason, 0) + 1
+        if self.on_decision is not None:
+            self.on_decision(reason)
+
+    def check_low_priority(self):
+        if self.cpu_avg >= self.cpu_pct:
+            self._decide("cpu_saturated")
+            raise Shed("cpu_saturated", f"CPU saturated ({self.cpu_avg:.0f}% >= {self.cpu_pct:g}%)")
+
+    async def batch_mode(self, poll_s: float = 0.25) -> str:
+        if self.mem_pct >= self.refuse_mem_pct:
+            self._decide("memory_defer")
+            deadline = time.monotonic() + self.defer_s
+            while self.mem_pct >= self.refuse_mem_pct:
+                if time.monotonic() >= deadline:
+                    self._decide("memory_refuse")
+                    raise Shed("memory_refuse", f"memory at {self.mem_pct:.0f}% of the container limit "
+                                                f"(refusing batch work above {self.refuse_mem_pct:g}%)")
+                await asyncio.sleep(poll_s)
+        if self.mem_pct >= self.degrade_mem_pct:
+            self._decide("memory_degrade")
+            return STREAMING
+        if self.full_batches >= self.max_full_batches:
+            # the reading lags the job already running; don't stack a second full one on it
+            self._decide("batch_concurrent")
+            return STREAMING
+        self.full_batches += 1
+        return FULL
+
+    def batch_done(self, mode: str):
+        if mode == FULL:
+            self.full_batches -= 1
+
+    def snapshot(self) -> dict:
+        return {"cpu_avg_pct": round(self.cpu_avg, 1), "mem_pct": round(self.mem_pct, 1),
+                "full_batches": self.full_batches, "degrade_mem_pct": self.degrade_mem_pct,
+                "refuse_mem_pct": self.refuse_mem_pct, "cpu_pct": self.cpu_pct,
+                "decisions": dict(self.decisions)}
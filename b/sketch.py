@@ -0,0 +1,134 @@
+"""Mergeable streaming latency sketches over a sliding time window.
+
+`DDSketch` keeps log-spaced buckets so every quantile it reports is within a
+fixed *relative* error of the true value (1% by default): 3000ms and 4900ms are
+never confused, unlike the coarse Prometheus buckets. Sketches with the same
+accuracy merge by adding bucket counts, which is how `WindowedSketch` combines
+its time slices into one view of the last `window_s` seconds.
+
+Updates are a log and a dict increment; callers are expected to use a sketch
+from a single thread (the event loop).
+"""
+import math
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+DEFAULT_QUANTILES = (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("p999", 0.999))
+
+class DDSketch:
+    def __init__(self, relative_accuracy: float = 0.01, min_value: float = 1e-3):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float):
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if value <= self.min_value:
+            self.zero_count += 1
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        self.bins[key] = self.bins.get(key, 0) + 1
+
+    def merge(self, other: "DDSketch"):
+        if other.gamma != self.gamma:
+            raise ValueError("cannot merge sketches with different accuracy")
+        for key, n in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + n
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                value = 2 * self.gamma ** key / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def summary(self, quantiles: Iterable[Tuple[str, float]] = DEFAULT_QUANTILES) -> dict:
+        out = {"count": self.count}
+        if self.count:
+            out["mean"] = round(self.sum / self.count, 1)
+            out["min"] = round(self.min, 1)
+            out["max"] = round(self.max, 1)
+        for name, q in quantiles:
+            v = self.quantile(q)
+            out[name] = None if v is None else round(v, 1)
+        return out
+
+class WindowedSketch:
+    """DDSketch over the last `window_s` seconds, rotated in `slices` steps."""
+
+    def __init__(self, window_s: float = 60.0, slices: int = 6, relative_accuracy: float = 0.01):
+        self.slice_s = window_s / slices
+        self.slices = slices
+        self.relative_accuracy = relative_accuracy
+        self._ring: Dict[int, DDSketch] = {}
+
+    def add(self, value: float, now: Optional[float] = None):
+        slot = int((time.monotonic() if now is None else now) // self.slice_s)
+        sketch = self._ring.get(slot)
+        if sketch is None:
+            sketch = self._ring[slot] = DDSketch(self.relative_accuracy)
+            for old in [s for s in self._ring if s <= slot - self.slices]:
+                del self._ring[old]
+        sketch.add(value)
+
+    def merged(self, now: Optional[float] = None) -> DDSketch:
+        slot = int((time.monotonic() if now is None else now) // self.slice_s)
+        out = DDSketch(self.relative_accuracy)
+        for s, sketch in self._ring.items():
+            if s > slot - self.slices:
+                out.merge(sketch)
+        return out
+
+class LatencyBreakdown:
+    """Windowed sketches keyed by (endpoint, device class)."""
+
+    def __init__(self, window_s: float = 60.0, slices: int = 6, relative_accuracy: float = 0.01):
+        self.window_s = window_s
+        self._args = (window_s, slices, relative_accuracy)
+        self._sketches: Dict[Tuple[str, str], WindowedSketch] = {}
+
+    def observe(self, endpoint: str, device_class: str, value_ms: float):
+        key = (endpoint, device_class)
+        sketch = self._sketches.get(key)
+        if sketch is None:
+            sketch = self._sketches[key] = WindowedSketch(*self._args)
+        sketch.add(value_ms)
+
+    def snapshot(self) -> dict:
+        """{endpoint: {device_class: summary, "all": summary}} for the window."""
+        now = time.monotonic()
+        out: Dict[str, dict] = {}
+        totals: Dict[str, DDSketch] = {}
+        for (endpoint, device_class), sketch in sorted(self._sketches.items()):
+            merged = sketch.merged(now)
+            out.setdefault(endpoint, {})[device_class] = merged.summary()
+            total = totals.setdefault(endpoint, DDSketch(merged.relative_accuracy))
+            total.merge(merged)
+        for endpoint, total in totals.items():
+            if len(out[endpoint]) > 1:
+                out[endpoint]["all"] = total.summary()
+        return {"window_s": self.window_s, "endpoints": out}
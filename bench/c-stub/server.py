@@ -0,0 +1,38 @@
+"""C stand-in for the B benchmark (bench/run.py).
+
+Answers every DeviceProxy.Process after STUB_DELAY_MS, with no semaphore and
+no D behind it, so B is the only thing that can saturate. STUB_DELAY_MS=-1
+uses the request's `ms` instead. Runs on uvloop; bench/run.py reports its
+CPU so a stub-bound run can be told apart from a B-bound one.
+"""
+import asyncio, os, random, sys
+
+import grpc
+import uvloop
+
+sys.path.append("/app/gen")
+import device_proxy_pb2 as pb
+import device_proxy_pb2_grpc as rpc
+
+STUB_DELAY_MS = float(os.getenv("STUB_DELAY_MS", "50"))
+STUB_JITTER_MS = float(os.getenv("STUB_JITTER_MS", "0"))
+PORT = int(os.getenv("PORT", "50051"))
+
+class Stub(rpc.DeviceProxyServicer):
+    async def Process(self, request, ctx):
+        delay = request.ms if STUB_DELAY_MS < 0 else STUB_DELAY_MS
+        delay += random.uniform(0, STUB_JITTER_MS)
+        await asyncio.sleep(delay / 1000)
+        return pb.ProcessReply(device_id=request.device_id, cost_ms=int(delay))
+
+async def serve():
+    server = grpc.aio.server(options=[("grpc.max_concurrent_streams", 100000)])
+    rpc.add_DeviceProxyServicer_to_server(Stub(), server)
+    server.add_insecure_port(f"[::]:{PORT}")
+    await server.start()
+    print(f"c-stub listening on :{PORT}, delay {STUB_DELAY_MS:g}ms (+{STUB_JITTER_MS:g}ms jitter)", flush=True)
+    await server.wait_for_termination()
+
+if __name__ == "__main__":
+    uvloop.install()
+    asyncio.run(serve())
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""B benchmark: Python (FastAPI) vs Java (Spring Boot) B under identical load.
+
+Each implementation runs alone against the same C stub (bench/c-stub) with
+the same CPU/memory limits, and gets the same open-loop ramp: a fixed request
+rate per step, raised step by step until B saturates. Per step it records
+throughput, p50/p99/p999 latency, errors, and B's and the stub's CPU and
+memory from `docker stats`.
+
+    docker compose -f docker-compose.yml -f bench/docker-compose.bench.yml --profile bench build
+    python3 bench/run.py --out bench-results.json                 # python, then java
+    python3 bench/run.py --impl java --rates 200,400,800 --out bench-results.json
+    python3 bench/run.py --report bench-results.json --markdown bench-report.md
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+import aiohttp
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+COMPOSE = ["docker", "compose", "-f", "docker-compose.yml", "-f", "bench/docker-compose.bench.yml",
+           "--profile", "bench"]
+STUB_SERVICE = "c-stub"
+IMPLS = {
+    "python": {"service": "b-bench-python", "url": "http://localhost:8090"},
+    "java": {"service": "b-bench-java", "url": "http://localhost:8091"},
+}
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+def parse_mb(value: str) -> float:
+    """docker stats sizes ("312.5MiB", "1.2GiB", "900kB") in MiB"""
+    m = re.match(r"([\d.]+)\s*([KMGT]?i?B)", value.strip(), re.I)
+    if not m:
+        return 0.0
+    scale = {"b": 1 / 2**20, "kb": 1e3 / 2**20, "kib": 1 / 1024, "mb": 1e6 / 2**20, "mib": 1.0,
+             "gb": 1e9 / 2**20, "gib": 1024.0, "tb": 1e12 / 2**20, "tib": 2**20}
+    return float(m.group(1)) * scale.get(m.group(2).lower(), 1.0)
+
+async def run_cmd(*cmd: str) -> str:
+    proc = await asyncio.create_subprocess_exec(*cmd, cwd=ROOT, stdout=asyncio.subprocess.PIPE,
+                                                stderr=asyncio.subprocess.PIPE)
+    out, err = await proc.communicate()
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(cmd)} failed: {err.decode().strip()}")
+    return out.decode()
+
+async def container_id(service: str) -> str:
+    cid = (await run_cmd(*COMPOSE, "ps", "-q", service)).strip()
+    if not cid:
+        raise RuntimeError(f"{service} is not running")
+    return cid
+
+class StatsSampler:
+    """Polls `docker stats` for the given containers until stopped; one sample list per step."""
+
+    def __init__(self, containers: Dict[str, str]):
+        self.containers = containers  # role ("b", "stub") -> container id
+        self.samples: Dict[str, List[tuple]] = {role: [] for role in containers}
+        self._task: Optional[asyncio.Task] = None
+
+    async def _poll(self):
+        by_id = {cid[:12]: role for role, cid in self.containers.items()}
+        while True:
+            out = await run_cmd("docker", "stats", "--no-stream", "--format", "{{json .}}",
+                                *self.containers.values())
+            for line in out.splitlines():
+                row = json.loads(line)
+                role = by_id.get(row.get("ID", "")[:12])
+                if role is not None:
+                    cpu = float(row["CPUPerc"].rstrip("%") or 0)
+                    self.samples[role].append((cpu, parse_mb(row["MemUsage"].split("/")[0])))
+
+    def start(self):
+        self.samples = {role: [] for role in self.containers}
+        self._task = asyncio.get_running_loop().create_task(self._poll())
+
+    async def stop(self) -> Dict[str, float]:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        out = {}
+        for role, samples in self.samples.items():
+            cpu = [s[0] for s in samples]
+            mem = [s[1] for s in samples]
+            out[f"{role}_cpu_pct_mean"] = sum(cpu) / len(cpu) if cpu else None
+            out[f"{role}_cpu_pct_max"] = max(cpu) if cpu else None
+            out[f"{role}_mem_mb_max"] = max(mem) if mem else None
+        return out
+
+async def wait_healthy(session: aiohttp.ClientSession, url: str, timeout_s: float):
+    deadline = time.time() + timeout_s
+    while time.time() < deadline:
+        try:
+            async with session.get(f"{url}/health") as r:
+                if r.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(1)
+    raise RuntimeError(f"{url} not healthy after {timeout_s:.0f}s")
+
+async def fire(session, url: str, params: Dict, latencies: List[float], statuses: Counter, done: List[float]):
+    start = time.perf_counter()
+    try:
+        async with session.get(url, params=params) as r:
+            await r.read()
+            status = r.status
+    except asyncio.TimeoutError:
+        status = "timeout"
+    except aiohttp.ClientError:
+        status = "error"
+    end = time.perf_counter()
+    statuses[status] += 1
+    done.append(end)
+    if status == 200:
+        latencies.append((end - start) * 1000)
+
+async def run_step(session, url: str, rate: float, duration_s: float, ms: int) -> Dict:
+    """Open loop: request i is sent at t0 + i/rate whether or not earlier ones returned."""
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    done: List[float] = []
+    tasks = []
+    total = max(1, int(rate * duration_s))
+    lag_ms = []
+    t0 = time.perf_counter()
+    for i in range(total):
+        delay = t0 + i / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            lag_ms.append(-delay * 1000)
+        params = {"device_id": f"dev-fast-{i % 100}", "ms": str(ms), "mode": "normal"}
+        tasks.append(asyncio.create_task(fire(session, f"{url}/process", params, latencies, statuses, done)))
+    sent_s = time.perf_counter() - t0
+    await asyncio.gather(*tasks)
+    elapsed = (max(done) if done else time.perf_counter()) - t0
+    ok = statuses.get(200, 0)
+    return {
+        "rate": rate,
+        "sent": total,
+        "send_rate": total / sent_s if sent_s > 0 else rate,
+        "send_lag_p99_ms": percentile(lag_ms, 0.99) if lag_ms else 0.0,
+        "throughput_rps": ok / elapsed if elapsed > 0 else 0.0,
+        "error_rate": 1 - ok / total,
+        "statuses": {str(k): v for k, v in sorted(statuses.items(), key=lambda kv: str(kv[0]))},
+        "p50_ms": percentile(latencies, 0.5),
+        "p99_ms": percentile(latencies, 0.99),
+        "p999_ms": percentile(latencies, 0.999),
+    }
+
+def saturated(step: Dict, args) -> bool:
+    return (step["error_rate"] > args.max_error or step["p99_ms"] > args.slo_ms
+            or step["throughput_rps"] < 0.9 * step["rate"])
+
+def ramp(args) -> List[float]:
+    if args.rates:
+        return [float(r) for r in args.rates.split(",")]
+    rates, rate = [], args.start
+    while rate <= args.max_rate:
+        rates.append(round(rate, 1))
+        rate *= args.factor
+    return rates
+
+async def bench_impl(name: str, args) -> Dict:
+    impl = IMPLS[name]
+    if args.manage:
+        print(f"Starting {impl['service']}...")
+        await run_cmd(*COMPOSE, "up", "-d", STUB_SERVICE, impl["service"])
+    sampler = StatsSampler({"b": await container_id(impl["service"]), "stub": await container_id(STUB_SERVICE)})
+    steps = []
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    try:
+        async with aiohttp.ClientSession(timeout=timeout, connector=aiohttp.TCPConnector(limit=0)) as session:
+            await wait_healthy(session, impl["url"], args.startup_timeout)
+            rates = ramp(args)
+            print(f"Warming up {name} at {rates[0]:g} rps for {args.warmup}s...")
+            await run_step(session, impl["url"], rates[0], args.warmup, args.ms)
+            over = 0
+            for rate in rates:
+                sampler.start()
+                step = await run_step(session, impl["url"], rate, args.step_s, args.ms)
+                step.update(await sampler.stop())
+                step["client_bound"] = step["send_rate"] < 0.95 * rate
+                step["saturated"] = saturated(step, args)
+                steps.append(step)
+                print(f"  {name:<6} {rate:>8g} rps → {step['throughput_rps']:8.1f} ok/s  "
+                      f"p50 {step['p50_ms']:7.1f}  p99 {step['p99_ms']:7.1f}  p999 {step['p999_ms']:7.1f}ms  "
+                      f"err {100 * step['error_rate']:5.1f}%  B cpu {fmt(step['b_cpu_pct_mean'], '.0f')}%  "
+                      f"mem {fmt(step['b_mem_mb_max'], '.0f')}MB" + ("  [client-bound]" if step["client_bound"] else ""))
+                over = over + 1 if step["saturated"] else 0
+                if over >= args.stop_after:
+                    break
+    finally:
+        if args.manage:
+            await run_cmd(*COMPOSE, "stop", impl["service"])
+    return {"impl": name, "service": impl["service"], "steps": steps}
+
+def fmt(value, spec: str = ".1f") -> str:
+    return "-" if value is None else format(value, spec)
+
+def bottleneck(step: Dict, cpus: float) -> str:
+    if step.get("client_bound"):
+        return "load generator (send rate fell behind; run the client on another host)"
+    if (step.get("stub_cpu_pct_mean") or 0) >= 90:
+        return "C stub CPU (raise STUB_DELAY_MS or give the stub more CPU)"
+    if (step.get("b_cpu_pct_mean") or 0) >= 90 * cpus:
+        return "B CPU"
+    return "B concurrency, not CPU (worker/thread pool or in-flight limit)"
+
+def summarize(result: Dict, cpus: float) -> Dict:
+    steps = result["steps"]
+    good = [s for s in steps if not s["saturated"]]
+    best = max(good, key=lambda s: s["throughput_rps"]) if good else None
+    first_bad = next((s for s in steps if s["saturated"]), None)
+    return {
+        "impl": result["impl"],
+        "max_sustained_rps": best["throughput_rps"] if best else 0.0,
+        "at": best,
+        "saturated_at_rate": first_bad["rate"] if first_bad else None,
+        "bottleneck": bottleneck(first_bad, cpus) if first_bad else "not reached; raise --max-rate",
+        "peak_rps": max((s["throughput_rps"] for s in steps), default=0.0),
+        "peak_mem_mb": max((s["b_mem_mb_max"] or 0 for s in steps), default=0.0),
+    }
+
+def report(data: Dict) -> str:
+    meta = data["meta"]
+    lines = [f"# B benchmark: {' vs '.join(r['impl'] for r in data['results'])}", "",
+             f"C stub delay {meta['stub_delay_ms']}ms, {meta['cpus']:g} CPU / {meta['mem_mb']}MB per B, "
+             f"{meta['step_s']:g}s steps, saturated = errors > {100 * meta['max_error']:g}% "
+             f"or p99 > {meta['slo_ms']:g}ms or throughput < 90% of offered", "",
+             "## Summary", "",
+             "| impl | max sustained rps | p50 | p99 | p999 | B CPU % | B mem MB | saturates at | limited by |",
+             "|------|------------------:|----:|----:|-----:|--------:|---------:|-------------:|------------|"]
+    for result in data["results"]:
+        s = summarize(result, meta["cpus"])
+        at = s["at"] or {}
+        lines.append(f"| {s['impl']} | {s['max_sustained_rps']:.0f} | {fmt(at.get('p50_ms'))} | "
+                     f"{fmt(at.get('p99_ms'))} | {fmt(at.get('p999_ms'))} | {fmt(at.get('b_cpu_pct_mean'), '.0f')} | "
+                     f"{fmt(s['peak_mem_mb'], '.0f')} | {fmt(s['saturated_at_rate'], 'g')} rps | {s['bottleneck']} |")
+    lines += ["", "Latencies (ms) are for successful requests at the highest unsaturated step.", ""]
+    for result in data["results"]:
+        lines += [f"## {result['impl']} ramp", "",
+                  "| offered rps | ok/s | p50 | p99 | p999 | errors | B CPU % (mean/max) | B mem MB | stub CPU % | |",
+                  "|------------:|-----:|----:|----:|-----:|-------:|-------------------:|---------:|-----------:|-|"]
+        for s in result["steps"]:
+            flags = " ".join(f for f, on in (("saturated", s["saturated"]), ("client-bound", s["client_bound"])) if on)
+            lines.append(f"| {s['rate']:g} | {s['throughput_rps']:.0f} | {s['p50_ms']:.1f} | {s['p99_ms']:.1f} | "
+                         f"{s['p999_ms']:.1f} | {100 * s['error_rate']:.1f}% | "
+                         f"{fmt(s['b_cpu_pct_mean'], '.0f')}/{fmt(s['b_cpu_pct_max'], '.0f')} | "
+                         f"{fmt(s['b_mem_mb_max'], '.0f')} | {fmt(s['stub_cpu_pct_mean'], '.0f')} | {flags} |")
+        lines.append("")
+    return "\n".join(lines)
+
+def load_results(path: str) -> Dict:
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {"meta": {}, "results": []}
+
+async def run_all(args) -> Dict:
+    data = load_results(args.out) if args.out else {"meta": {}, "results": []}
+    data["meta"] = {"stub_delay_ms": os.getenv("STUB_DELAY_MS", "50"), "cpus": args.cpus,
+                    "mem_mb": os.getenv("BENCH_MEM_MB", "512"), "step_s": args.step_s,
+                    "max_error": args.max_error, "slo_ms": args.slo_ms}
+    for name in args.impl.split(","):
+        result = await bench_impl(name, args)
+        data["results"] = [r for r in data["results"] if r["impl"] != name] + [result]
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump(data, f, indent=2)
+    return data
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark Python vs Java B against a C stub")
+    parser.add_argument("--impl", default="python,java", help="Comma-separated: python, java")
+    parser.add_argument("--rates", help="Explicit comma-separated rates (rps) instead of --start/--factor")
+    parser.add_argument("--start", type=float, default=50.0, help="First step rate (rps)")
+    parser.add_argument("--factor", type=float, default=1.5, help="Rate multiplier per step")
+    parser.add_argument("--max-rate", type=float, default=5000.0)
+    parser.add_argument("--step-s", type=float, default=30.0, help="Seconds per step")
+    parser.add_argument("--warmup", type=float, default=15.0, help="Unrecorded warmup at the first rate (s)")
+    parser.add_argument("--ms", type=int, default=50, help="ms sent to B (the stub ignores it unless STUB_DELAY_MS=-1)")
+    parser.add_argument("--timeout", type=float, default=15.0, help="Client timeout per request (s)")
+    parser.add_argument("--slo-ms", type=float, default=1000.0, help="p99 above this counts as saturated")
+    parser.add_argument("--max-error", type=float, default=0.01, help="Error rate above this counts as saturated")
+    parser.add_argument("--stop-after", type=int, default=2, help="Stop after this many saturated steps in a row")
+    parser.add_argument("--cpus", type=float, default=float(os.getenv("BENCH_CPUS", "1.0")),
+                        help="CPU limit of each B (match BENCH_CPUS)")
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--no-manage", dest="manage", action="store_false",
+                        help="Don't start/stop containers; they are already up")
+    parser.add_argument("--out", help="JSON results file (merged per impl, so runs can be split)")
+    parser.add_argument("--report", help="Print the comparison for an existing results file and exit")
+    parser.add_argument("--markdown", help="Also write the comparison report to this file")
+    args = parser.parse_args()
+
+    unknown = set(args.impl.split(",")) - set(IMPLS)
+    if unknown and not args.report:
+        parser.error(f"unknown --impl {', '.join(sorted(unknown))}")
+    data = load_results(args.report) if args.report else asyncio.run(run_all(args))
+    text = report(data)
+    print()
+    print(text)
+    if args.markdown:
+        with open(args.markdown, "w") as f:
+            f.write(text + "\n")
+        print(f"\nWrote {args.markdown}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,25 +1,41 @@
-import os, asyncio, time, aiohttp, grpc
+from startup_timing import StartupTimer
+STARTUP = StartupTimer("svc-c")
+
+import os, asyncio, signal, time, aiohttp, grpc
+from aiohttp import web
 from grpc import aio
-from opentelemetry.instrumentation.grpc import GrpcInstrumentorServer
-from opentelemetry.instrumentation.aiohttp_client import AioHttpClientInstrumentor
-from opentelemetry import trace, context
+from grpc_health.v1 import health, health_pb2, health_pb2_grpc
+from opentelemetry import trace
 from opentelemetry.propagate import extract
-from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
-from prometheus_client import Gauge, Counter, Histogram, start_http_server
-from otel_init import init_tracing
+from prometheus_client import Gauge, Counter, Histogram, Info, start_http_server
+from sketch import LatencyBreakdown
+from loop_health import LAG_BUCKETS_MS, LoopMonitor, loop_implementation, use_uvloop_if_requested
+from sampler import ProfilerBusy, StackSampler
+from runtime_config import ConfigError, RuntimeConfig, Setting, positive
+from server_timing import format_server_timing, parse_server_timing
 
 import sys
 print("Starting service C...", flush=True)
 
-init_tracing("svc-c")
-# Don't auto-instrument gRPC server - we'll handle trace context manually
-# GrpcInstrumentorServer().instrument()
-AioHttpClientInstrumentor().instrument()
-
-import sys
 sys.path.append("/app/gen")
 import device_proxy_pb2 as pb
 import device_proxy_pb2_grpc as rpc
+STARTUP.mark("imports")
+
+# Fast start: accept RPCs first, then load the OTel SDK/exporter and aiohttp instrumentation.
+# Spans started before that go to the no-op provider.
+FAST_START = os.getenv("FAST_START", "false").lower() == "true"
+
+def init_instrumentation():
+    from otel_init import init_tracing
+    from opentelemetry.instrumentation.aiohttp_client import AioHttpClientInstrumentor
+    init_tracing("svc-c")
+    # Don't auto-instrument gRPC server - we'll handle trace context manually
+    AioHttpClientInstrumentor().instrument()
+
+if not FAST_START:
+    init_instrumentation()
+    STARTUP.mark("instrumentation")
 
 # Restore metrics functionality with unique port per container
 import socket
@@ -50,7 +66,7 @@ except Exception as e:
 
 # Create real or dummy metrics based on server startup
 if metrics_started:
-    g_healthy = Gauge("c_healthy", "health of this C instance"); g_healthy.set(1)
+    g_healthy = Gauge("c_healthy", "health of this C instance (0 until serving and while draining)"); g_healthy.set(0)
     g_inflight = Gauge("c_inflight", "whether C is processing a request"); g_inflight.set(0)
     g_ejected = Gauge("c_ejected", "whether C is ejected"); g_ejected.set(0)
     
@@ -59,10 +75,22 @@ if metrics_started:
     COMPLETED = Counter("c_completed", "Successfully completed requests", ["device_id"])
     FAILED = Counter("c_failed", "Failed requests", ["device_id"])
     ERRS = Counter("c_errors_total", "Total errors", ["code", "device_id"])
-    LAT  = Histogram("c_process_ms", "C handling latency (ms)", ["device_id"],
+    LAT  = Histogram("c_process_ms", "C handling latency (ms)", ["device_id", "config_version"],
                      buckets=[50,100,200,500,1000,2000,3000,5000,10000])
     CD   = Histogram("c_to_d_ms", "C→D downstream latency (ms)", ["device_id"],
                      buckets=[50,100,200,500,1000,2000,3000,5000,10000])
+    SEM_WAIT = Histogram("c_sem_wait_ms", "Time queued for the single request slot (ms)",
+                         buckets=[1,5,10,50,100,200,500,1000,2000,5000,10000])
+    
+    CONFIG_INFO = Info("c_config", "Active runtime configuration version")
+    DRAIN_SECONDS = Gauge("c_drain_seconds", "Duration of the last shutdown drain (s)")
+    SHUTDOWN_ABORTED = Counter("c_shutdown_aborted", "In-flight requests cancelled when the drain grace period ran out")
+    LOOP_LAG = Histogram("c_loop_lag_ms", "Event loop lag: how late a periodic probe wakes up (ms)",
+                         buckets=LAG_BUCKETS_MS)
+    LOOP_BLOCKED = Counter("c_loop_blocked", "Times the event loop was blocked past LOOP_BLOCKED_THRESHOLD_MS")
+    LOOP_INFO = Info("c_event_loop", "Event loop implementation")
+    STARTUP_PHASE = Gauge("c_startup_phase_seconds", "Startup time spent per phase", ["phase"])
+    STARTUP_READY = Gauge("c_startup_ready_seconds", "Process start to accepting RPCs (s)")
     
     # Keep legacy metrics for compatibility
     REQS = TOTAL_RECEIVED
@@ -79,18 +107,53 @@ else:
         def inc(self): pass
         def observe(self, value): pass
         def labels(self, **kwargs): return self
+        def info(self, value): pass
     g_healthy = g_inflight = g_ejected = DummyMetric()
-    TOTAL_RECEIVED = COMPLETED = FAILED = REQS = ERRS = LAT = CD = DummyMetric()
+    TOTAL_RECEIVED = COMPLETED = FAILED = REQS = ERRS = LAT = CD = SEM_WAIT = CONFIG_INFO = DummyMetric()
+    STARTUP_PHASE = STARTUP_READY = DRAIN_SECONDS = SHUTDOWN_ABORTED = DummyMetric()
+    LOOP_LAG = LOOP_BLOCKED = LOOP_INFO = DummyMetric()
     print("✓ Dummy metrics initialized", flush=True)
+STARTUP.mark("metrics")
 
 # Configuration from baseline.env or tunable.env
 D_FAST_URL = os.getenv("D_FAST_URL", "http://d-fast:8000")  
 D_SLOW_URL = os.getenv("D_SLOW_URL", "http://d-slow:8000")
-DEVICE_TIMEOUT_S = float(os.getenv("DEVICE_TIMEOUT_S", "60.0"))  # C→D timeout from config
 ENABLE_C_TO_D_RETRIES = os.getenv("ENABLE_C_TO_D_RETRIES", "false").lower() == "true"
 MAX_C_TO_D_RETRIES = int(os.getenv("MAX_C_TO_D_RETRIES", "0"))
 
+# Live-tunable settings: env at startup, then RUNTIME_CONFIG_FILE and POST /admin/config
+CONFIG = RuntimeConfig([
+    Setting("DEVICE_TIMEOUT_S", float, "60.0", positive),  # C→D timeout from config
+], path=os.getenv("RUNTIME_CONFIG_FILE") or None,
+   poll_s=float(os.getenv("RUNTIME_CONFIG_POLL_S", "2.0")))
+CONFIG.on_change(lambda cfg: CONFIG_INFO.info({"version": cfg.version, "generation": str(cfg.generation)}))
+CONFIG.start_watcher()
+
 PORT = os.getenv("PORT", "50051")
+STATUS_PORT = int(os.getenv("STATUS_PORT", "8090"))  # Small HTTP side port for /__status
+
+# Streaming latency sketches per endpoint and device class, served at /__status
+LATENCY_WINDOW_S = float(os.getenv("LATENCY_WINDOW_S", "60"))
+LATENCY = LatencyBreakdown(window_s=LATENCY_WINDOW_S)
+
+# Event-loop lag probe and blocked-loop stack dumps (started in serve)
+LOOP_MONITOR = LoopMonitor(LOOP_LAG, LOOP_BLOCKED,
+                           interval_s=float(os.getenv("LOOP_PROBE_INTERVAL_MS", "100")) / 1000,
+                           slow_threshold_ms=float(os.getenv("LOOP_BLOCKED_THRESHOLD_MS", "100")))
+
+# On-demand sampling profiler served on the status port at /debug/profile
+PROFILER = StackSampler(interval_s=float(os.getenv("PROFILE_INTERVAL_MS", "10")) / 1000,
+                        max_overhead=float(os.getenv("PROFILE_MAX_OVERHEAD", "0.02")),
+                        max_seconds=float(os.getenv("PROFILE_MAX_SECONDS", "60")))
+
+# Graceful shutdown: on SIGTERM flip readiness, stop taking new RPCs and let
+# in-flight (and queued) requests finish for up to DRAIN_GRACE_S
+DRAIN_GRACE_S = float(os.getenv("DRAIN_GRACE_S", "10.0"))
+DRAIN_READINESS_DELAY_S = float(os.getenv("DRAIN_READINESS_DELAY_S", "0.0"))  # keep serving while LBs notice NOT_SERVING
+SERVICE_NAME = "deviceproxy.DeviceProxy"
+DRAINING = False
+INFLIGHT_RPCS = 0  # requests inside Process, including those queued on SEM
+ABORTED_AT_SHUTDOWN = 0
 
 # Single-threaded behavior: Each C instance can only handle 1 request at a time
 # This is the core constraint that causes the baseline problem
@@ -101,14 +164,45 @@ SEM = asyncio.Semaphore(1)
 def metadata_to_dict(metadata):
     return {item.key: item.value for item in metadata}
 
+def device_class(device_id: str) -> str:
+    return "slow" if "slow" in device_id.lower() else "fast"
+
 def get_device_url(device_id: str) -> str:
-    if "slow" in device_id.lower():
+    if device_class(device_id) == "slow":
         return D_SLOW_URL
     else:
         return D_FAST_URL
 
+# Per-hop timing returned to B in the `server-timing` trailer. Connection setup to D
+# is timed with aiohttp tracing; the request's timings dict is the trace_request_ctx.
+async def _on_connection_create_start(session, trace_ctx, params):
+    trace_ctx.connect_t0 = time.perf_counter()
+
+async def _on_connection_create_end(session, trace_ctx, params):
+    if trace_ctx.trace_request_ctx is not None:
+        trace_ctx.trace_request_ctx["d_connect"] = (time.perf_counter() - trace_ctx.connect_t0) * 1000
+
+D_TRACE_CONFIG = aiohttp.TraceConfig()
+D_TRACE_CONFIG.on_connection_create_start.append(_on_connection_create_start)
+D_TRACE_CONFIG.on_connection_create_end.append(_on_connection_create_end)
+
 class S(rpc.DeviceProxyServicer):
     async def Process(self, req: pb.ProcessRequest, ctx: aio.ServicerContext):
+        global INFLIGHT_RPCS, ABORTED_AT_SHUTDOWN
+        INFLIGHT_RPCS += 1
+        try:
+            return await self.handle(req, ctx)
+        except asyncio.CancelledError:
+            if DRAINING:
+                ABORTED_AT_SHUTDOWN += 1
+                SHUTDOWN_ABORTED.inc()
+                print(f"C request aborted at shutdown: device_id={req.device_id}", flush=True)
+            raise
+        finally:
+            INFLIGHT_RPCS -= 1
+
+    async def handle(self, req: pb.ProcessRequest, ctx: aio.ServicerContext):
+        received = time.perf_counter()
         print(f"DEBUG: Process method called for device_id={req.device_id}", flush=True)
         
         # Extract trace context from gRPC metadata
@@ -148,31 +242,41 @@ class S(rpc.DeviceProxyServicer):
             print(f"C received request: device_id={req.device_id}, ms={req.ms}", flush=True)
             TOTAL_RECEIVED.labels(device_id=req.device_id).inc()  # Track total received
             
+            cfg = CONFIG.current  # one snapshot per request
+            
             # Simple semaphore handling without complex error cases
+            timings = {}
+            wait_t0 = time.perf_counter()
             await SEM.acquire()
             g_inflight.set(1)  # Mark as busy
             
             t0 = time.perf_counter()
+            timings["sem_wait"] = (t0 - wait_t0) * 1000
+            SEM_WAIT.observe(timings["sem_wait"])
+            LATENCY.observe("sem_wait", device_class(req.device_id), timings["sem_wait"])
             try:
                 start = time.perf_counter()
                 device_url = get_device_url(req.device_id)
                 
                 # Simplified HTTP request to device
                 url = f"{device_url}/do_work?device_id={req.device_id}&ms={req.ms}&mode={req.mode}"
-                timeout = aiohttp.ClientTimeout(total=DEVICE_TIMEOUT_S)
+                timeout = aiohttp.ClientTimeout(total=cfg.DEVICE_TIMEOUT_S)
                 
                 print(f"C calling device: {url}", flush=True)
                 
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(url, timeout=timeout) as response:
+                async with aiohttp.ClientSession(trace_configs=[D_TRACE_CONFIG]) as session:
+                    async with session.get(url, timeout=timeout, trace_request_ctx=timings) as response:
                         response.raise_for_status()
                         result = await response.json()
+                        timings["d_work"] = parse_server_timing(response.headers.get("Server-Timing")).get("work")
                 
                 print(f"C got device response: {result}", flush=True)
                 
                 # Track latency
                 cd = (time.perf_counter() - start) * 1000
+                timings["d_response"] = cd - timings.get("d_connect", 0.0)
                 CD.labels(device_id=req.device_id).observe(cd)
+                LATENCY.observe("c_to_d", device_class(req.device_id), cd)
                 
                 # Track successful completion
                 COMPLETED.labels(device_id=req.device_id).inc()
@@ -191,27 +295,132 @@ class S(rpc.DeviceProxyServicer):
                 raise grpc.aio.AioRpcError(grpc.StatusCode.UNAVAILABLE, f"device error: {e}")
             finally:
                 # Always release semaphore and mark as available
-                LAT.labels(device_id=req.device_id).observe((time.perf_counter() - t0) * 1000)
+                elapsed_ms = (time.perf_counter() - t0) * 1000
+                LAT.labels(device_id=req.device_id, config_version=cfg.version).observe(elapsed_ms)
+                LATENCY.observe("Process", device_class(req.device_id), elapsed_ms)
+                timings["c_total"] = (time.perf_counter() - received) * 1000
+                ctx.set_trailing_metadata((("server-timing", format_server_timing(timings)),))
                 SEM.release()
                 g_inflight.set(0)  # Mark as available
                 print(f"C request completed", flush=True)
 
+async def status_handler(request: web.Request) -> web.Response:
+    return web.json_response({
+        "inflight": SEM.locked(),
+        "inflight_rpcs": INFLIGHT_RPCS,
+        "draining": DRAINING,
+        "config_version": CONFIG.current.version,
+        "latency_ms": LATENCY.snapshot(),
+    })
+
+async def get_config_handler(request: web.Request) -> web.Response:
+    return web.json_response(CONFIG.current.as_dict())
+
+async def update_config_handler(request: web.Request) -> web.Response:
+    try:
+        changes = await request.json()
+        if not isinstance(changes, dict):
+            raise ValueError("expected a JSON object")
+        return web.json_response(CONFIG.update(changes).as_dict())
+    except ConfigError as e:
+        return web.json_response({"detail": e.errors}, status=400)
+    except ValueError as e:
+        return web.json_response({"detail": str(e)}, status=400)
+
+async def profile_handler(request: web.Request) -> web.Response:
+    try:
+        seconds = float(request.query.get("seconds", "10"))
+        top = int(request.query.get("top", "20"))
+    except ValueError:
+        return web.json_response({"detail": "seconds and top must be numbers"}, status=400)
+    if not 0 < seconds <= PROFILER.max_seconds:
+        return web.json_response({"detail": f"seconds must be in (0, {PROFILER.max_seconds:g}]"}, status=400)
+    try:
+        # Dedicated thread: the sampler blocks for the whole window
+        result = await asyncio.to_thread(PROFILER.profile, seconds, top, request.query.get("thread"))
+    except ProfilerBusy as e:
+        return web.json_response({"detail": str(e)}, status=409)
+    if request.query.get("format") == "collapsed":
+        return web.Response(text=result["collapsed"])
+    return web.json_response(result)
+
+async def start_status_server() -> web.AppRunner:
+    status_app = web.Application()
+    status_app.router.add_get("/__status", status_handler)
+    status_app.router.add_get("/admin/config", get_config_handler)
+    status_app.router.add_post("/admin/config", update_config_handler)
+    status_app.router.add_get("/debug/profile", profile_handler)
+    runner = web.AppRunner(status_app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, port=STATUS_PORT).start()
+    print(f"✓ Status server started on port {STATUS_PORT}", flush=True)
+    return runner
+
 async def serve():
+    STARTUP.mark("module_init")
+    LOOP_MONITOR.start()
+    LOOP_INFO.info({"impl": loop_implementation(asyncio.get_running_loop())})
+    try:
+        status_runner = await start_status_server()
+    except OSError as e:
+        status_runner = None
+        print(f"⚠ Could not start status server: {e}", flush=True)
+    STARTUP.mark("status_server")
+
     print(f"Starting gRPC server on port {PORT}", flush=True)
     server = aio.server(options=[('grpc.keepalive_time_ms', 15000)])
     rpc.add_DeviceProxyServicer_to_server(S(), server)
+    health_servicer = health.aio.HealthServicer()
+    health_pb2_grpc.add_HealthServicer_to_server(health_servicer, server)
     server.add_insecure_port(f"[::]:{PORT}")
     print("✓ gRPC server configured", flush=True)
     
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    
     await server.start()
+    for name in ("", SERVICE_NAME):
+        await health_servicer.set(name, health_pb2.HealthCheckResponse.SERVING)
+    g_healthy.set(1)
+    STARTUP.mark("grpc_start")
+    STARTUP.ready()
     print("✓ gRPC server started and ready for requests", flush=True)
     
+    if FAST_START:
+        try:
+            with STARTUP.phase("instrumentation_deferred"):
+                await asyncio.get_running_loop().run_in_executor(None, init_instrumentation)
+        except Exception as e:
+            print(f"[ERROR] Deferred instrumentation failed: {e}", flush=True)
+    STARTUP.export(STARTUP_PHASE, STARTUP_READY)
+    STARTUP.log_once()
+    
     try:
-        await server.wait_for_termination()
-    except KeyboardInterrupt:
-        print("Shutting down server...", flush=True)
-        await server.stop(0)
+        await stop.wait()
+        await drain(server, health_servicer)
+    finally:
+        if status_runner is not None:
+            await status_runner.cleanup()
+
+async def drain(server: aio.Server, health_servicer):
+    global DRAINING
+    DRAINING = True
+    t0 = time.perf_counter()
+    g_healthy.set(0)
+    await health_servicer.enter_graceful_shutdown()  # every service reports NOT_SERVING
+    print(f"Draining: {INFLIGHT_RPCS} in-flight request(s), grace {DRAIN_GRACE_S:.1f}s", flush=True)
+    if DRAIN_READINESS_DELAY_S > 0:
+        await asyncio.sleep(DRAIN_READINESS_DELAY_S)
+    # Rejects new RPCs right away; cancels whatever is still running once the grace period is over
+    await server.stop(DRAIN_GRACE_S)
+    await asyncio.sleep(0)  # let cancelled handlers record themselves
+    elapsed = time.perf_counter() - t0
+    DRAIN_SECONDS.set(elapsed)
+    print(f"Drain finished in {elapsed:.2f}s, aborted {ABORTED_AT_SHUTDOWN} request(s)", flush=True)
 
 if __name__ == "__main__":
     print("=== Service C Starting ===", flush=True)
+    print(f"Event loop: {use_uvloop_if_requested()}", flush=True)
     asyncio.run(serve())
\ No newline at end of file
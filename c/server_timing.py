@@ -0,0 +1,35 @@
+"""Server-Timing header helpers (https://www.w3.org/TR/server-timing/).
+
+D reports its own work as `Server-Timing: work;dur=N`, C returns its hop
+breakdown in the same format as the `server-timing` gRPC trailer, and B
+merges both into the header of its /process response. Only the `dur`
+parameter is used.
+
+Stdlib-only and duplicated per service like otel_init.py.
+"""
+from typing import Dict, Iterable, Optional, Tuple
+
+def format_server_timing(entries: Dict[str, Optional[float]]) -> str:
+    """{"e2e": 12.3, ...} -> "e2e;dur=12.3, ..." (None values are skipped)."""
+    return ", ".join(f"{name};dur={ms:.1f}" for name, ms in entries.items() if ms is not None)
+
+def parse_server_timing(value: Optional[str]) -> Dict[str, float]:
+    """Inverse of format_server_timing; entries without a valid dur are dropped."""
+    timings: Dict[str, float] = {}
+    for entry in (value or "").split(","):
+        name, *params = (p.strip() for p in entry.split(";"))
+        for param in params:
+            key, _, raw = param.partition("=")
+            if name and key.strip().lower() == "dur":
+                try:
+                    timings[name] = float(raw.strip().strip('"'))
+                except ValueError:
+                    pass
+    return timings
+
+def from_metadata(metadata: Optional[Iterable[Tuple[str, str]]]) -> Dict[str, float]:
+    """Pull the `server-timing` entry out of gRPC (trailing) metadata."""
+    for key, value in metadata or ():
+        if key == "server-timing":
+            return parse_server_timing(value)
+    return {}
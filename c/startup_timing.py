@@ -0,0 +1,64 @@
+"""Per-phase startup timing.
+
+Import this module first. `mark(name)` records the time since the previous
+mark (the first mark is measured from process start, so it includes
+interpreter and server boot), `phase(name)` times a block that runs out of
+order (e.g. deferred instrumentation), and `log_once()` prints the summary.
+
+Stdlib-only and duplicated per service like otel_init.py.
+"""
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+def process_start_time() -> float:
+    """Wall-clock start of this process (Linux /proc), else import time."""
+    try:
+        with open("/proc/self/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        start_ticks = int(fields[19])  # field 22 overall: starttime in clock ticks
+        with open("/proc/stat") as f:
+            btime = next(int(line.split()[1]) for line in f if line.startswith("btime"))
+        return btime + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, StopIteration):
+        return time.time()
+
+class StartupTimer:
+    def __init__(self, service: str):
+        self.service = service
+        self.t0 = min(process_start_time(), time.time())
+        self._last = self.t0
+        self.phases: Dict[str, float] = {}
+        self.ready_s = None
+        self._logged = False
+
+    def mark(self, name: str):
+        now = time.time()
+        self.phases[name] = now - self._last
+        self._last = now
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.time() - start
+
+    def ready(self):
+        self.ready_s = time.time() - self.t0
+
+    def export(self, phase_gauge, ready_gauge):
+        for name, seconds in self.phases.items():
+            phase_gauge.labels(phase=name).set(seconds)
+        if self.ready_s is not None:
+            ready_gauge.set(self.ready_s)
+
+    def log_once(self):
+        if self._logged:
+            return
+        self._logged = True
+        parts = " | ".join(f"{name}={seconds*1000:.0f}ms" for name, seconds in self.phases.items())
+        ready = f"{self.ready_s*1000:.0f}ms" if self.ready_s is not None else "n/a"
+        print(f"[STARTUP] {self.service} time-to-ready={ready} | {parts}", flush=True)
@@ -1,14 +1,18 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Body, FastAPI, HTTPException, Response
+from fastapi.responses import PlainTextResponse
 import asyncio
 import os
-from typing import Dict
+import time
+from typing import Any, Dict
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
-from prometheus_client import start_http_server, Gauge
+from prometheus_client import start_http_server, Counter, Gauge, Histogram, Info
+from sampler import ProfilerBusy, StackSampler
+from loop_health import LAG_BUCKETS_MS, LoopMonitor, loop_implementation
 from otel_init import init_tracing
+from runtime_config import ConfigError, RuntimeConfig, Setting, positive
 
 # Device configuration
 DEVICE_TYPE = os.getenv("DEVICE_TYPE", "normal")
-SLOW_MULTIPLIER = float(os.getenv("SLOW_MULTIPLIER", "1.0"))
 SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "svc-d")
 
 init_tracing(SERVICE_NAME)
@@ -17,20 +21,72 @@ FastAPIInstrumentor.instrument_app(app)
 
 start_http_server(9100)
 g_inflight = Gauge("d_inflight", "requests in flight", ["device"])
+g_config = Info("d_config", "Active runtime configuration version")
+g_loop_lag = Histogram("d_loop_lag_ms", "Event loop lag: how late a periodic probe wakes up (ms)",
+                       buckets=LAG_BUCKETS_MS)
+c_loop_blocked = Counter("d_loop_blocked", "Times the event loop was blocked past LOOP_BLOCKED_THRESHOLD_MS")
+g_loop_info = Info("d_event_loop", "Event loop implementation")
+
+# Event-loop lag probe and blocked-loop stack dumps
+loop_monitor = LoopMonitor(g_loop_lag, c_loop_blocked,
+                           interval_s=float(os.getenv("LOOP_PROBE_INTERVAL_MS", "100")) / 1000,
+                           slow_threshold_ms=float(os.getenv("LOOP_BLOCKED_THRESHOLD_MS", "100")))
+
+# Live-tunable fault injection: env at startup, then RUNTIME_CONFIG_FILE and POST /admin/config
+CONFIG = RuntimeConfig([
+    Setting("SLOW_MULTIPLIER", float, "1.0", positive),
+], path=os.getenv("RUNTIME_CONFIG_FILE") or None,
+   poll_s=float(os.getenv("RUNTIME_CONFIG_POLL_S", "2.0")))
+CONFIG.on_change(lambda cfg: g_config.info({"version": cfg.version, "generation": str(cfg.generation)}))
+CONFIG.start_watcher()
 
 locks: Dict[str, asyncio.Lock] = {}
 
+# On-demand sampling profiler for /debug/profile
+profiler = StackSampler(interval_s=float(os.getenv("PROFILE_INTERVAL_MS", "10")) / 1000,
+                        max_overhead=float(os.getenv("PROFILE_MAX_OVERHEAD", "0.02")),
+                        max_seconds=float(os.getenv("PROFILE_MAX_SECONDS", "60")))
+
+@app.on_event("startup")
+async def start_loop_monitor():
+    loop_monitor.start()
+    g_loop_info.info({"impl": loop_implementation(asyncio.get_running_loop())})
+
 @app.get("/health")
 async def health():
-    return {"ok": True, "device_type": DEVICE_TYPE, "slow_multiplier": SLOW_MULTIPLIER}
+    return {"ok": True, "device_type": DEVICE_TYPE, "slow_multiplier": CONFIG.current.SLOW_MULTIPLIER}
+
+@app.get("/debug/profile")
+async def debug_profile(seconds: float = 10.0, top: int = 20, format: str = "json", thread: str | None = None):
+    if not 0 < seconds <= profiler.max_seconds:
+        raise HTTPException(status_code=400, detail=f"seconds must be in (0, {profiler.max_seconds:g}]")
+    try:
+        result = await asyncio.to_thread(profiler.profile, seconds, top, thread)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if format == "collapsed":
+        return PlainTextResponse(result["collapsed"])
+    return result
+
+@app.get("/admin/config")
+async def get_config():
+    return CONFIG.current.as_dict()
+
+@app.post("/admin/config")
+async def update_config(changes: Dict[str, Any] = Body(...)):
+    try:
+        return CONFIG.update(changes).as_dict()
+    except ConfigError as e:
+        raise HTTPException(status_code=400, detail=e.errors)
 
 @app.get("/do_work")
-async def do_work(device_id: str, ms: int = 3000, mode: str = "normal"):
+async def do_work(response: Response, device_id: str, ms: int = 3000, mode: str = "normal"):
     lock = locks.setdefault(device_id, asyncio.Lock())
     if lock.locked():
         raise HTTPException(status_code=429, detail="device busy")
     async with lock:
         g_inflight.labels(device=device_id).set(1)
+        t0 = time.perf_counter()
         try:
             if mode == "hang":
                 await asyncio.Future()
@@ -38,8 +94,10 @@ async def do_work(device_id: str, ms: int = 3000, mode: str = "normal"):
                 raise HTTPException(status_code=500, detail="device error")
             
             # Apply slow multiplier for slow devices
-            actual_ms = int(ms * SLOW_MULTIPLIER)
+            actual_ms = int(ms * CONFIG.current.SLOW_MULTIPLIER)
             await asyncio.sleep(actual_ms/1000)
+            # Own work time, so C can tell it apart from the network (see C's server-timing trailer)
+            response.headers["Server-Timing"] = f"work;dur={(time.perf_counter() - t0) * 1000:.1f}"
             return {"device_id": device_id, "cost_ms": actual_ms, "device_type": DEVICE_TYPE}
         finally:
             g_inflight.labels(device=device_id).set(0)
\ No newline at end of file
@@ -0,0 +1,12 @@
+"""Discrete-event, virtual-time simulator of the A→B→C→D topology.
+
+See simulator/README.md. Entry point: python -m simulator.
+"""
+from .config import Topology, Workload, load_params
+from .engine import Engine
+from .model import Simulation
+from .runner import simulate, simulate_arrivals, sweep, validate
+from .workload import Arrivals, from_records, generate
+
+__all__ = ["Arrivals", "Engine", "Simulation", "Topology", "Workload", "from_records", "generate",
+           "load_params", "simulate", "simulate_arrivals", "sweep", "validate"]
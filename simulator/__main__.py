@@ -0,0 +1,89 @@
+"""Command line: python -m simulator {run,sweep,validate} ...
+
+    python -m simulator run --env config/baseline.env --set RATE=6 --set SLOW_PCT=0.3
+    python -m simulator sweep --env config/tunable.env --grid C_REPLICAS=10,15,21 --grid RATE=2,4,6,8
+    python -m simulator validate --env config/baseline.env --capture captures/b-traffic.bcap
+"""
+import argparse
+import json
+import sys
+
+from .config import Topology, load_params, parse_assignments
+from .report import fmt, print_summary, print_sweep
+from .runner import compare, simulate, sweep, validate
+
+def add_common(p: argparse.ArgumentParser):
+    p.add_argument("--env", action="append", default=[],
+                   help="Service config file(s), e.g. config/baseline.env (later files win)")
+    p.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                   help="Override a setting or workload key (RATE, SLOW_PCT, C_REPLICAS, DURATION_S, ...)")
+    p.add_argument("--out", help="Write results as JSON")
+
+def write_json(path: str, data):
+    if path:
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+        print(f"\nWrote {path}")
+
+def cmd_run(args) -> int:
+    params = load_params(args.env, parse_assignments(args.set))
+    summary = simulate(params)
+    print_summary(f"Simulated {float(params['DURATION_S']):.0f}s at {params['RATE']} rps, "
+                  f"{params['C_REPLICAS']} C replicas", summary)
+    print(f"\n{summary['events']} events in {summary['wall_s']:.2f}s wall "
+          f"({summary['simulated_s'] / max(summary['wall_s'], 1e-9):.0f}x real time)")
+    write_json(args.out, summary)
+    return 0
+
+def cmd_sweep(args) -> int:
+    base = load_params(args.env, parse_assignments(args.set))
+    grid = {k: v.split(",") for k, v in parse_assignments(args.grid).items()}
+    if not grid:
+        print("sweep needs at least one --grid KEY=v1,v2,...", file=sys.stderr)
+        return 2
+    rows = sweep(base, grid, args.jobs)
+    print_sweep(rows, list(grid))
+    write_json(args.out, rows)
+    return 0
+
+def cmd_validate(args) -> int:
+    params = load_params(args.env, parse_assignments(args.set))
+    result = validate(Topology.from_params(params), args.capture, args.limit)
+    print_summary("Observed (capture)", result["observed"])
+    print_summary("Simulated (same arrivals)", result["simulated"])
+    rows = compare(result["observed"], result["simulated"], args.tolerance)
+    print(f"\n{'metric':<16} {'observed':>10} {'simulated':>10} {'error':>8}")
+    for row in rows:
+        verdict = "" if row["ok"] is None else ("ok" if row["ok"] else "MISMATCH")
+        err = "-" if row["error"] is None else f"{100 * row['error']:.1f}%"
+        print(f"{row['metric']:<16} {fmt(row['observed'], '.3f'):>10} {fmt(row['simulated'], '.3f'):>10} {err:>8}  {verdict}")
+    write_json(args.out, {**result, "comparison": rows})
+    return 1 if any(row["ok"] is False for row in rows) else 0
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m simulator",
+                                     description="Discrete-event simulator of the A→B→C→D topology")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("run", help="Simulate one configuration")
+    add_common(p)
+    p.set_defaults(func=cmd_run)
+
+    p = sub.add_parser("sweep", help="Simulate every combination of --grid values in parallel")
+    add_common(p)
+    p.add_argument("--grid", action="append", default=[], metavar="KEY=v1,v2,...")
+    p.add_argument("--jobs", type=int, help="Worker processes (default: all cores)")
+    p.set_defaults(func=cmd_sweep)
+
+    p = sub.add_parser("validate", help="Replay a B capture's arrivals and compare with what B recorded")
+    add_common(p)
+    p.add_argument("--capture", required=True, help="Capture file written by B (CAPTURE_ENABLED=true)")
+    p.add_argument("--limit", type=int, default=0, help="Only use the first N records")
+    p.add_argument("--tolerance", type=float, default=0.15, help="Max relative error per metric")
+    p.set_defaults(func=cmd_validate)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
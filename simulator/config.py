@@ -0,0 +1,127 @@
+"""Simulation parameters, read from the same config/*.env files the services use.
+
+Everything is one flat KEY=VALUE namespace: service settings (REQUEST_TIMEOUT_S,
+MAP_*, BULKHEAD_*, ...) come from the env file, workload and
+topology keys (RATE, SLOW_PCT, C_REPLICAS, ...) have defaults here, and
+`--set` / `--grid` on the command line override either kind.
+"""
+import os
+import sys
+from dataclasses import dataclass, fields
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "b"))
+from runtime_config import parse_bool, read_env_file
+
+# Workload/topology keys that are not service settings
+DEFAULTS = {
+    "C_REPLICAS": "21",         # docker compose up -d --scale c=21
+    "RATE": "5.0",              # client requests per second (Poisson)
+    "DURATION_S": "3600",
+    "WARMUP_S": "60",           # requests arriving earlier are not counted
+    "MS": "3000",               # requested device work per call
+    "SLOW_PCT": "0.15",
+    "HANG_PCT": "0.0",
+    "ERROR_PCT": "0.0",
+    "FAST_DEVICES": "80",
+    "SLOW_DEVICES": "3",
+    "HANG_DEVICES": "1",
+    "HOP_MS": "1.0",            # one-way network + framework overhead per hop
+    "SEED": "1",
+    "SIM_B_TO_C_RETRIES": "0",  # what-if only: b/app.py does not retry C
+}
+
+def load_params(env_files: List[str], overrides: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    params = dict(DEFAULTS)
+    for path in env_files:
+        params.update(read_env_file(path))
+    params.update(overrides or {})
+    return params
+
+def parse_assignments(items: List[str]) -> Dict[str, str]:
+    """["KEY=VALUE", ...] -> {"KEY": "VALUE"}"""
+    out = {}
+    for item in items or []:
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"expected KEY=VALUE, got {item!r}")
+        out[key.strip().upper()] = value.strip()
+    return out
+
+def _get(params: Dict[str, str], key: str, parse, default):
+    raw = params.get(key)
+    return parse(raw) if raw not in (None, "") else default
+
+@dataclass
+class Topology:
+    c_replicas: int = 21
+    hop_s: float = 0.001
+    # A (client)
+    client_timeout_s: float = 60.0
+    client_retries: int = 0
+    client_backoff_base_s: float = 0.2
+    client_backoff_cap_s: float = 2.0
+    # B
+    request_timeout_s: float = 10.0
+    b_retries: int = 0
+    b_retry_backoff_s: float = 0.1
+    map_unavailable_to_503: bool = False
+    retry_after_s: Optional[float] = None
+    bulkhead_enabled: bool = False
+    bulkhead_fast_limit: int = 15
+    bulkhead_fast_queue: int = 30
+    bulkhead_slow_limit: int = 6
+    bulkhead_slow_queue: int = 10
+    bulkhead_queue_timeout_s: float = 1.0
+    # C and D
+    device_timeout_s: float = 60.0
+    slow_multiplier: float = 3.3
+
+    @classmethod
+    def from_params(cls, p: Dict[str, str]) -> "Topology":
+        retry_after = _get(p, "RETRY_AFTER_SECONDS", float, 0.2) if _get(p, "ENABLE_RETRY_AFTER_HEADERS", parse_bool, False) else None
+        return cls(
+            c_replicas=_get(p, "C_REPLICAS", int, 21),
+            hop_s=_get(p, "HOP_MS", float, 1.0) / 1000,
+            client_timeout_s=_get(p, "A_TO_B_TIMEOUT_S", float, 60.0),
+            client_retries=_get(p, "A_TO_B_MAX_RETRIES", int, 0),
+            request_timeout_s=_get(p, "REQUEST_TIMEOUT_S", float, 10.0),
+            # b/app.py has no app-level B→C retry loop (MAX_B_TO_C_RETRIES only exists in the
+            # env files), so B never retries unless asked for with the simulator-only key
+            b_retries=_get(p, "SIM_B_TO_C_RETRIES", int, 0),
+            b_retry_backoff_s=_get(p, "B_TO_C_RETRY_BACKOFF_MS", float, 100.0) / 1000,
+            map_unavailable_to_503=_get(p, "MAP_UNAVAILABLE_TO_503", parse_bool, False),
+            retry_after_s=retry_after,
+            bulkhead_enabled=_get(p, "BULKHEAD_ENABLED", parse_bool, False),
+            bulkhead_fast_limit=_get(p, "BULKHEAD_FAST_LIMIT", int, 15),
+            bulkhead_fast_queue=_get(p, "BULKHEAD_FAST_QUEUE", int, 30),
+            bulkhead_slow_limit=_get(p, "BULKHEAD_SLOW_LIMIT", int, 6),
+            bulkhead_slow_queue=_get(p, "BULKHEAD_SLOW_QUEUE", int, 10),
+            bulkhead_queue_timeout_s=_get(p, "BULKHEAD_QUEUE_TIMEOUT_S", float, 1.0),
+            device_timeout_s=_get(p, "DEVICE_TIMEOUT_S", float, 60.0),
+            # d-slow sets SLOW_MULTIPLIER=3.3 in docker-compose.yml; d-fast runs at 1.0
+            slow_multiplier=_get(p, "SLOW_MULTIPLIER", float, 3.3),
+        )
+
+@dataclass
+class Workload:
+    rate: float = 5.0
+    duration_s: float = 3600.0
+    warmup_s: float = 60.0
+    ms: int = 3000
+    slow_pct: float = 0.15
+    hang_pct: float = 0.0
+    error_pct: float = 0.0
+    fast_devices: int = 80
+    slow_devices: int = 3
+    hang_devices: int = 1
+    seed: int = 1
+
+    @classmethod
+    def from_params(cls, p: Dict[str, str]) -> "Workload":
+        types = {f.name: f.type for f in fields(cls)}
+        kwargs = {}
+        for name in types:
+            parse = int if types[name] in (int, "int") else float
+            kwargs[name] = _get(p, name.upper(), parse, getattr(cls, name))
+        return cls(**kwargs)
@@ -0,0 +1,41 @@
+"""Minimal discrete-event engine: a heap of (time, seq, callback, args).
+
+Time is virtual seconds; nothing sleeps. `cancel()` marks an event dead
+instead of removing it from the heap (lazy deletion), which keeps both
+scheduling and cancelling O(log n) / O(1).
+"""
+import heapq
+import itertools
+from typing import Callable, List
+
+Event = List  # [time, seq, callback or None, args]
+
+class Engine:
+    def __init__(self):
+        self.now = 0.0
+        self.events_run = 0
+        self._heap: List[Event] = []
+        self._seq = itertools.count()
+
+    def at(self, t: float, fn: Callable, *args) -> Event:
+        ev = [t, next(self._seq), fn, args]
+        heapq.heappush(self._heap, ev)
+        return ev
+
+    def after(self, delay: float, fn: Callable, *args) -> Event:
+        return self.at(self.now + delay, fn, *args)
+
+    @staticmethod
+    def cancel(ev: Event):
+        if ev is not None:
+            ev[2] = None
+
+    def run(self, until: float = float("inf")):
+        heap = self._heap
+        while heap and heap[0][0] <= until:
+            t, _, fn, args = heapq.heappop(heap)
+            if fn is None:
+                continue
+            self.now = t
+            self.events_run += 1
+            fn(*args)
@@ -0,0 +1,292 @@
+"""A→B→C→D model on top of the event engine.
+
+What is modelled, mirroring the services:
+
+- A: per-attempt timeout (A_TO_B_TIMEOUT_S) and up to A_TO_B_MAX_RETRIES
+  retries on 429/503 with full-jitter backoff, honouring Retry-After
+  (docs/RETRY.md). Never retries 504 or its own timeout.
+- B: optional per-class bulkheads, REQUEST_TIMEOUT_S per call to C (504, and
+  the call is cancelled), status mapping per MAP_*. Like b/app.py it doesn't
+  retry C; SIM_B_TO_C_RETRIES (simulator only) adds retries on UNAVAILABLE
+  with a fixed B_TO_C_RETRY_BACKOFF_MS backoff for what-if runs.
+- C: C_REPLICAS instances picked round-robin, each with one slot and a FIFO
+  queue in front of it (SEM = asyncio.Semaphore(1)); DEVICE_TIMEOUT_S on the
+  D call; any D failure is UNAVAILABLE. A cancelled call frees the slot.
+- D: one lock per device; a busy device answers 429 right away, work takes
+  ms (x SLOW_MULTIPLIER on d-slow), "error" fails at once and "hang" never
+  answers and keeps the device locked. D doesn't notice cancelled callers,
+  so the lock is held until the work is done.
+"""
+import random
+from collections import deque
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .config import Topology
+from .engine import Engine
+from .workload import ERROR, HANG, SLOW, Arrivals
+
+INF = float("inf")
+OK, UNAVAILABLE = "OK", "UNAVAILABLE"
+
+class _ClientRequest:
+    __slots__ = ("i", "t0", "attempts", "timer")
+
+    def __init__(self, i: int, t0: float):
+        self.i, self.t0, self.attempts, self.timer = i, t0, 0, None
+
+class _BRequest:
+    """One A→B attempt as seen by B."""
+    __slots__ = ("client", "i", "t0", "abandoned", "admitted", "bh_timer", "calls")
+
+    def __init__(self, client: _ClientRequest, t0: float):
+        self.client, self.i, self.t0 = client, client.i, t0
+        self.abandoned = self.admitted = False
+        self.bh_timer = None
+        self.calls = 0
+
+class _Call:
+    """One B→C attempt."""
+    __slots__ = ("req", "c", "cancelled", "started", "finished", "queued_at", "timeout_ev", "d_timer", "d_ev")
+
+    def __init__(self, req: _BRequest, c: int):
+        self.req, self.c = req, c
+        self.cancelled = self.started = self.finished = False
+        self.queued_at = 0.0
+        self.timeout_ev = self.d_timer = self.d_ev = None
+
+class _Bulkhead:
+    __slots__ = ("limit", "max_queue", "inflight", "queue", "rejected")
+
+    def __init__(self, limit: int, max_queue: int):
+        self.limit, self.max_queue = limit, max_queue
+        self.inflight = 0
+        self.queue: deque = deque()
+        self.rejected = 0
+
+class Simulation:
+    def __init__(self, topo: Topology, seed: int = 1):
+        self.topo = topo
+        self.engine = Engine()
+        self.rng = random.Random(seed)
+        n = topo.c_replicas
+        self.c_busy = [False] * n
+        self.c_busy_since = [0.0] * n
+        self.c_busy_total = 0.0
+        self.c_queue: List[deque] = [deque() for _ in range(n)]
+        self.c_rr = 0
+        self.d_busy_until: Dict[int, float] = {}
+        self.bulkheads: Dict[int, _Bulkhead] = {}
+        if topo.bulkhead_enabled:
+            self.bulkheads = {0: _Bulkhead(topo.bulkhead_fast_limit, topo.bulkhead_fast_queue),
+                              SLOW: _Bulkhead(topo.bulkhead_slow_limit, topo.bulkhead_slow_queue)}
+        self.b_requests = 0
+        self.c_calls = 0
+        self.d_calls = 0
+        self.sem_wait_total = 0.0
+        self.sem_waits = 0
+
+    # --- driver -------------------------------------------------------------
+
+    def run(self, arrivals: Arrivals) -> Dict[str, np.ndarray]:
+        n = len(arrivals)
+        self.a = arrivals
+        self.status = np.zeros(n, dtype=np.int16)
+        self.latency = np.full(n, np.nan)
+        self.attempts = np.zeros(n, dtype=np.int16)
+        if n:
+            self.engine.at(float(arrivals.t[0]), self._arrive, 0)
+        self.engine.run()
+        end = self.engine.now
+        for c, busy in enumerate(self.c_busy):
+            if busy:
+                self.c_busy_total += end - self.c_busy_since[c]
+        return {"status": self.status, "latency_ms": self.latency * 1000, "attempts": self.attempts}
+
+    def _arrive(self, i: int):
+        # chain arrivals instead of pre-loading the heap with all of them
+        if i + 1 < len(self.a):
+            self.engine.at(float(self.a.t[i + 1]), self._arrive, i + 1)
+        self._client_attempt(_ClientRequest(i, self.engine.now))
+
+    # --- A ------------------------------------------------------------------
+
+    def _client_attempt(self, cr: _ClientRequest):
+        cr.attempts += 1
+        req = _BRequest(cr, self.engine.now)
+        if self.topo.client_timeout_s:
+            cr.timer = self.engine.after(self.topo.client_timeout_s, self._client_timeout, req)
+        self.engine.after(self.topo.hop_s, self._b_receive, req)
+
+    def _client_timeout(self, req: _BRequest):
+        req.abandoned = True
+        self._client_outcome(req.client, 0, None)
+
+    def _client_response(self, req: _BRequest, status: int, retry_after: Optional[float]):
+        if req.abandoned:
+            return
+        Engine.cancel(req.client.timer)
+        self._client_outcome(req.client, status, retry_after)
+
+    def _client_outcome(self, cr: _ClientRequest, status: int, retry_after: Optional[float]):
+        t = self.topo
+        if status in (429, 503) and cr.attempts <= t.client_retries:
+            backoff = self.rng.uniform(0, min(t.client_backoff_cap_s, t.client_backoff_base_s * 2 ** (cr.attempts - 1)))
+            self.engine.after(max(backoff, retry_after or 0.0), self._client_attempt, cr)
+            return
+        self.status[cr.i] = status
+        self.latency[cr.i] = self.engine.now - cr.t0
+        self.attempts[cr.i] = cr.attempts
+
+    # --- B ------------------------------------------------------------------
+
+    def _b_receive(self, req: _BRequest):
+        self.b_requests += 1
+        bh = self.bulkheads.get(int(self.a.cls[req.i]))
+        if bh is None:
+            return self._b_call(req)
+        if bh.inflight < bh.limit and not bh.queue:
+            bh.inflight += 1
+            req.admitted = True
+            return self._b_call(req)
+        if len(bh.queue) >= bh.max_queue:
+            bh.rejected += 1
+            return self._b_reply(req, 429, self.topo.retry_after_s)
+        bh.queue.append(req)
+        req.bh_timer = self.engine.after(self.topo.bulkhead_queue_timeout_s, self._b_queue_timeout, req, bh)
+
+    def _b_queue_timeout(self, req: _BRequest, bh: _Bulkhead):
+        bh.queue.remove(req)
+        bh.rejected += 1
+        self._b_reply(req, 429, self.topo.retry_after_s)
+
+    def _b_release(self, req: _BRequest):
+        bh = self.bulkheads[int(self.a.cls[req.i])]
+        bh.inflight -= 1
+        while bh.queue and bh.inflight < bh.limit:
+            nxt = bh.queue.popleft()
+            Engine.cancel(nxt.bh_timer)
+            bh.inflight += 1
+            nxt.admitted = True
+            self._b_call(nxt)
+
+    def _b_call(self, req: _BRequest):
+        req.calls += 1
+        self.c_calls += 1
+        c = self.c_rr % self.topo.c_replicas
+        self.c_rr += 1
+        call = _Call(req, c)
+        call.timeout_ev = self.engine.after(self.topo.request_timeout_s, self._b_timeout, call)
+        self.engine.after(self.topo.hop_s, self._c_receive, call)
+
+    def _b_timeout(self, call: _Call):
+        call.cancelled = True
+        self._c_cancel(call)
+        self._b_reply(call.req, 504, None)
+
+    def _b_call_done(self, call: _Call, code: str):
+        if call.cancelled:
+            return
+        Engine.cancel(call.timeout_ev)
+        req = call.req
+        if code == OK:
+            return self._b_reply(req, 200, None)
+        if req.calls <= self.topo.b_retries:
+            self.engine.after(self.topo.b_retry_backoff_s, self._b_call, req)
+            return
+        self._b_reply(req, 503 if self.topo.map_unavailable_to_503 else 502, None)
+
+    def _b_reply(self, req: _BRequest, status: int, retry_after: Optional[float]):
+        if req.admitted:
+            self._b_release(req)
+        self.engine.after(self.topo.hop_s, self._client_response, req, status, retry_after)
+
+    # --- C ------------------------------------------------------------------
+
+    def _c_receive(self, call: _Call):
+        if call.cancelled:
+            return
+        if self.c_busy[call.c]:
+            call.queued_at = self.engine.now
+            self.c_queue[call.c].append(call)
+        else:
+            self._c_start(call, self.engine.now)
+
+    def _c_start(self, call: _Call, queued_since: float):
+        c = call.c
+        self.c_busy[c] = True
+        self.c_busy_since[c] = self.engine.now
+        self.sem_wait_total += self.engine.now - queued_since
+        self.sem_waits += 1
+        call.started = True
+        call.d_timer = self.engine.after(self.topo.device_timeout_s, self._c_device_timeout, call)
+        self.engine.after(self.topo.hop_s, self._d_receive, call)
+
+    def _c_release(self, c: int):
+        self.c_busy[c] = False
+        self.c_busy_total += self.engine.now - self.c_busy_since[c]
+        queue = self.c_queue[c]
+        while queue:
+            nxt = queue.popleft()
+            if not nxt.cancelled:
+                self._c_start(nxt, nxt.queued_at)
+                break
+
+    def _c_cancel(self, call: _Call):
+        if call.started and not call.finished:
+            call.finished = True
+            Engine.cancel(call.d_timer)
+            Engine.cancel(call.d_ev)
+            self._c_release(call.c)
+        # queued or still in transit: skipped when C gets to it
+
+    def _c_device_timeout(self, call: _Call):
+        Engine.cancel(call.d_ev)
+        self._c_finish(call, UNAVAILABLE)
+
+    def _c_d_response(self, call: _Call, ok: bool):
+        if call.finished:
+            return
+        Engine.cancel(call.d_timer)
+        self._c_finish(call, OK if ok else UNAVAILABLE)
+
+    def _c_finish(self, call: _Call, code: str):
+        call.finished = True
+        self._c_release(call.c)
+        self.engine.after(self.topo.hop_s, self._b_call_done, call, code)
+
+    # --- D ------------------------------------------------------------------
+
+    def _d_receive(self, call: _Call):
+        if call.finished:
+            return  # C gave up before the request reached D
+        self.d_calls += 1
+        i = call.req.i
+        key = int(self.a.device[i])
+        now = self.engine.now
+        hop = self.topo.hop_s
+        if self.d_busy_until.get(key, 0.0) > now:
+            call.d_ev = self.engine.after(hop, self._c_d_response, call, False)  # 429 device busy
+            return
+        mode = self.a.mode[i]
+        if mode == ERROR:
+            call.d_ev = self.engine.after(hop, self._c_d_response, call, False)
+        elif mode == HANG:
+            self.d_busy_until[key] = INF
+        else:
+            work = self.a.ms[i] / 1000 * (self.topo.slow_multiplier if self.a.cls[i] == SLOW else 1.0)
+            self.d_busy_until[key] = now + work
+            call.d_ev = self.engine.after(work + hop, self._c_d_response, call, True)
+
+    def stats(self) -> Dict[str, float]:
+        end = self.engine.now or 1.0
+        return {
+            "b_requests": self.b_requests,
+            "c_calls": self.c_calls,
+            "d_calls": self.d_calls,
+            "c_utilization": self.c_busy_total / (self.topo.c_replicas * end),
+            "c_sem_wait_ms_mean": 1000 * self.sem_wait_total / self.sem_waits if self.sem_waits else 0.0,
+            "bulkhead_rejected": sum(b.rejected for b in self.bulkheads.values()),
+            "events": self.engine.events_run,
+        }
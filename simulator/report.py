@@ -0,0 +1,67 @@
+"""Summaries of simulated (or captured) runs and the tables printed for them."""
+from collections import Counter
+from typing import Dict, List, Optional
+
+import numpy as np
+
+QUANTILES = (("p50_ms", 0.5), ("p90_ms", 0.9), ("p99_ms", 0.99), ("p999_ms", 0.999))
+
+def _percentiles(latency_ms: np.ndarray) -> Dict[str, Optional[float]]:
+    if not len(latency_ms):
+        return {name: None for name, _ in QUANTILES}
+    values = np.quantile(latency_ms, [q for _, q in QUANTILES])
+    return {name: float(v) for (name, _), v in zip(QUANTILES, values)}
+
+def summarize(status: np.ndarray, latency_ms: np.ndarray, window_s: float,
+              cls: Optional[np.ndarray] = None, attempts: Optional[np.ndarray] = None) -> Dict:
+    """Throughput, status mix and latency percentiles for one run.
+
+    Percentiles are over successful (2xx) requests, like test/simple-load.py.
+    """
+    n = len(status)
+    ok = (status >= 200) & (status < 300)
+    out = {
+        "requests": int(n),
+        "ok": int(ok.sum()),
+        "success_rate": float(ok.mean()) if n else 0.0,
+        "throughput_rps": float(ok.sum() / window_s) if window_s > 0 else 0.0,
+        "status": {str(k): v for k, v in sorted(Counter(status.tolist()).items())},
+        **_percentiles(latency_ms[ok]),
+    }
+    if cls is not None:
+        for name, value in (("fast", 0), ("slow", 1)):
+            sel = ok & (cls == value)
+            out[f"{name}_p99_ms"] = _percentiles(latency_ms[sel])["p99_ms"]
+    if attempts is not None and n:
+        out["client_attempts_per_request"] = float(attempts.mean())
+    return out
+
+def fmt(v, spec=".1f"):
+    return "-" if v is None else format(v, spec)
+
+def print_summary(title: str, s: Dict):
+    print(f"\n=== {title} ===")
+    print(f"Requests: {s['requests']}  ok: {s['ok']} ({100 * s['success_rate']:.1f}%)  "
+          f"throughput: {s['throughput_rps']:.2f} rps")
+    print("Status: " + ", ".join(f"{k}={v}" for k, v in s["status"].items()))
+    print("Latency (ok): " + "  ".join(f"{name[:-3]}={fmt(s[name])}ms" for name, _ in QUANTILES))
+    if "fast_p99_ms" in s:
+        print(f"p99 by class: fast={fmt(s['fast_p99_ms'])}ms slow={fmt(s['slow_p99_ms'])}ms")
+    if "b_to_c_amplification" in s:
+        print(f"Amplification: A→B x{s['a_to_b_amplification']:.2f}  B→C x{s['b_to_c_amplification']:.2f}  "
+              f"C→D x{s['c_to_d_amplification']:.2f}")
+        print(f"C utilization: {100 * s['c_utilization']:.1f}%  mean semaphore wait: {s['c_sem_wait_ms_mean']:.0f}ms  "
+              f"bulkhead rejects: {s['bulkhead_rejected']}")
+
+SWEEP_COLUMNS = (("throughput_rps", ".2f"), ("success_rate", ".3f"), ("p50_ms", ".0f"), ("p99_ms", ".0f"),
+                 ("fast_p99_ms", ".0f"), ("slow_p99_ms", ".0f"), ("b_to_c_amplification", ".2f"),
+                 ("c_utilization", ".2f"))
+
+def print_sweep(rows: List[Dict], keys: List[str]):
+    header = [*keys, *(name for name, _ in SWEEP_COLUMNS)]
+    widths = [max(len(h), 8) for h in header]
+    print("  ".join(h.rjust(w) for h, w in zip(header, widths)))
+    for row in rows:
+        cells = [str(row["params"][k]) for k in keys]
+        cells += [fmt(row.get(name), spec) for name, spec in SWEEP_COLUMNS]
+        print("  ".join(c.rjust(w) for c, w in zip(cells, widths)))
@@ -0,0 +1,103 @@
+"""Single runs, parallel parameter sweeps and validation against a capture."""
+import itertools
+import os
+import sys
+import time
+from multiprocessing import Pool
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .config import Topology, Workload
+from .model import Simulation
+from .report import summarize
+from .workload import Arrivals, from_records, generate
+
+def simulate_arrivals(topo: Topology, arrivals: Arrivals, warmup_s: float = 0.0, seed: int = 1) -> Dict:
+    sim = Simulation(topo, seed=seed)
+    started = time.perf_counter()
+    result = sim.run(arrivals)
+    wall = time.perf_counter() - started
+    counted = arrivals.t >= warmup_s
+    summary = summarize(result["status"][counted], result["latency_ms"][counted],
+                        max(arrivals.duration_s - warmup_s, 0.0),
+                        cls=arrivals.cls[counted], attempts=result["attempts"][counted])
+    stats = sim.stats()
+    n = max(len(arrivals), 1)
+    summary.update({
+        "a_to_b_amplification": stats["b_requests"] / n,
+        "b_to_c_amplification": stats["c_calls"] / n,
+        "c_to_d_amplification": stats["d_calls"] / n,
+        "c_utilization": stats["c_utilization"],
+        "c_sem_wait_ms_mean": stats["c_sem_wait_ms_mean"],
+        "bulkhead_rejected": stats["bulkhead_rejected"],
+        "simulated_s": arrivals.duration_s,
+        "wall_s": wall,
+        "events": stats["events"],
+    })
+    return summary
+
+def simulate(params: Dict[str, str]) -> Dict:
+    """One run from a flat parameter dict (picklable, used by the sweep pool)."""
+    topo = Topology.from_params(params)
+    workload = Workload.from_params(params)
+    summary = simulate_arrivals(topo, generate(workload), workload.warmup_s, workload.seed)
+    summary["params"] = params
+    return summary
+
+def expand_grid(base: Dict[str, str], grid: Dict[str, List[str]]) -> List[Dict[str, str]]:
+    keys = list(grid)
+    points = []
+    for values in itertools.product(*(grid[k] for k in keys)):
+        params = dict(base)
+        params.update(zip(keys, values))
+        points.append(params)
+    return points
+
+def sweep(base: Dict[str, str], grid: Dict[str, List[str]], jobs: Optional[int] = None) -> List[Dict]:
+    points = expand_grid(base, grid)
+    jobs = min(jobs or os.cpu_count() or 1, len(points))
+    if jobs <= 1:
+        return [simulate(p) for p in points]
+    with Pool(jobs) as pool:
+        return pool.map(simulate, points, chunksize=1)
+
+def load_capture(path: str, limit: int = 0) -> list:
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "b"))
+    from capture import read_capture
+    records = []
+    for r in read_capture(path):
+        records.append(r)
+        if limit and len(records) >= limit:
+            break
+    return records
+
+def validate(topo: Topology, capture_path: str, limit: int = 0) -> Dict[str, Dict]:
+    """Replay a capture's arrivals through the model and summarize both sides.
+
+    The capture holds what B saw, retries included, so the client in the
+    model must not retry on its own.
+    """
+    records = load_capture(capture_path, limit)
+    arrivals = from_records(records)
+    observed = summarize(np.array([r.status for r in records], dtype=np.int16),
+                         np.array([r.latency_ms for r in records], dtype=np.float64),
+                         arrivals.duration_s,
+                         cls=np.array([1 if "slow" in r.device_id.lower() else 0 for r in records], dtype=np.int8))
+    topo.client_retries = 0
+    topo.client_timeout_s = 0  # B's capture latency is server side; A's timeout doesn't cut it
+    simulated = simulate_arrivals(topo, arrivals)
+    return {"observed": observed, "simulated": simulated}
+
+VALIDATED = ("throughput_rps", "success_rate", "p50_ms", "p90_ms", "p99_ms")
+
+def compare(observed: Dict, simulated: Dict, tolerance: float) -> List[Dict]:
+    rows = []
+    for key in VALIDATED:
+        o, s = observed.get(key), simulated.get(key)
+        if o is None or s is None:
+            rows.append({"metric": key, "observed": o, "simulated": s, "error": None, "ok": None})
+            continue
+        error = abs(s - o) / abs(o) if o else abs(s - o)
+        rows.append({"metric": key, "observed": o, "simulated": s, "error": error, "ok": error <= tolerance})
+    return rows
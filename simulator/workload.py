@@ -0,0 +1,67 @@
+"""Arrival streams: generated (vectorized with numpy) or taken from a B capture.
+
+An `Arrivals` is a set of parallel arrays, one entry per client request:
+arrival time (s from start), device key, device class, mode and requested ms.
+Device keys are ints so D's per-device locks are a plain dict lookup.
+"""
+from dataclasses import dataclass
+from typing import Dict, Iterable
+
+import numpy as np
+
+from .config import Workload
+
+FAST, SLOW = 0, 1
+NORMAL, ERROR, HANG = 0, 1, 2
+MODES = {"normal": NORMAL, "error": ERROR, "hang": HANG}
+
+@dataclass
+class Arrivals:
+    t: np.ndarray        # float64, sorted
+    device: np.ndarray   # int64 device key
+    cls: np.ndarray      # int8, FAST or SLOW
+    mode: np.ndarray     # int8, NORMAL / ERROR / HANG
+    ms: np.ndarray       # int32
+    duration_s: float
+
+    def __len__(self) -> int:
+        return len(self.t)
+
+def generate(w: Workload) -> Arrivals:
+    """Poisson arrivals over `duration_s` with a fixed class/mode mix."""
+    rng = np.random.default_rng(w.seed)
+    n = rng.poisson(w.rate * w.duration_s)
+    # n uniform points on [0, duration) sorted == a Poisson process conditioned on n
+    t = np.sort(rng.uniform(0.0, w.duration_s, n))
+    u = rng.random(n)
+    hang = u < w.hang_pct
+    error = ~hang & (u < w.hang_pct + w.error_pct)
+    slow = ~hang & ~error & (u < w.hang_pct + w.error_pct + w.slow_pct)
+    mode = np.full(n, NORMAL, dtype=np.int8)
+    mode[error] = ERROR
+    mode[hang] = HANG
+    # device keys: fast i -> i, slow i -> 1_000_000 + i, hang i -> 2_000_000 + i
+    device = rng.integers(0, max(w.fast_devices, 1), n)
+    device[slow] = 1_000_000 + rng.integers(0, max(w.slow_devices, 1), int(slow.sum()))
+    device[hang] = 2_000_000 + rng.integers(0, max(w.hang_devices, 1), int(hang.sum()))
+    cls = slow.astype(np.int8)  # hang devices go to d-fast, like "dev-hang-1" in the real setup
+    return Arrivals(t=t, device=device.astype(np.int64), cls=cls, mode=mode,
+                    ms=np.full(n, w.ms, dtype=np.int32), duration_s=w.duration_s)
+
+def from_records(records: Iterable) -> Arrivals:
+    """Arrivals from capture records (anything with ts, device_id, ms, mode)."""
+    records = list(records)
+    keys: Dict[str, int] = {}
+    if not records:
+        empty = np.zeros(0)
+        return Arrivals(empty, empty.astype(np.int64), empty.astype(np.int8),
+                        empty.astype(np.int8), empty.astype(np.int32), 0.0)
+    t0 = min(r.ts for r in records)  # records are in completion order; start from the first arrival
+    t = np.array([r.ts - t0 for r in records], dtype=np.float64)
+    order = np.argsort(t, kind="stable")
+    device = np.array([keys.setdefault(r.device_id, len(keys)) for r in records], dtype=np.int64)
+    cls = np.array([SLOW if "slow" in r.device_id.lower() else FAST for r in records], dtype=np.int8)
+    mode = np.array([MODES.get(r.mode, NORMAL) for r in records], dtype=np.int8)
+    ms = np.array([r.ms for r in records], dtype=np.int32)
+    return Arrivals(t=t[order], device=device[order], cls=cls[order], mode=mode[order],
+                    ms=ms[order], duration_s=float(t.max()) if len(t) else 0.0)
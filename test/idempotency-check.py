@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Exercise B's Idempotency-Key paths (needs IDEMPOTENCY_ENABLED=true).
+
+The load tools repeat a key only when they retry (429/503, connect failures,
+and their own timeouts), so against a healthy B they mostly produce misses.
+Each round here sends, with one key:
+- `--copies` requests at once, `--stagger-ms` apart: the first is a miss, the
+  rest should attach to it while it runs
+- one more after they have all returned: a hit, replayed without touching C
+- optionally (`--conflict`) the key again with a different `ms`: a 422
+
+and checks that the duplicates carry `Idempotent-Replayed: true` and the same
+body as the original. Retries are off so every request is one attempt.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import uuid
+from collections import Counter
+
+from a_client import BClient, RetryPolicy
+
+async def status_counts(client: BClient) -> dict:
+    result = await client.get("/__status")
+    if not result.success:
+        return {}
+    return json.loads(result.body).get("idempotency") or {}
+
+async def run_round(client: BClient, args, n: int, seen: Counter):
+    key = uuid.uuid4().hex
+    params = {"device_id": f"dev-{args.devices}-{n % 3}", "ms": args.ms, "mode": "normal"}
+    headers = {"Idempotency-Key": key}
+
+    async def send(delay_s: float):
+        await asyncio.sleep(delay_s)
+        return await client.get("/process", params, headers)
+
+    copies = await asyncio.gather(*(send(i * args.stagger_ms / 1000) for i in range(args.copies)))
+    after = await send(0)
+    original, duplicates = copies[0], copies[1:]
+    for label, result in [("original", original)] + [("in flight", r) for r in duplicates] + [("after", after)]:
+        replayed = result.headers.get("Idempotent-Replayed") == "true"
+        seen[(label, result.status, replayed)] += 1
+        if label != "original" and original.success and result.body != original.body:
+            seen[("body mismatch", label)] += 1
+    if args.conflict:
+        clash = await client.get("/process", {**params, "ms": args.ms + 1}, headers)
+        seen[("conflict", clash.status, False)] += 1
+    print(f"round {n + 1}: original {original.status} {original.latency_ms:.0f}ms, "
+          f"in flight {[r.status for r in duplicates]} "
+          f"(max {max((r.latency_ms for r in duplicates), default=0):.0f}ms), "
+          f"after {after.status} {after.latency_ms:.0f}ms")
+
+async def main():
+    parser = argparse.ArgumentParser(description="Send duplicate Idempotency-Keys to B")
+    parser.add_argument("--url", default="http://localhost:8080", help="Base URL of B")
+    parser.add_argument("--rounds", type=int, default=5, help="Keys to test")
+    parser.add_argument("--copies", type=int, default=3, help="Concurrent requests per key")
+    parser.add_argument("--stagger-ms", type=int, default=100,
+                        help="Gap between the concurrent copies (keep it below --ms)")
+    parser.add_argument("--ms", type=int, default=1000, help="Work per request")
+    parser.add_argument("--devices", choices=["fast", "slow"], default="fast")
+    parser.add_argument("--conflict", action="store_true", help="Also reuse each key with a different ms")
+    args = parser.parse_args()
+
+    seen: Counter = Counter()
+    async with BClient(args.url, RetryPolicy(max_retries=0), pool_size=args.copies + 2) as client:
+        before = await status_counts(client)
+        if not before:
+            print("B reports no idempotency state: is IDEMPOTENCY_ENABLED=true?", file=sys.stderr)
+        for n in range(args.rounds):
+            await run_round(client, args, n, seen)
+        after = await status_counts(client)
+
+    print("\n=== IDEMPOTENCY CHECK ===")
+    for (label, *rest), count in sorted(seen.items(), key=str):
+        if label == "body mismatch":
+            print(f"  {label} ({rest[0]}): {count}")
+        else:
+            status, replayed = rest
+            print(f"  {label:9s} {status} {'replayed' if replayed else 'fresh':8s} x{count}")
+    if before:
+        deltas = {k: after.get(k, 0) - before.get(k, 0) for k in ("miss", "attach", "hit", "conflict")}
+        print("  B counted: " + ", ".join(f"{k}={v}" for k, v in deltas.items()))
+        expected = {"miss": args.rounds, "attach": args.rounds * (args.copies - 1), "hit": args.rounds,
+                    "conflict": args.rounds if args.conflict else 0}
+        if deltas != expected:
+            print("  expected:  " + ", ".join(f"{k}={v}" for k, v in expected.items())
+                  + " (a failed original is shared with its in-flight copies but not kept,"
+                    " so the request after it is a miss)")
+
+if __name__ == "__main__":
+    asyncio.run(main())
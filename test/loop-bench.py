@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""Event-loop benchmark: run the same load once per loop implementation and
+compare per-service loop lag (b_/c_/d_loop_lag_ms) and client-side latency.
+
+    EVENT_LOOP=asyncio docker compose --profile python up -d --build
+    python3 test/loop-bench.py --label asyncio --out loop-bench.json
+    EVENT_LOOP=uvloop docker compose --profile python up -d
+    python3 test/loop-bench.py --label uvloop --out loop-bench.json
+    python3 test/loop-bench.py --report loop-bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Dict, List
+
+import aiohttp
+
+SERVICES = ("b", "c", "d")
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+async def prom_query(session: aiohttp.ClientSession, prom_url: str, expr: str):
+    async with session.get(f"{prom_url}/api/v1/query", params={"query": expr}) as r:
+        data = await r.json()
+    result = data.get("data", {}).get("result", [])
+    if not result:
+        return None
+    value = float(result[0]["value"][1])
+    return None if value != value else value  # NaN when there were no samples
+
+async def worker(session, url, params, deadline, latencies, statuses):
+    while time.time() < deadline:
+        start = time.perf_counter()
+        try:
+            async with session.get(url, params=params) as r:
+                await r.read()
+                statuses.append(r.status)
+        except Exception:
+            statuses.append(0)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+async def drive(session, args, deadline, latencies, statuses):
+    # /process exercises B, C and D loops; /health hammers B's loop on its own
+    tasks = [asyncio.create_task(worker(session, f"{args.url}/process",
+                                        {"device_id": f"dev-fast-{i}", "ms": str(args.ms)},
+                                        deadline, latencies, statuses))
+             for i in range(args.concurrency)]
+    tasks += [asyncio.create_task(worker(session, f"{args.url}/health", None, deadline, [], []))
+              for _ in range(args.concurrency)]
+    await asyncio.gather(*tasks)
+
+async def run(args) -> Dict:
+    latencies: List[float] = []
+    statuses: List[int] = []
+    timeout = aiohttp.ClientTimeout(total=30)
+    async with aiohttp.ClientSession(timeout=timeout, connector=aiohttp.TCPConnector(limit=0)) as session:
+        if args.warmup:
+            # same load, results discarded: opens the pool's connections and warms B/C/D
+            # before the measured window (the Prometheus window below starts after it)
+            print(f"Warming up for {args.warmup}s...")
+            await drive(session, args, time.time() + args.warmup, [], [])
+        started = time.time()
+        await drive(session, args, started + args.duration, latencies, statuses)
+        # let Prometheus scrape the tail of the run
+        await asyncio.sleep(5)
+        window = f"{int(time.time() - started)}s"
+
+        services = {}
+        for svc in SERVICES:
+            row = {}
+            for name, q in (("lag_p50_ms", 0.5), ("lag_p99_ms", 0.99), ("lag_p999_ms", 0.999)):
+                row[name] = await prom_query(session, args.prometheus,
+                    f"histogram_quantile({q}, sum by (le) (rate({svc}_loop_lag_ms_bucket[{window}])))")
+            row["blocked"] = await prom_query(session, args.prometheus,
+                f"sum(increase({svc}_loop_blocked_total[{window}]))")
+            async with session.get(f"{args.prometheus}/api/v1/query",
+                                   params={"query": f"{svc}_event_loop_info"}) as r:
+                result = (await r.json()).get("data", {}).get("result", [])
+            impls = sorted({res["metric"].get("impl", "?") for res in result})
+            row["impl"] = ",".join(impls) or None
+            services[svc] = row
+
+    ok = [l for l, s in zip(latencies, statuses) if 200 <= s < 300]
+    return {
+        "label": args.label,
+        "duration_s": args.duration,
+        "concurrency": args.concurrency,
+        "requests": len(statuses),
+        "ok": len(ok),
+        "throughput_rps": len(statuses) / args.duration,
+        "client_p50_ms": percentile(ok, 0.5),
+        "client_p99_ms": percentile(ok, 0.99),
+        "services": services,
+    }
+
+def fmt(v, spec=".2f"):
+    return "-" if v is None else format(v, spec)
+
+def report(results: List[Dict]):
+    print(f"\n{'label':<10} {'service':<8} {'loop':<8} {'lag p50':>9} {'lag p99':>9} {'lag p999':>9} {'blocked':>8}")
+    for res in results:
+        for svc, row in res["services"].items():
+            print(f"{res['label']:<10} {svc:<8} {row['impl'] or '-':<8} {fmt(row['lag_p50_ms']):>9} "
+                  f"{fmt(row['lag_p99_ms']):>9} {fmt(row['lag_p999_ms']):>9} {fmt(row['blocked'], '.0f'):>8}")
+    print(f"\n{'label':<10} {'rps':>8} {'ok':>8} {'p50 ms':>9} {'p99 ms':>9}")
+    for res in results:
+        print(f"{res['label']:<10} {res['throughput_rps']:>8.1f} {res['ok']:>8} "
+              f"{res['client_p50_ms']:>9.1f} {res['client_p99_ms']:>9.1f}")
+
+async def main():
+    parser = argparse.ArgumentParser(description="Compare event-loop lag per service across loop implementations")
+    parser.add_argument("--url", default="http://localhost:8080", help="Base URL of B")
+    parser.add_argument("--prometheus", default="http://localhost:9090")
+    parser.add_argument("--label", help="Name for this run, e.g. asyncio or uvloop")
+    parser.add_argument("--duration", type=int, default=60)
+    parser.add_argument("--warmup", type=int, default=5, help="Seconds of unmeasured load before the run")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--ms", type=int, default=50, help="Device work per request (short keeps loops busy)")
+    parser.add_argument("--out", help="Append this run's results to a JSON file")
+    parser.add_argument("--report", help="Print a comparison table from a results file and exit")
+    args = parser.parse_args()
+
+    if args.report:
+        with open(args.report) as f:
+            report(json.load(f))
+        return
+    if not args.label:
+        parser.error("--label is required when running a benchmark")
+
+    result = await run(args)
+    report([result])
+    if args.out:
+        results = []
+        if os.path.exists(args.out):
+            with open(args.out) as f:
+                results = json.load(f)
+        results.append(result)
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nAppended results to {args.out}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""Replay a traffic capture recorded by B (CAPTURE_ENABLED=true) against B.
+
+Requests are sent open-loop: each one is fired at its (scaled) capture time
+regardless of how many earlier requests are still outstanding, so a slow B
+sees the same pressure the original incident produced.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import Counter
+from typing import List
+
+import aiohttp
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "b"))
+from capture import CaptureRecord, TrafficCapture, read_capture
+
+def schedule(records: List[CaptureRecord], speed: float, max_gap_s: float) -> List[float]:
+    """Return each record's send offset (seconds from replay start); records sorted by ts."""
+    offsets = []
+    elapsed = 0.0
+    prev_ts = min(r.ts for r in records) if records else 0.0
+    for r in records:
+        gap = (r.ts - prev_ts) / speed
+        if max_gap_s > 0:
+            gap = min(gap, max_gap_s)
+        elapsed += gap
+        offsets.append(elapsed)
+        prev_ts = r.ts
+    return offsets
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+def print_summary(title: str, statuses: List[int], latencies: List[float]):
+    total = len(statuses)
+    print(f"\n=== {title} ===")
+    print(f"Total requests: {total}")
+    if not total:
+        return
+    ok = sum(1 for s in statuses if 200 <= s < 300)
+    print(f"Successful requests: {ok} ({ok/total*100:.1f}%)")
+    print("Status code distribution:")
+    for status, count in sorted(Counter(statuses).items()):
+        print(f"  {status}: {count} ({count/total*100:.1f}%)")
+    ok_lat = [l for s, l in zip(statuses, latencies) if 200 <= s < 300]
+    print("Latency percentiles (successful requests):")
+    for name, q in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99)):
+        print(f"  {name}: {percentile(ok_lat, q):.1f}ms")
+
+class Replayer:
+    def __init__(self, base_url: str, timeout_s: float, out: TrafficCapture = None):
+        self.base_url = base_url
+        self.timeout_s = timeout_s
+        self.out = out
+        self.statuses: List[int] = []
+        self.latencies: List[float] = []
+        self.send_lag_ms: List[float] = []
+
+    async def send(self, session: aiohttp.ClientSession, r: CaptureRecord):
+        params = {"device_id": r.device_id, "ms": str(r.ms), "mode": r.mode}
+        ts = time.time()
+        start = time.perf_counter()
+        try:
+            async with session.get(f"{self.base_url}/process", params=params) as response:
+                await response.read()
+                status = response.status
+        except Exception:
+            status = 0
+        latency_ms = (time.perf_counter() - start) * 1000
+        self.statuses.append(status)
+        self.latencies.append(latency_ms)
+        if self.out is not None:
+            self.out.record(ts, r.device_id, r.ms, r.mode, status, latency_ms)
+
+    async def run(self, records: List[CaptureRecord], offsets: List[float]):
+        tasks = []
+        connector = aiohttp.TCPConnector(limit=0)
+        async with aiohttp.ClientSession(
+            connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout_s)
+        ) as session:
+            start = time.perf_counter()
+            for r, offset in zip(records, offsets):
+                delay = offset - (time.perf_counter() - start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self.send_lag_ms.append(max(0.0, (time.perf_counter() - start - offset) * 1000))
+                tasks.append(asyncio.create_task(self.send(session, r)))
+            if tasks:
+                await asyncio.wait(tasks)
+
+async def main():
+    parser = argparse.ArgumentParser(description="Replay a B traffic capture")
+    parser.add_argument("capture", help="Capture file written by B (CAPTURE_PATH)")
+    parser.add_argument("--url", default="http://localhost:8080", help="Base URL of B")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Time scale: 1 = real time, 4 = four times faster")
+    parser.add_argument("--max-gap", type=float, default=0.0,
+                        help="Compress idle periods: cap any gap between requests to this many seconds (0 = off)")
+    parser.add_argument("--limit", type=int, default=0, help="Replay only the first N records")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request client timeout (s)")
+    parser.add_argument("--out", help="Write replay results to a capture file for later comparison")
+    args = parser.parse_args()
+
+    if args.speed <= 0:
+        parser.error("--speed must be positive")
+
+    # B writes each record when its request completes; replay in arrival (start) order
+    records = sorted(read_capture(args.capture), key=lambda r: r.ts)
+    if args.limit:
+        records = records[:args.limit]
+    if not records:
+        print("Capture is empty, nothing to replay")
+        return
+    offsets = schedule(records, args.speed, args.max_gap)
+
+    print(f"=== Replaying {len(records)} requests from {args.capture} ===")
+    print(f"Captured span: {records[-1].ts - records[0].ts:.1f}s, replay span: {offsets[-1]:.1f}s "
+          f"(speed {args.speed}x, max gap {args.max_gap or 'off'})")
+
+    out = TrafficCapture(args.out) if args.out else None
+    replayer = Replayer(args.url, args.timeout, out)
+    await replayer.run(records, offsets)
+    if out is not None:
+        out.close()
+
+    print_summary("CAPTURED (original)", [r.status for r in records], [r.latency_ms for r in records])
+    print_summary("REPLAYED", replayer.statuses, replayer.latencies)
+    print(f"\nSend lag vs schedule: p50 {percentile(replayer.send_lag_ms, 0.5):.1f}ms, "
+          f"p99 {percentile(replayer.send_lag_ms, 0.99):.1f}ms, max {max(replayer.send_lag_ms):.1f}ms")
+
+if __name__ == "__main__":
+    asyncio.run(main())
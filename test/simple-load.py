@@ -2,45 +2,36 @@
 """Simple load testing tool for baseline scenario"""
 
 import asyncio
-import aiohttp
 import time
 import json
 from typing import Dict, List
 import argparse
 
+from a_client import BClient, RetryPolicy, add_policy_args, policy_from_args
+
 class LoadTester:
-    def __init__(self, base_url: str, concurrent_requests: int = 10):
+    def __init__(self, base_url: str, concurrent_requests: int = 10, policy: RetryPolicy = None):
         self.base_url = base_url
         self.concurrent_requests = concurrent_requests
+        self.policy = policy
         self.results = []
+        self.client_stats = None
         
-    async def make_request(self, session: aiohttp.ClientSession, device_id: str, ms: int = 3000, mode: str = "normal"):
+    async def make_request(self, client: BClient, device_id: str, ms: int = 3000, mode: str = "normal"):
         start_time = time.time()
-        try:
-            url = f"{self.base_url}/process?device_id={device_id}&ms={ms}&mode={mode}"
-            async with session.get(url) as response:
-                end_time = time.time()
-                content = await response.text()
-                return {
-                    "status": response.status,
-                    "latency_ms": (end_time - start_time) * 1000,
-                    "device_id": device_id,
-                    "mode": mode,
-                    "timestamp": start_time,
-                    "retry_after": response.headers.get("Retry-After"),
-                    "success": 200 <= response.status < 300
-                }
-        except Exception as e:
-            end_time = time.time()
-            return {
-                "status": 0,
-                "latency_ms": (end_time - start_time) * 1000,
-                "device_id": device_id,
-                "mode": mode,
-                "timestamp": start_time,
-                "error": str(e),
-                "success": False
-            }
+        params = {"device_id": device_id, "ms": ms, "mode": mode}
+        result = await client.get("/process", params)
+        return {
+            "status": result.status,
+            "latency_ms": result.latency_ms,
+            "device_id": device_id,
+            "mode": mode,
+            "timestamp": start_time,
+            "retry_after": result.attempts[-1].retry_after,
+            "attempts": len(result.attempts),
+            "error": result.error,
+            "success": result.success
+        }
     
     async def run_load_test(self, duration_seconds: int = 60, devices: str = "mixed", mode: str = "normal"):
         """
@@ -60,9 +51,7 @@ class LoadTester:
         start_time = time.time()
         tasks = []
         
-        async with aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(total=10)
-        ) as session:
+        async with BClient(self.base_url, self.policy, pool_size=self.concurrent_requests) as client:
             
             while time.time() - start_time < duration_seconds:
                 # Generate device_id based on device type
@@ -94,7 +83,7 @@ class LoadTester:
                 
                 # Launch request
                 task = asyncio.create_task(
-                    self.make_request(session, device_id, ms, req_mode)
+                    self.make_request(client, device_id, ms, req_mode)
                 )
                 tasks.append(task)
                 
@@ -115,6 +104,7 @@ class LoadTester:
                 for task in done:
                     result = await task
                     self.results.append(result)
+            self.client_stats = client.stats
         
         self.print_summary()
     
@@ -158,6 +148,12 @@ class LoadTester:
         retry_after_count = sum(1 for r in self.results if r.get("retry_after"))
         if retry_after_count > 0:
             print(f"\nRetry-After headers seen: {retry_after_count}")
+        
+        # A-side retries: every attempt B saw, not just the final answers above
+        retried = sum(1 for r in self.results if r["attempts"] > 1)
+        print(f"\nRequests retried: {retried} ({retried/total_requests*100:.1f}%)")
+        if self.client_stats:
+            self.client_stats.print_summary()
 
 def get_test_case(case_num: int) -> dict:
     """MECE Test Case Definitions"""
@@ -189,6 +185,7 @@ async def main():
     parser.add_argument("--url", default="http://localhost:8080", help="Base URL to test")
     parser.add_argument("--testcase", type=int, choices=range(1, 13), required=True,
                        help="Test case number (1-12)")
+    add_policy_args(parser)
     
     args = parser.parse_args()
     
@@ -201,7 +198,7 @@ async def main():
     print(f"Devices: {test_case['devices']}, Mode: {test_case['mode']}")
     print(f"Concurrency: {test_case['concurrency']}, Duration: {test_case['duration']}s")
     
-    tester = LoadTester(args.url, test_case['concurrency'])
+    tester = LoadTester(args.url, test_case['concurrency'], policy_from_args(args))
     await tester.run_load_test(test_case['duration'], test_case['devices'], test_case['mode'])
 
 if __name__ == "__main__":
@@ -0,0 +1,12 @@
+"""Unit tests for the pure-logic modules; run with `python -m pytest -q tests`.
+
+B's modules import each other flat (as in the container), and the A-side
+client lives in test/, so both go on sys.path. c/ and d/ are left off: their
+copies of runtime_config.py etc. would shadow B's.
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for sub in ("b", "test"):
+    sys.path.insert(0, os.path.join(ROOT, sub))
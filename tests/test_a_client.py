@@ -0,0 +1,137 @@
+import asyncio
+import random
+import time
+from email.utils import formatdate
+
+import pytest
+from aiohttp import web
+
+from a_client import BClient, RetryBudget, RetryPolicy, parse_retry_after, read_env_file
+
+def test_backoff_full_jitter_bounds():
+    policy = RetryPolicy(backoff_base_s=0.2, backoff_cap_s=2.0)
+    random.seed(1)
+    for retry, ceiling in [(0, 0.2), (1, 0.4), (2, 0.8), (3, 1.6), (4, 2.0), (10, 2.0)]:
+        delays = [policy.backoff(retry, None) for _ in range(200)]
+        assert 0 <= min(delays) and max(delays) <= ceiling
+        assert max(delays) > ceiling / 2  # jittered over the whole range, not a fixed step
+
+def test_backoff_honours_retry_after():
+    policy = RetryPolicy(backoff_base_s=0.2, backoff_cap_s=2.0)
+    assert all(policy.backoff(0, 5.0) == 5.0 for _ in range(50))
+
+def test_budget_caps_retries_at_ratio_of_originals():
+    budget = RetryBudget(ratio=0.25, min_tokens=10)
+    for _ in range(10):
+        assert budget.withdraw()  # the initial allowance
+    assert not budget.withdraw()
+    granted = 0
+    for _ in range(100):
+        budget.deposit()
+        granted += budget.withdraw()
+    assert granted == 25
+
+def test_budget_refill_is_capped():
+    budget = RetryBudget(ratio=0.3, min_tokens=2)
+    for _ in range(100):
+        budget.deposit()
+    assert budget.tokens == 2
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("-1") == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(formatdate(time.time() + 30, usegmt=True)) == pytest.approx(30, abs=2)
+
+def test_policy_from_env_file(tmp_path):
+    env = tmp_path / "a.env"
+    env.write_text("# A side\nA_TO_B_TIMEOUT_S=3  # seconds\nA_TO_B_MAX_RETRIES=1\n")
+    assert read_env_file(str(env))["A_TO_B_TIMEOUT_S"] == "3"
+    policy = RetryPolicy.from_env(str(env), max_retries=None, backoff_cap_s=1.0)
+    assert (policy.timeout_s, policy.max_retries, policy.backoff_cap_s) == (3.0, 1, 1.0)
+
+def serve(statuses):
+    """B stand-in answering with `statuses` in turn; records the Idempotency-Key of each attempt."""
+    keys = []
+
+    async def handler(request):
+        keys.append(request.headers.get("Idempotency-Key"))
+        status = statuses[min(len(keys), len(statuses)) - 1]
+        return web.Response(status=status, text="ok", headers={"Retry-After": "0"} if status == 503 else {})
+
+    app = web.Application()
+    app.router.add_get("/process", handler)
+    return app, keys
+
+async def call(statuses, policy):
+    app, keys = serve(statuses)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        async with BClient(f"http://127.0.0.1:{port}", policy) as client:
+            return await client.get("/process"), keys, client.stats
+    finally:
+        await runner.cleanup()
+
+FAST = dict(backoff_base_s=0.001, backoff_cap_s=0.002)
+
+def test_retries_503_with_one_idempotency_key():
+    result, keys, stats = asyncio.run(call([503, 503, 200], RetryPolicy(max_retries=2, **FAST)))
+    assert result.status == 200 and len(result.attempts) == 3
+    assert len(set(keys)) == 1 and keys[0]
+    assert stats.amplification == 3.0
+
+def test_gives_up_after_max_retries():
+    result, keys, _ = asyncio.run(call([503], RetryPolicy(max_retries=1, **FAST)))
+    assert (result.status, result.give_up, len(keys)) == (503, "max_retries", 2)
+
+def test_never_retries_504():
+    result, keys, _ = asyncio.run(call([504, 200], RetryPolicy(max_retries=2, **FAST)))
+    assert (result.status, result.give_up, len(keys)) == (504, "timeout", 1)
+
+def test_budget_stops_retries():
+    policy = RetryPolicy(max_retries=5, budget_ratio=0.0, budget_min_tokens=1, **FAST)
+    result, keys, stats = asyncio.run(call([503], policy))
+    assert (result.give_up, len(keys), stats.budget_denied) == ("budget", 2, 1)
+
+def serve_slow(first_delay_s):
+    """B stand-in whose first attempt outlives the client's timeout."""
+    keys = []
+
+    async def handler(request):
+        keys.append(request.headers.get("Idempotency-Key"))
+        if len(keys) == 1:
+            await asyncio.sleep(first_delay_s)
+        return web.Response(text="ok")
+
+    app = web.Application()
+    app.router.add_get("/process", handler)
+    return app, keys
+
+async def call_slow(idempotency_keys):
+    app, keys = serve_slow(0.5)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        policy = RetryPolicy(timeout_s=0.1, max_retries=2, **FAST)
+        async with BClient(f"http://127.0.0.1:{port}", policy, idempotency_keys=idempotency_keys) as client:
+            return await client.get("/process"), keys
+    finally:
+        await runner.cleanup()
+
+def test_keyed_request_retries_its_own_timeout():
+    result, keys = asyncio.run(call_slow(idempotency_keys=True))
+    assert result.status == 200
+    assert [a.error for a in result.attempts] == ["timeout", None]
+    assert len(set(keys)) == 1
+
+def test_unkeyed_request_does_not_retry_timeout():
+    result, keys = asyncio.run(call_slow(idempotency_keys=False))
+    assert (result.status, result.give_up, len(keys)) == (0, "timeout", 1)
@@ -0,0 +1,150 @@
+import asyncio
+import threading
+
+import pytest
+
+from bulkhead import Bulkhead, BulkheadFull
+from runtime_config import RuntimeConfig, Setting, positive
+
+async def settle():
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+def test_slot_admits_up_to_limit_and_releases():
+    async def scenario():
+        b = Bulkhead("fast", limit=2)
+        async with b.slot():
+            async with b.slot():
+                assert b.inflight == 2
+                assert b.utilization == 1.0
+        assert b.inflight == 0
+    asyncio.run(scenario())
+
+def test_rejects_when_queue_full():
+    async def scenario():
+        b = Bulkhead("slow", limit=1, max_queue=0)
+        await b.acquire()
+        with pytest.raises(BulkheadFull) as e:
+            await b.acquire()
+        assert e.value.reason == "queue_full"
+        assert b.rejected == 1
+        assert b.inflight == 1
+    asyncio.run(scenario())
+
+def test_queued_request_gets_slot_in_fifo_order():
+    async def scenario():
+        b = Bulkhead("slow", limit=1, max_queue=2, queue_timeout_s=1)
+        order = []
+        await b.acquire()
+
+        async def waiter(n):
+            await b.acquire()
+            order.append(n)
+
+        tasks = [asyncio.create_task(waiter(n)) for n in (1, 2)]
+        await settle()
+        assert b.queued == 2
+        b.release()
+        await settle()
+        assert order == [1]
+        b.release()
+        await asyncio.gather(*tasks)
+        assert order == [1, 2]
+        assert b.inflight == 1
+    asyncio.run(scenario())
+
+def test_queue_timeout():
+    async def scenario():
+        b = Bulkhead("slow", limit=1, max_queue=1, queue_timeout_s=0.02)
+        await b.acquire()
+        with pytest.raises(BulkheadFull) as e:
+            await b.acquire()
+        assert e.value.reason == "queue_timeout"
+        assert b.queued == 0
+        assert b.rejected == 1
+    asyncio.run(scenario())
+
+def test_resize_up_wakes_waiters():
+    async def scenario():
+        b = Bulkhead("slow", limit=1, max_queue=2, queue_timeout_s=1)
+        await b.acquire()
+        tasks = [asyncio.create_task(b.acquire()) for _ in range(2)]
+        await settle()
+        b.resize(3, max_queue=2, queue_timeout_s=1)
+        await asyncio.wait_for(asyncio.gather(*tasks), 1)
+        assert b.inflight == 3
+        assert b.queued == 0
+    asyncio.run(scenario())
+
+def test_resize_down_applies_as_requests_finish():
+    async def scenario():
+        b = Bulkhead("slow", limit=2, max_queue=1, queue_timeout_s=1)
+        await b.acquire()
+        await b.acquire()
+        waiter = asyncio.create_task(b.acquire())
+        await settle()
+        b.resize(1, max_queue=1, queue_timeout_s=1)
+        b.release()
+        await settle()
+        assert not waiter.done()  # still 1 in flight, new limit is 1
+        b.release()
+        await asyncio.wait_for(waiter, 1)
+        assert b.inflight == 1
+    asyncio.run(scenario())
+
+def test_cancelled_waiter_leaves_queue():
+    async def scenario():
+        b = Bulkhead("slow", limit=1, max_queue=1, queue_timeout_s=1)
+        await b.acquire()
+        waiter = asyncio.create_task(b.acquire())
+        await settle()
+        waiter.cancel()
+        await settle()
+        assert b.queued == 0
+        b.release()
+        assert b.inflight == 0
+    asyncio.run(scenario())
+
+def test_cancelled_after_handoff_returns_slot():
+    async def scenario():
+        b = Bulkhead("slow", limit=1, max_queue=1, queue_timeout_s=1)
+        await b.acquire()
+        waiter = asyncio.create_task(b.acquire())
+        await settle()
+        b.release()   # hands the slot to the waiter...
+        waiter.cancel()  # ...which is cancelled before it runs
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert b.inflight == 0
+    asyncio.run(scenario())
+
+def test_resize_from_config_watcher_thread_runs_on_the_loop(tmp_path):
+    path = tmp_path / "live.env"
+    path.write_text("LIMIT=1\n")
+    config = RuntimeConfig([Setting("LIMIT", int, "1", positive)], str(path))
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        b = Bulkhead("slow", limit=1, max_queue=3, queue_timeout_s=5)
+        b.bind(loop)
+        resized_on = []
+        real_resize = b._resize
+
+        def record(*args):
+            resized_on.append(threading.get_ident())
+            real_resize(*args)
+
+        b._resize = record
+        config.on_change(lambda cfg: b.resize(cfg.LIMIT, 3, 5))
+        await b.acquire()
+        waiters = [asyncio.create_task(b.acquire()) for _ in range(3)]
+        await settle()
+        path.write_text("LIMIT=4\n")
+        reload = threading.Thread(target=config.reload_file)  # as RuntimeConfig._watch does
+        reload.start()
+        await loop.run_in_executor(None, reload.join)
+        await asyncio.wait_for(asyncio.gather(*waiters), 1)
+        assert b.inflight == 4 and b.queued == 0
+        assert set(resized_on) == {threading.get_ident()}  # all applied on the loop thread
+
+    asyncio.run(scenario())
@@ -0,0 +1,74 @@
+import math
+
+import pytest
+
+from capacity import CapacityModel, _RateWindow, erlang_c
+
+# P(wait) for c servers at a erlangs; closed forms for the small cases and the
+# usual published call-centre figures (e.g. 10 erlangs on 11 agents: 68.2%)
+@pytest.mark.parametrize("c, a, expected", [
+    (1, 0.5, 0.5),          # M/M/1: P(wait) = ρ
+    (1, 0.9, 0.9),
+    (2, 1.0, 1 / 3),        # 2ρ²/(1+ρ)
+    (3, 2.0, 4 / 9),
+    (10, 8.0, 0.4092),
+    (11, 10.0, 0.6821),
+])
+def test_erlang_c_known_values(c, a, expected):
+    assert erlang_c(c, a) == pytest.approx(expected, abs=1e-4)
+
+def test_erlang_c_bounds():
+    assert erlang_c(4, 0) == 0.0
+    assert erlang_c(4, 4) == 1.0
+    assert erlang_c(4, 5) == 1.0
+
+def test_erlang_c_large_fleet_is_stable():
+    p = erlang_c(200, 180)
+    assert 0.0 < p < 1.0
+
+SERVICE = {"mean_ms": 100.0, "p50_ms": 69.3, "p99_ms": 460.5, "scv": 1.0}  # exponential, 10/s per slot
+
+def test_predict_matches_mm1():
+    # λ = 5/s, μ = 10/s: Wq = ρ/(μ-λ) = 0.1s, and P(W > t) = ρ·e^-(μ-λ)t
+    p = CapacityModel(replicas=1).predict(1, 5.0, SERVICE)
+    assert p["utilization"] == pytest.approx(0.5)
+    assert p["wait_probability"] == pytest.approx(0.5)
+    assert p["wait_mean_ms"] == pytest.approx(100.0)
+    assert p["wait_p99_ms"] == pytest.approx(1000 * math.log(50) / 5)
+    assert p["p99_ms"] == pytest.approx(p["wait_p99_ms"] + SERVICE["p99_ms"])
+
+def test_predict_scales_wait_by_service_variability():
+    model = CapacityModel(replicas=1)
+    deterministic = model.predict(1, 5.0, {**SERVICE, "scv": 0.0})
+    assert deterministic["wait_mean_ms"] == pytest.approx(50.0)  # M/D/1: half the M/M/1 wait
+
+def test_predict_saturated():
+    p = CapacityModel(replicas=2).predict(2, 25.0, SERVICE)  # a = 2.5 > c
+    assert p["wait_probability"] == 1.0
+    assert math.isinf(p["p99_ms"])
+
+def test_predicted_p99_falls_with_replicas():
+    model = CapacityModel(replicas=1)
+    p99 = [model.predict(c, 30.0, SERVICE)["p99_ms"] for c in range(4, 10)]
+    assert p99 == sorted(p99, reverse=True)
+
+def test_recommend():
+    model = CapacityModel(replicas=1)
+    c = model.recommend(30.0, SERVICE, target_p99_ms=600)
+    assert model.predict(c, 30.0, SERVICE)["p99_ms"] <= 600
+    assert model.predict(c - 1, 30.0, SERVICE)["p99_ms"] > 600
+    assert model.recommend(30.0, SERVICE, target_p99_ms=400) is None  # below service p99 alone
+
+@pytest.mark.parametrize("rps", [0.5, 4.0, 25.0])
+def test_rate_window_recovers_a_constant_rate(rps):
+    window = _RateWindow(window_s=300, slices=10)
+    window.started = 0.0
+    now, step = 0.0, 1 / rps
+    checked = 0
+    while now < 900:
+        window.add(now)
+        if now > 30 and int(now * rps) % 97 == 0:  # at varied points within a slice
+            assert window.rate(now) == pytest.approx(rps, rel=0.02)
+            checked += 1
+        now += step
+    assert checked > 3
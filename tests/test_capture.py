@@ -0,0 +1,45 @@
+import threading
+
+from capture import HEADER, RECORD, TrafficCapture, read_capture
+
+def test_records_round_trip(tmp_path):
+    path = str(tmp_path / "b.bcap")
+    capture = TrafficCapture(path, flush_interval_s=0.01)
+    for i in range(100):
+        capture.record(1000.0 + i, f"dev-fast-{i % 3}", 3000, "normal", 200, 12.5)
+    capture.close()
+    records = list(read_capture(path))
+    assert len(records) == 100 and capture.written == 100 and capture.dropped == 0
+    assert records[0].device_id == "dev-fast-0" and records[-1].ts == 1099.0
+    assert records[0].latency_ms == 12.5
+
+def test_full_file_drops_are_counted_by_the_writer(tmp_path):
+    path = str(tmp_path / "b.bcap")
+    size = RECORD.size + len("dev-1") + len("normal")
+    capture = TrafficCapture(path, chunk_bytes=HEADER.size + 10 * size,
+                             max_bytes=HEADER.size + 10 * size, flush_interval_s=0.01)
+    for i in range(25):
+        capture.record(float(i), "dev-1", 100, "normal", 200, 1.0)
+    capture.close()
+    assert (capture.written, capture.dropped_full, capture.dropped_queue) == (10, 15, 0)
+    assert capture.dropped == 15
+    assert len(list(read_capture(path))) == 10
+
+def test_full_queue_drops_are_counted_by_the_request_path(tmp_path):
+    capture = TrafficCapture(str(tmp_path / "b.bcap"), queue_size=1, flush_interval_s=0.01)
+    busy, release = threading.Event(), threading.Event()
+    append = capture._append
+
+    def slow_append(item):
+        busy.set()
+        release.wait(5)
+        return append(item)
+
+    capture._append = slow_append
+    capture.record(0.0, "dev-1", 100, "normal", 200, 1.0)
+    assert busy.wait(5)  # the writer holds record 0; the queue has room for one more
+    for i in range(1, 5):
+        capture.record(float(i), "dev-1", 100, "normal", 200, 1.0)
+    release.set()
+    capture.close()
+    assert (capture.written, capture.dropped_queue, capture.dropped_full) == (2, 3, 0)
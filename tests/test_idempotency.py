@@ -0,0 +1,112 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import idempotency
+from idempotency import IdempotencyCache, KeyConflict
+
+def worker(calls, result="ok", delay_s=0.01, fail=False):
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(delay_s)
+        if fail:
+            raise RuntimeError("C failed")
+        return result
+    return work
+
+def test_miss_attach_hit_runs_work_once():
+    async def scenario():
+        cache, calls = IdempotencyCache(), []
+        outcome1, first = cache.join("k", ("dev-1", 100), worker(calls))
+        outcome2, second = cache.join("k", ("dev-1", 100), worker(calls))
+        assert (outcome1, outcome2) == ("miss", "attach")
+        assert second is first
+        assert cache.inflight == 1
+        assert await asyncio.shield(second) == "ok"
+        await asyncio.sleep(0)  # done callback
+        outcome3, third = cache.join("k", ("dev-1", 100), worker(calls))
+        assert outcome3 == "hit" and third.result() == "ok"
+        assert len(calls) == 1
+        assert cache.snapshot()["inflight"] == 0
+        assert cache.counts == {"miss": 1, "attach": 1, "hit": 1, "conflict": 0}
+    asyncio.run(scenario())
+
+def test_different_parameters_conflict():
+    async def scenario():
+        cache, calls = IdempotencyCache(), []
+        cache.join("k", ("dev-1", 100), worker(calls))
+        with pytest.raises(KeyConflict):
+            cache.join("k", ("dev-1", 200), worker(calls))
+        assert cache.counts["conflict"] == 1
+    asyncio.run(scenario())
+
+def test_failure_is_shared_in_flight_then_released():
+    async def scenario():
+        cache, calls = IdempotencyCache(), []
+        _, first = cache.join("k", "fp", worker(calls, fail=True))
+        _, attached = cache.join("k", "fp", worker(calls))
+        for task in (first, attached):
+            with pytest.raises(RuntimeError):
+                await asyncio.shield(task)
+        await asyncio.sleep(0)
+        assert len(cache) == 0
+        outcome, retry = cache.join("k", "fp", worker(calls))
+        assert outcome == "miss" and await retry == "ok"
+        assert len(calls) == 2
+    asyncio.run(scenario())
+
+def test_rejected_results_are_not_kept():
+    async def scenario():
+        cache, calls = IdempotencyCache(keep=lambda r: r != "busy"), []
+        _, task = cache.join("k", "fp", worker(calls, result="busy"))
+        await task
+        await asyncio.sleep(0)
+        assert cache.join("k", "fp", worker(calls))[0] == "miss"
+    asyncio.run(scenario())
+
+def test_caller_cancellation_does_not_cancel_shared_work():
+    async def scenario():
+        cache, calls = IdempotencyCache(), []
+        _, task = cache.join("k", "fp", worker(calls, delay_s=0.05))
+
+        async def caller():
+            return await asyncio.shield(task)
+
+        first = asyncio.create_task(caller())
+        await asyncio.sleep(0.01)
+        first.cancel()  # the client that started it went away
+        assert cache.join("k", "fp", worker(calls))[0] == "attach"
+        assert await asyncio.shield(task) == "ok"
+    asyncio.run(scenario())
+
+def test_ttl_expiry(monkeypatch):
+    async def scenario():
+        cache, calls = IdempotencyCache(ttl_s=60), []
+        _, task = cache.join("k", "fp", worker(calls))
+        await task
+        await asyncio.sleep(0)
+        now = time.monotonic()
+        # the cache's clock only; the event loop keeps the real one
+        monkeypatch.setattr(idempotency, "time", SimpleNamespace(monotonic=lambda: now + 59))
+        assert cache.join("k", "fp", worker(calls))[0] == "hit"
+        monkeypatch.setattr(idempotency, "time", SimpleNamespace(monotonic=lambda: now + 61))
+        outcome, task = cache.join("k", "fp", worker(calls))
+        assert outcome == "miss"
+        await task
+        assert len(calls) == 2
+    asyncio.run(scenario())
+
+def test_lru_eviction():
+    async def scenario():
+        cache, calls = IdempotencyCache(max_keys=2), []
+        tasks = [cache.join(k, "fp", worker(calls))[1] for k in ("a", "b")]
+        await asyncio.gather(*tasks)
+        await asyncio.sleep(0)
+        assert cache.join("a", "fp", worker(calls))[0] == "hit"  # "a" is now most recent
+        await cache.join("c", "fp", worker(calls))[1]
+        assert len(cache) == 2
+        assert cache.join("b", "fp", worker(calls))[0] == "miss"
+        await asyncio.sleep(0.02)
+    asyncio.run(scenario())
@@ -0,0 +1,70 @@
+import threading
+
+import pytest
+
+import memdebug
+from memdebug import BASELINE, AllocationTracker
+
+@pytest.fixture
+def tracker():
+    tracker = AllocationTracker(auto_threshold_pct=50, auto_cooldown_s=60)
+    tracker.start(frames=1)
+    tracker.take(BASELINE)
+    yield tracker
+    tracker.stop()
+
+def auto_names(tracker):
+    return [s["name"] for s in tracker.status()["snapshots"] if s["name"].startswith("auto-") and s["name"] != BASELINE]
+
+def test_auto_snapshot_runs_off_the_calling_thread(tracker, monkeypatch):
+    release = threading.Event()
+    take = tracker.take
+
+    def slow_take(name=None):
+        release.wait(5)
+        return take(name)
+
+    monkeypatch.setattr(tracker, "take", slow_take)
+    tracker.maybe_auto_snapshot(70)  # returns while the snapshot is still blocked
+    assert auto_names(tracker) == []
+    release.set()
+    tracker._auto_thread.join(5)
+    assert len(auto_names(tracker)) == 1
+
+def test_auto_snapshot_once_per_crossing_and_cooldown(tracker, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(memdebug.time, "time", lambda: clock[0])
+    tracker.maybe_auto_snapshot(70)
+    tracker._auto_thread.join(5)
+    tracker.maybe_auto_snapshot(75)  # still above: same crossing
+    tracker.maybe_auto_snapshot(40)
+    tracker.maybe_auto_snapshot(70)  # new crossing, but inside the cooldown
+    assert len(auto_names(tracker)) == 1
+    clock[0] += 61
+    tracker.maybe_auto_snapshot(70)
+    tracker._auto_thread.join(5)
+    assert len(auto_names(tracker)) == 2
+
+def test_auto_snapshot_skipped_while_one_is_running(tracker, monkeypatch):
+    release = threading.Event()
+    started = []
+
+    def slow_take(name=None):
+        started.append(name)
+        release.wait(5)
+
+    monkeypatch.setattr(tracker, "take", slow_take)
+    tracker.auto_cooldown_s = 0
+    tracker.maybe_auto_snapshot(70)
+    running = tracker._auto_thread
+    tracker.maybe_auto_snapshot(40)
+    tracker.maybe_auto_snapshot(70)  # new crossing while the first is still in progress
+    assert tracker._auto_thread is running
+    release.set()
+    running.join(5)
+    assert len(started) == 1
+
+def test_below_threshold_or_not_tracing_does_nothing():
+    tracker = AllocationTracker(auto_threshold_pct=50)
+    tracker.maybe_auto_snapshot(90)
+    assert tracker._auto_thread is None
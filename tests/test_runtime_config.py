@@ -0,0 +1,46 @@
+import threading
+
+import pytest
+
+from runtime_config import ConfigError, RuntimeConfig, Setting, positive
+
+def settings(n):
+    return [Setting(f"K{i}", int, "0") for i in range(n)] + [Setting("POOL", int, "10", positive)]
+
+def test_layers_and_validation(tmp_path):
+    path = tmp_path / "live.env"
+    path.write_text("POOL=20  # from the file\nUNKNOWN=1\n")
+    config = RuntimeConfig(settings(1), str(path))
+    assert config.current.POOL == 20 and config.current.sources["POOL"] == "file"
+    config.update({"POOL": "30"})
+    assert config.current.POOL == 30 and config.current.sources["POOL"] == "admin"
+    with pytest.raises(ConfigError):
+        config.update({"POOL": "0"})
+    assert config.current.POOL == 30
+    config.update({"POOL": None})
+    assert config.current.POOL == 20
+
+def test_concurrent_update_and_reload_keep_every_override(tmp_path):
+    path = tmp_path / "live.env"
+    path.write_text("POOL=20\n")
+    keys = 200
+    config = RuntimeConfig(settings(keys), str(path))
+    seen = []
+    config.on_change(lambda snapshot: seen.append(snapshot.generation))
+
+    def admin():
+        for i in range(keys):
+            config.update({f"K{i}": i + 1})
+
+    def watcher():
+        for _ in range(keys):
+            config.reload_file()
+
+    threads = [threading.Thread(target=admin), threading.Thread(target=watcher)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert all(getattr(config.current, f"K{i}") == i + 1 for i in range(keys))
+    assert config.current.POOL == 20
+    assert seen == sorted(seen)  # listeners see generations in order
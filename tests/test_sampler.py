@@ -0,0 +1,31 @@
+import threading
+
+import pytest
+
+from sampler import ProfilerBusy, StackSampler
+
+def spin(stop: threading.Event):
+    while not stop.is_set():
+        sum(range(1000))
+
+def test_profile_sees_busy_thread_and_drops_label_cache():
+    stop = threading.Event()
+    worker = threading.Thread(target=spin, args=(stop,), name="spinner")
+    worker.start()
+    try:
+        sampler = StackSampler(interval_s=0.005)
+        result = sampler.profile(0.2, thread_filter="spinner")
+    finally:
+        stop.set()
+        worker.join()
+    assert result["samples"] > 0
+    assert any(row["function"].startswith("spin ") for row in result["top"])
+    assert all(line.startswith("spinner;") for line in result["collapsed"].splitlines())
+    assert sampler._labels == {}
+
+def test_one_profile_at_a_time():
+    sampler = StackSampler()
+    with sampler._lock:
+        assert sampler.busy
+        with pytest.raises(ProfilerBusy):
+            sampler.profile(0.1)
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from shedding import FULL, STREAMING, LoadShedder, Shed
+
+def feed(shedder, cpu, mem, n=3):
+    """Stand-in for the monitor thread: n identical readings."""
+    for _ in range(n):
+        shedder.observe(cpu, mem)
+
+def test_full_mode_when_quiet():
+    s = LoadShedder()
+    feed(s, 10, 20)
+    assert asyncio.run(s.batch_mode()) == FULL
+    assert s.full_batches == 1
+    s.batch_done(FULL)
+    assert s.full_batches == 0
+    assert s.decisions == {}
+
+def test_second_batch_streams_while_full_one_runs():
+    s = LoadShedder(max_full_batches=1)
+    feed(s, 10, 20)
+    assert asyncio.run(s.batch_mode()) == FULL
+    assert asyncio.run(s.batch_mode()) == STREAMING
+    s.batch_done(STREAMING)
+    assert s.full_batches == 1
+    assert s.decisions == {"batch_concurrent": 1}
+
+def test_degrades_above_degrade_threshold():
+    s = LoadShedder(degrade_mem_pct=60, refuse_mem_pct=80)
+    feed(s, 10, 65)
+    assert asyncio.run(s.batch_mode()) == STREAMING
+    assert s.full_batches == 0
+    assert s.decisions == {"memory_degrade": 1}
+
+def test_refuses_after_defer_when_memory_stays_high():
+    seen = []
+    s = LoadShedder(refuse_mem_pct=80, defer_s=0.05, on_decision=seen.append)
+    feed(s, 10, 85)
+    with pytest.raises(Shed) as e:
+        asyncio.run(s.batch_mode(poll_s=0.01))
+    assert e.value.reason == "memory_refuse"
+    assert seen == ["memory_defer", "memory_refuse"]
+
+def test_deferred_batch_runs_once_memory_recovers():
+    s = LoadShedder(degrade_mem_pct=60, refuse_mem_pct=80, defer_s=5)
+    feed(s, 10, 90)
+
+    async def scenario():
+        job = asyncio.create_task(s.batch_mode(poll_s=0.01))
+        await asyncio.sleep(0.03)
+        assert not job.done()
+        feed(s, 10, 70)  # below refuse, still above degrade
+        return await asyncio.wait_for(job, 1)
+
+    assert asyncio.run(scenario()) == STREAMING
+    assert s.decisions == {"memory_defer": 1, "memory_degrade": 1}
+
+def test_cpu_shed_uses_recent_average():
+    s = LoadShedder(cpu_pct=90, cpu_samples=3)
+    feed(s, 95, 20, n=2)
+    s.observe(70, 20)  # window 95, 95, 70: average 86.7, still admitted
+    s.check_low_priority()
+    feed(s, 95, 20)  # the 70 ages out of the window
+    with pytest.raises(Shed) as e:
+        s.check_low_priority()
+    assert e.value.reason == "cpu_saturated"
+    assert s.decisions == {"cpu_saturated": 1}
+
+def test_configure_applies_new_thresholds():
+    s = LoadShedder()
+    feed(s, 10, 50)
+    assert asyncio.run(s.batch_mode()) == FULL
+    s.batch_done(FULL)
+    s.configure(degrade_mem_pct=40, refuse_mem_pct=80, defer_s=5, cpu_pct=90, max_full_batches=1)
+    assert asyncio.run(s.batch_mode()) == STREAMING
+    assert s.snapshot()["degrade_mem_pct"] == 40